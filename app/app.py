@@ -1,33 +1,57 @@
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, Blueprint, Request, request, jsonify, render_template, send_file, Response, stream_with_context
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.http import parse_content_range_header, parse_if_range_header
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 import asyncio
+import functools
+import hashlib
+import inspect
 import os
+import random
+import threading
 import time
 import datetime
-import random
 import subprocess
 import json
 import base64
+from contextlib import AsyncExitStack
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
 from google.cloud import storage
 from google import genai
 from google.genai import types
 import mimetypes
-import vertexai
 from config_manager import config
+from async_runtime import runtime
+from job_manager import job_manager, TERMINAL_STATES
+from operation_poller import operation_poller
+from rate_limiter import rate_limiter
+from request_coalescer import request_coalescer
+from image_refs import image_refs
+from image_prep import image_prep
+from asset_index import asset_index
+from asset_catalog import asset_catalog
+from blob_store import blob_store
+from gcs_transfer import gcs_transfer
+from gcs_uploads import gcs_uploads
+from previews import preview_cache
+from response_cache import response_cache
+from remote_assets import remote_assets
+from retry_policy import retry_policy
+from upload_sessions import upload_sessions
+from upload_tee import UploadTee, upload_tee
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+bp = Blueprint('studio', __name__)
 
 # Configuration - Auto-detect from gcloud config
+@functools.lru_cache(maxsize=None)
 def get_project_id():
-    """Get project ID from gcloud config or environment variable"""
+    """Get project ID from gcloud config or environment variable (looked up once, on first use)"""
     try:
         # Try to get from gcloud config first
         result = subprocess.run(['gcloud', 'config', 'get-value', 'core/project'],
@@ -42,40 +66,127 @@ def get_project_id():
 
 GCS_BUCKET_NAME = os.environ.get('GCS_BUCKET_NAME', 'video-generation-bucket-unique-name')
 GCS_FOLDER = "generated-content"
-PROJECT_ID = get_project_id()
 LOCATION = os.environ.get('GOOGLE_CLOUD_LOCATION', 'us-central1')
 
-# Initialize services
-vertexai.init(project=PROJECT_ID, location=LOCATION)
-# Initialize both clients
-# API Key client for gemini-2.5-flash-image-preview
-api_key = os.environ.get('GEMINI_API_KEY')
-if not api_key:
-    raise ValueError("GEMINI_API_KEY environment variable is required")
-
-api_client = genai.Client(api_key=api_key)
-print("✅ API Key client ready for image preview model")
+# Clients are created on first use so importing the app (workers, tests, CLI) stays fast
+_clients = {}
+_clients_lock = threading.RLock()
+_client_warnings = set()
+
+def _lazy_client(name, factory):
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+def get_api_client():
+    """API Key client for gemini-2.5-flash-image-preview"""
+    def create():
+        api_key = os.environ.get('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+        api_client = genai.Client(api_key=api_key)
+        print("✅ API Key client ready for image preview model")
+        return api_client
+    return _lazy_client('api_client', create)
+
+def get_client():
+    """Vertex AI client for other models"""
+    def create():
+        import vertexai
+        vertexai.init(project=get_project_id(), location=LOCATION)
+        client = genai.Client(vertexai=True, project=get_project_id(), location=LOCATION)
+        print("✅ Vertex AI client ready for other models")
+        return client
+    return _lazy_client('client', create)
+
+def get_storage_client():
+    return _lazy_client('storage_client', lambda: storage.Client(project=get_project_id()))
+
+def get_bucket():
+    return _lazy_client('bucket', lambda: get_storage_client().bucket(GCS_BUCKET_NAME))
+
+def warm_up_clients(strict=True):
+    """Create every client up front instead of on the first request"""
+    for get in (get_api_client, get_client, get_bucket):
+        try:
+            get()
+        except Exception as e:
+            if strict:
+                raise
+            # Left for the request that needs it to report; warned about once
+            if get.__name__ not in _client_warnings:
+                _client_warnings.add(get.__name__)
+                print(f"⚠️  Could not create client ({get.__name__}): {e}")
+
+async def ensure_clients():
+    """
+    Create missing clients on a worker thread. Creating one runs gcloud,
+    vertexai.init and the client constructors synchronously, which would
+    otherwise stall every request sharing the event loop.
+    """
+    if not {'api_client', 'client', 'bucket'} <= _clients.keys():
+        await asyncio.to_thread(warm_up_clients, strict=False)
 
-# Vertex AI client for other models
-client = genai.Client(vertexai=True, project=PROJECT_ID, location=LOCATION)
-print("✅ Vertex AI client ready for other models")
-storage_client = storage.Client(project=PROJECT_ID)
-bucket = storage_client.bucket(GCS_BUCKET_NAME)
+operation_poller.set_fetcher(
+    lambda operation: retry_policy.call_async('veo', get_client().aio.operations.get, operation, retry_throttled=False)
+)
+remote_assets.set_storage_client_factory(get_storage_client)
+gcs_uploads.set_bucket_factory(get_bucket)
+upload_tee.set_bucket_factory(get_bucket)
+preview_cache.set_content_lookup(asset_catalog.content_of)
 
 # Upload configuration
 UPLOAD_FOLDER = 'uploads'
 MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
-ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
-ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'wmv', 'flv', 'webm'}
+# The asset catalog and previews read the same lists from config
+ALLOWED_IMAGE_EXTENSIONS = set(config.allowed_image_formats)
+ALLOWED_VIDEO_EXTENSIONS = set(config.allowed_video_formats)
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+# Multipart upload endpoints whose file parts are streamed through an UploadTee
+STREAMED_UPLOAD_ROUTES = {'/api/upload-image': 'image', '/api/upload-video': 'video'}
 
-# Ensure directories exist
-os.makedirs("output/videos", exist_ok=True)
-os.makedirs("output/images", exist_ok=True)
-os.makedirs("temp", exist_ok=True)
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+class StudioRequest(Request):
+    """Request that streams uploaded files to their final directory (and GCS) while the form is parsed"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        kind = STREAMED_UPLOAD_ROUTES.get(self.path)
+        if kind and filename and allowed_file(filename, kind):
+            return upload_tee.open(f"output/{kind}s", filename, kind, content_type, GCS_FOLDER)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+def create_app(warm_up=None):
+    """
+    Build the Flask application. Clients are created lazily on first use; pass
+    warm_up=True (or set server.warm_up in config.json) to create them at startup.
+    """
+    app = Flask(__name__)
+    app.request_class = StudioRequest
+    CORS(app)
+
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+    app.register_blueprint(bp)
+
+    # Ensure directories exist
+    os.makedirs("output/videos", exist_ok=True)
+    os.makedirs("output/images", exist_ok=True)
+    os.makedirs("temp", exist_ok=True)
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+    # Videos that so far only exist in GCS are listed from the catalog too
+    asset_catalog.import_remote(remote_assets.list_remote(f"{config.local_output_dir}/videos"))
+    # Drop stored content whose files were all deleted while the server was down
+    blob_store.prune()
+    # Resume GCS uploads queued before the last shutdown
+    gcs_uploads.start()
+
+    if warm_up is None:
+        warm_up = config.get('server.warm_up', False)
+    if warm_up:
+        warm_up_clients()
+
+    return app
 
 def allowed_file(filename, file_type):
     if file_type == 'image':
@@ -84,65 +195,188 @@ def allowed_file(filename, file_type):
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_VIDEO_EXTENSIONS
     return False
 
-@app.route('/')
+def submit_job_response(kind, coro_fn, *args, params=None, **kwargs):
+    """Queue a background job and return the 202 payload pointing at its status"""
+    job_id = job_manager.submit(kind, coro_fn, *args, params=params, **kwargs)
+    return {
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}',
+        'events_url': f'/api/jobs/{job_id}/events'
+    }, 202
+
+def run_handler(handler):
+    """
+    Run an async request handler for the current Flask request on the shared loop.
+    Handlers take the JSON body and return (payload, status) so the ASGI entry
+    point (asgi.py) can await the same functions directly. Handlers that accept
+    an `emit` callback answer `"stream": true` requests with Server-Sent Events.
+    """
+    data = request.get_json(silent=True)
+    if wants_stream(handler, data):
+        return Response(stream_with_context(runtime.iterate(handler_events(handler, data, request.path))),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    payload, status = runtime.run(call_handler(handler, data, request.path))
+    return jsonify(payload), status
+
+async def call_handler(handler, data, origin=None, **kwargs):
+    """Await a handler, recording `origin` (the endpoint path) as the source of the files it writes"""
+    asset_catalog.set_origin(origin)
+    # Handlers reach for the clients synchronously, so they must exist before the handler runs
+    await ensure_clients()
+    return await handler(data, **kwargs)
+
+def wants_stream(handler, data):
+    return bool(data and data.get('stream')) and 'emit' in inspect.signature(handler).parameters
+
+def sse_message(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+async def handler_events(handler, data, origin=None):
+    """
+    Run a streaming handler and yield SSE messages: one per emitted text chunk
+    or saved image, then a final 'done' event carrying the usual JSON payload.
+    """
+    queue = asyncio.Queue()
+
+    async def emit(event, payload):
+        await queue.put((event, payload))
+
+    async def run():
+        try:
+            payload, status = await call_handler(handler, data, origin, emit=emit)
+        except Exception as e:
+            payload, status = {'error': str(e)}, 500
+        await queue.put(('done', {**payload, 'status_code': status}))
+
+    task = asyncio.ensure_future(run())
+    try:
+        while True:
+            event, payload = await queue.get()
+            yield sse_message(event, payload)
+            if event == 'done':
+                break
+    finally:
+        task.cancel()
+
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/generate-video', methods=['POST'])
+@bp.route('/api/generate-video', methods=['POST'])
 def generate_video():
-    data = request.json
+    return run_handler(handle_generate_video)
+
+async def handle_generate_video(data):
+    data = data or {}
     prompt = data.get('prompt')
     aspect_ratio = data.get('aspect_ratio', '9:16')
     negative_prompt = data.get('negative_prompt', '')
     resolution = data.get('resolution', '1080p')
+    # Opt out of sharing an identical in-flight generation
+    fresh = data.get('fresh', False)
 
     if not prompt:
-        return jsonify({'error': 'Prompt is required'}), 400
+        return {'error': 'Prompt is required'}, 400
+
+    # Async mode: hand the operation to the job manager and return immediately
+    if data.get('async', False):
+        return submit_job_response('generate-video', generate_video_async,
+                                   prompt, aspect_ratio, negative_prompt, resolution, fresh=fresh,
+                                   params={'prompt': prompt, 'aspect_ratio': aspect_ratio,
+                                           'negative_prompt': negative_prompt, 'resolution': resolution})
 
     try:
-        # Run async function
-        result = asyncio.run(generate_video_async(prompt, aspect_ratio, negative_prompt, resolution))
-        return jsonify(result)
+        return await generate_video_async(prompt, aspect_ratio, negative_prompt, resolution, fresh=fresh), 200
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
-@app.route('/api/generate-image', methods=['POST'])
+@bp.route('/api/generate-image', methods=['POST'])
 def generate_image():
-    data = request.json
+    return run_handler(handle_generate_image)
+
+def is_int(value):
+    """True for JSON integers (bool is an int subclass in Python, but not one here)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+async def handle_generate_image(data):
+    data = data or {}
     prompt = data.get('prompt')
+    candidate_count = data.get('candidate_count', 1)
+    # Variants mode: N concurrent generations, one per seed
+    seeds = data.get('seeds')
+    variants = len(seeds) if seeds else data.get('variants', 1)
 
     if not prompt:
-        return jsonify({'error': 'Prompt is required'}), 400
+        return {'error': 'Prompt is required'}, 400
+
+    if seeds is not None and (not isinstance(seeds, list) or not all(is_int(seed) for seed in seeds)):
+        return {'error': 'seeds must be a list of integers'}, 400
+    for name, value in (('variants', variants), ('candidate_count', candidate_count)):
+        if not is_int(value) or value < 1:
+            return {'error': f'{name} must be a positive integer'}, 400
+
+    max_variants = config.get('models.image_generation.max_variants', 8)
+    if variants > max_variants:
+        return {'error': f'Maximum {max_variants} variants allowed'}, 400
+
+    if variants > 1:
+        if data.get('async', False):
+            return submit_job_response('generate-image-variants', generate_image_variants_async,
+                                       prompt, variants, seeds, candidate_count,
+                                       params={'prompt': prompt, 'variants': variants, 'seeds': seeds,
+                                               'candidate_count': candidate_count})
+        try:
+            return await generate_image_variants_async(prompt, variants, seeds, candidate_count), 200
+        except Exception as e:
+            return {'error': str(e)}, 500
 
     try:
-        result = asyncio.run(generate_image_async(prompt))
-        return jsonify(result)
+        return await generate_image_async(prompt, candidate_count, fresh=data.get('fresh', False)), 200
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
-@app.route('/api/edit-image', methods=['POST'])
+@bp.route('/api/edit-image', methods=['POST'])
 def edit_image():
-    data = request.json
+    return run_handler(handle_edit_image)
+
+async def handle_edit_image(data, emit=None):
+    data = data or {}
     image_path = data.get('image_path')
     edit_prompt = data.get('edit_prompt')
     enable_validation = data.get('enable_validation', False)
     max_retries = data.get('max_retries', 5)
+    # Run this many validated attempts concurrently instead of one after another
+    parallel_attempts = data.get('parallel_attempts', 1)
 
     if not image_path or not edit_prompt:
-        return jsonify({'error': 'Image path and edit prompt are required'}), 400
+        return {'error': 'Image path and edit prompt are required'}, 400
+
+    # The first lookup scans the output tree, and misses probe the disk: keep both off the loop
+    image_path = await asyncio.to_thread(asset_index.resolve, image_path)
+    if not image_path:
+        return {'error': f"Image not found: {data.get('image_path')}"}, 404
 
     try:
         if enable_validation:
-            result = asyncio.run(edit_image_with_validation_async(image_path, edit_prompt, max_retries))
+            result = await edit_image_with_validation_async(image_path, edit_prompt, max_retries, parallel_attempts)
         else:
-            result = asyncio.run(edit_image_async(image_path, edit_prompt))
-        return jsonify(result)
+            # Streamed edits are never shared: a follower would miss the events
+            result = await edit_image_async(image_path, edit_prompt, emit=emit,
+                                            fresh=data.get('fresh', False) or emit is not None)
+        return result, 200
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
-@app.route('/api/generate-video-from-image', methods=['POST'])
+@bp.route('/api/generate-video-from-image', methods=['POST'])
 def generate_video_from_image():
-    data = request.json
+    return run_handler(handle_generate_video_from_image)
+
+async def handle_generate_video_from_image(data):
+    data = data or {}
     prompt = data.get('prompt')
     image_path = data.get('image_path')
     aspect_ratio = data.get('aspect_ratio', '9:16')
@@ -150,30 +384,182 @@ def generate_video_from_image():
     resolution = data.get('resolution', '1080p')
 
     if not prompt or not image_path:
-        return jsonify({'error': 'Prompt and image path are required'}), 400
+        return {'error': 'Prompt and image path are required'}, 400
+
+    image_path = await asyncio.to_thread(asset_index.resolve, image_path)
+    if not image_path:
+        return {'error': f"Image not found: {data.get('image_path')}"}, 404
+
+    # Async mode: hand the operation to the job manager and return immediately
+    if data.get('async', False):
+        return submit_job_response('generate-video-from-image', generate_video_from_image_async,
+                                   prompt, image_path, aspect_ratio, negative_prompt, resolution,
+                                   params={'prompt': prompt, 'image_path': image_path,
+                                           'aspect_ratio': aspect_ratio, 'negative_prompt': negative_prompt,
+                                           'resolution': resolution})
 
     try:
-        result = asyncio.run(generate_video_from_image_async(prompt, image_path, aspect_ratio, negative_prompt, resolution))
-        return jsonify(result)
+        return await generate_video_from_image_async(prompt, image_path, aspect_ratio, negative_prompt, resolution), 200
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+@bp.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List background jobs, optionally filtered by kind"""
+    try:
+        jobs = job_manager.list_jobs(request.args.get('kind'))
+        return jsonify({'success': True, 'jobs': jobs, 'job_count': len(jobs)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/refine-prompt', methods=['POST'])
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status of a background job (includes the result once finished)"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@bp.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Get the result of a finished job; 202 while it is still pending"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job['status'] not in TERMINAL_STATES:
+        return jsonify({'job_id': job_id, 'status': job['status']}), 202
+    if job['status'] == 'succeeded':
+        return jsonify(job['result'])
+    return jsonify({'error': job['error'] or 'Job was cancelled', 'status': job['status']}), 500
+
+@bp.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Stream job status changes as Server-Sent Events until the job finishes"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    # Each subscriber holds a server thread, so a stream ends after a while and
+    # EventSource reconnects (possibly to another worker) with the current state
+    deadline = time.monotonic() + config.get('generation_settings.jobs.events_max_seconds', 300)
+
+    def event_stream():
+        current = job
+        yield f"data: {json.dumps(current)}\n\n"
+        while current['status'] not in TERMINAL_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            latest = job_manager.wait_for_change(job_id, current['version'], timeout=min(15.0, remaining))
+            if latest is None:
+                break
+            if latest['version'] == current['version']:
+                # Keep-alive comment so proxies don't close an idle stream
+                yield ": keep-alive\n\n"
+            else:
+                current = latest
+                yield f"data: {json.dumps(current)}\n\n"
+
+    return Response(stream_with_context(event_stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a job that has not started running yet"""
+    if not job_manager.get(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    if not job_manager.cancel(job_id):
+        return jsonify({'error': 'Job is already running or finished'}), 409
+    return jsonify({'success': True, 'message': 'Job cancelled'})
+
+@bp.route('/api/operations', methods=['GET'])
+def list_operations():
+    """Show in-flight Veo operations and the learned completion times"""
+    try:
+        return jsonify({'success': True, **operation_poller.stats()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/rate-limits', methods=['GET'])
+def get_rate_limits():
+    """Show token bucket levels, per-model concurrency, circuit breaker states, image reference reuse and response cache hits"""
+    try:
+        return jsonify({'success': True, **rate_limiter.stats(), 'circuits': retry_policy.stats(),
+                        'image_refs': image_refs.stats(), 'response_cache': response_cache.stats()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/gcs-uploads', methods=['GET', 'POST'])
+def gcs_upload_queue():
+    """GET: queue counts and unfinished uploads. POST {"action": "retry"}: re-queue failed uploads"""
+    try:
+        if request.method == 'POST':
+            if (request.json or {}).get('action') != 'retry':
+                return jsonify({'error': "Unknown action, use 'retry'"}), 400
+            return jsonify({'success': True, 'requeued': gcs_uploads.retry_failed()})
+        return jsonify({'success': True, **gcs_uploads.stats(), 'transfers': gcs_transfer.stats(),
+                        'unfinished': gcs_uploads.list_unfinished()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/storage')
+def storage_stats():
+    """Content-addressed storage: distinct blobs, file aliases and bytes saved by deduplication"""
+    try:
+        return jsonify({'success': True, **blob_store.stats()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/download-remote', methods=['POST'])
+def download_remote():
+    """
+    Download GCS-only videos into output/videos: {"paths": [...]} or {"all": true}.
+    Files are fetched concurrently, large ones as parallel byte ranges.
+    """
+    try:
+        data = request.json or {}
+        if data.get('all'):
+            paths = [asset['local_path'] for asset in remote_assets.list_remote(f"{config.local_output_dir}/videos")]
+        else:
+            paths = data.get('paths') or []
+        if not paths:
+            return jsonify({'error': 'No remote videos to download'}), 400
+
+        registered = [path for path in paths if remote_assets.lookup(path)]
+        unknown = [path for path in paths if path not in registered]
+        errors = remote_assets.materialize_many(registered)
+        downloaded = [path for path, error in errors.items() if error is None]
+        for path in downloaded:
+            asset_catalog.record(path)
+            preview_cache.pregenerate(path)
+        return jsonify({
+            'success': not unknown and len(downloaded) == len(registered),
+            'downloaded': downloaded,
+            'failed': {path: error for path, error in errors.items() if error},
+            'unknown': unknown
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/refine-prompt', methods=['POST'])
 def refine_prompt():
-    data = request.json
+    return run_handler(handle_refine_prompt)
+
+async def handle_refine_prompt(data):
+    data = data or {}
     original_prompt = data.get('original_prompt')
     focus = data.get('focus', 'general')
 
     if not original_prompt:
-        return jsonify({'error': 'Original prompt is required'}), 400
+        return {'error': 'Original prompt is required'}, 400
 
     try:
-        result = asyncio.run(refine_prompt_with_gemini(original_prompt, focus))
-        return jsonify(result)
+        return await refine_prompt_with_gemini(original_prompt, focus), 200
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
-@app.route('/api/config', methods=['GET'])
+@bp.route('/api/config', methods=['GET'])
 def get_config():
     """Get current configuration"""
     try:
@@ -197,7 +583,7 @@ def get_config():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/config', methods=['POST'])
+@bp.route('/api/config', methods=['POST'])
 def update_config():
     """Update configuration settings"""
     try:
@@ -222,7 +608,7 @@ def update_config():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/add-text-overlay', methods=['POST'])
+@bp.route('/api/add-text-overlay', methods=['POST'])
 def add_text_overlay():
     """Add text overlay to an existing image"""
     try:
@@ -365,20 +751,21 @@ def add_text_overlay():
 
         # Save the result
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        output_filename = f"{config.local_output_dir}/images/text_overlay_{timestamp}.png"
-        final_image.save(output_filename, 'PNG', quality=95)
-
-        # Optional: Upload to GCS if file is large enough
-        gcs_url = None
+        output_filename = blob_store.reserve(f"{config.local_output_dir}/images/text_overlay_{timestamp}.png")
+        try:
+            final_image.save(output_filename, 'PNG', quality=95)
+        except Exception:
+            os.remove(output_filename)
+            raise
+        store_output(output_filename, origin=request.path)
+
+        # Optional: Upload to GCS in the background if file is large enough
+        upload_state = None
         file_size_mb = os.path.getsize(output_filename) / (1024 * 1024)
         if file_size_mb >= config.gcs_upload_threshold_mb:
-            try:
-                gcs_path = f"text_overlays/overlay_{timestamp}.png"
-                blob = bucket.blob(gcs_path)
-                blob.upload_from_filename(output_filename)
-                gcs_url = f"gs://{config.gcs_bucket_name}/{gcs_path}"
-            except Exception as e:
-                print(f"GCS upload failed: {e}")
+            overlay_name = os.path.basename(output_filename).replace('text_overlay_', 'overlay_', 1)
+            gcs_uploads.enqueue(output_filename, f"text_overlays/{overlay_name}")
+            upload_state = 'pending'
 
         return jsonify({
             'success': True,
@@ -387,7 +774,8 @@ def add_text_overlay():
             'original_path': image_path,
             'text_applied': text,
             'position': position,
-            'gcs_url': gcs_url,
+            'gcs_url': None,
+            'upload_state': upload_state,
             'file_size': os.path.getsize(output_filename)
         })
 
@@ -396,7 +784,7 @@ def add_text_overlay():
     except Exception as e:
         return jsonify({'error': f'Failed to add text overlay: {str(e)}'}), 500
 
-@app.route('/api/join-videos', methods=['POST'])
+@bp.route('/api/join-videos', methods=['POST'])
 def join_videos():
     data = request.json
     video_paths = data.get('video_paths', [])
@@ -410,7 +798,7 @@ def join_videos():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/extract-frames', methods=['POST'])
+@bp.route('/api/extract-frames', methods=['POST'])
 def extract_frames():
     data = request.json
     video_path = data.get('video_path')
@@ -424,7 +812,7 @@ def extract_frames():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/extract-first-frame', methods=['POST'])
+@bp.route('/api/extract-first-frame', methods=['POST'])
 def extract_first_frame():
     data = request.json
     video_path = data.get('video_path')
@@ -438,7 +826,7 @@ def extract_first_frame():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/extract-last-frame', methods=['POST'])
+@bp.route('/api/extract-last-frame', methods=['POST'])
 def extract_last_frame():
     data = request.json
     video_path = data.get('video_path')
@@ -452,30 +840,101 @@ def extract_last_frame():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/list-videos')
+def list_assets_response(kind, key):
+    """
+    Catalog listing for /api/list-images and /api/list-videos. Without `limit`
+    every asset is returned as before; with `limit` the response is one page
+    plus `next_cursor` (pass it back as `cursor`) and the filtered `total`.
+    Optional: sort=created|modified|size|name, order=asc|desc, q (name
+    contains), origin, remote=true|false, upload_state=pending|uploading|uploaded|failed,
+    created_after, created_before.
+    """
+    args = request.args
+    try:
+        limit = args.get('limit', type=int)
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be positive")
+        remote = args.get('remote')
+        items, next_cursor, total = asset_catalog.query(
+            kind,
+            limit=limit,
+            cursor=args.get('cursor'),
+            sort=args.get('sort', 'created'),
+            order=args.get('order', 'desc'),
+            search=args.get('q'),
+            origin=args.get('origin'),
+            remote=None if remote is None else remote.lower() in ('1', 'true', 'yes'),
+            upload_state=args.get('upload_state'),
+            created_after=args.get('created_after', type=float),
+            created_before=args.get('created_before', type=float)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if limit is None:
+        return jsonify({key: items})
+    return jsonify({key: items, 'next_cursor': next_cursor, 'total': total})
+
+@bp.route('/api/list-videos')
 def list_videos():
     try:
-        videos = []
-        videos_dir = f"{config.local_output_dir}/videos"
-
-        # Create directory if it doesn't exist
-        os.makedirs(videos_dir, exist_ok=True)
-
-        for file in os.listdir(videos_dir):
-            if file.endswith('.mp4'):
-                file_path = os.path.join(videos_dir, file)
-                file_size = os.path.getsize(file_path)
-                videos.append({
-                    'name': file,
-                    'path': file_path,
-                    'size': file_size,
-                    'created': os.path.getctime(file_path)
-                })
-        return jsonify({'videos': videos})
+        return list_assets_response('video', 'videos')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/upload-image', methods=['POST'])
+def register_upload(file_path, filename, tee=None, sha256=None):
+    """
+    Index, catalog and copy an uploaded file to GCS; returns the upload response.
+    Files received through an UploadTee finish the GCS copy that was streamed
+    alongside them; other files are queued for a background upload. Content
+    that is already in GCS under another name is not uploaded again.
+    """
+    if tee is not None:
+        sha256 = tee.sha256
+    blob = store_output(file_path, sha256, origin=request.path)
+
+    # The listings show the upload state until the GCS copy is done
+    gcs_url = blob['gcs_url']
+    if gcs_url:
+        if tee is not None:
+            tee.discard_remote()
+        asset_catalog.set_upload_state(file_path, 'uploaded', gcs_url=gcs_url)
+        upload_state = 'uploaded'
+    elif tee is not None:
+        upload_state = tee.finish_remote(file_path)
+    else:
+        gcs_uploads.enqueue(file_path, f"{GCS_FOLDER}/uploaded_{filename}")
+        upload_state = 'pending'
+
+    return {
+        'success': True,
+        'filename': filename,
+        'local_path': file_path,
+        'gcs_url': gcs_url,
+        'upload_state': upload_state,
+        'size': blob['size'],
+        'sha256': blob['sha256'],
+        'duplicate': blob['duplicate']
+    }
+
+def save_upload(file, kind):
+    """Put an uploaded file into output/<kind>s: a rename for streamed uploads, a copy otherwise"""
+    if isinstance(file.stream, UploadTee):
+        filename = file.stream.final_name
+        file_path = os.path.join(f"output/{kind}s", filename)
+        file.stream.commit(file_path)
+        return register_upload(file_path, filename, file.stream)
+
+    # Secure the filename
+    filename = secure_filename(file.filename)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    filename = f"{timestamp}_{filename}"
+
+    file_path = blob_store.reserve(os.path.join(f"output/{kind}s", filename))
+    file.save(file_path)
+    return register_upload(file_path, os.path.basename(file_path))
+
+@bp.route('/api/upload-image', methods=['POST'])
 def upload_image():
     try:
         if 'file' not in request.files:
@@ -486,39 +945,17 @@ def upload_image():
             return jsonify({'error': 'No file selected'}), 400
 
         if file and allowed_file(file.filename, 'image'):
-            # Secure the filename
-            filename = secure_filename(file.filename)
-            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            filename = f"{timestamp}_{filename}"
-
             # Save to output/images directory
-            file_path = os.path.join("output/images", filename)
-            file.save(file_path)
-
-            # Optional: Upload to GCS
-            gcs_url = None
-            try:
-                gcs_path = f"{GCS_FOLDER}/uploaded_{filename}"
-                blob = bucket.blob(gcs_path)
-                blob.upload_from_filename(file_path)
-                gcs_url = f"gs://{config.gcs_bucket_name}/{gcs_path}"
-            except Exception as e:
-                print(f"GCS upload failed: {e}")
-
-            return jsonify({
-                'success': True,
-                'filename': filename,
-                'local_path': file_path,
-                'gcs_url': gcs_url,
-                'size': os.path.getsize(file_path)
-            })
+            return jsonify(save_upload(file, 'image'))
         else:
-            return jsonify({'error': 'Invalid file type. Allowed: png, jpg, jpeg, gif, bmp, webp'}), 400
+            return jsonify({'error': f"Invalid file type. Allowed: {', '.join(config.allowed_image_formats)}"}), 400
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/upload-video', methods=['POST'])
+@bp.route('/api/upload-video', methods=['POST'])
 def upload_video():
     try:
         if 'file' not in request.files:
@@ -529,76 +966,176 @@ def upload_video():
             return jsonify({'error': 'No file selected'}), 400
 
         if file and allowed_file(file.filename, 'video'):
-            # Secure the filename
-            filename = secure_filename(file.filename)
-            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            filename = f"{timestamp}_{filename}"
-
             # Save to output/videos directory
-            file_path = os.path.join("output/videos", filename)
-            file.save(file_path)
+            return jsonify(save_upload(file, 'video'))
+        else:
+            return jsonify({'error': f"Invalid file type. Allowed: {', '.join(config.allowed_video_formats)}"}), 400
 
-            # Optional: Upload to GCS
-            gcs_url = None
-            try:
-                gcs_path = f"{GCS_FOLDER}/uploaded_{filename}"
-                blob = bucket.blob(gcs_path)
-                blob.upload_from_filename(file_path)
-                gcs_url = f"gs://{config.gcs_bucket_name}/{gcs_path}"
-            except Exception as e:
-                print(f"GCS upload failed: {e}")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-            return jsonify({
-                'success': True,
-                'filename': filename,
-                'local_path': file_path,
-                'gcs_url': gcs_url,
-                'size': os.path.getsize(file_path)
-            })
-        else:
-            return jsonify({'error': 'Invalid file type. Allowed: mp4, avi, mov, mkv, wmv, flv, webm'}), 400
+@bp.route('/api/upload-video/sessions', methods=['POST'])
+def create_upload_session():
+    """Open a resumable upload: {filename, size, sha256 (optional)}"""
+    try:
+        data = request.json or {}
+        filename = data.get('filename', '')
+        if not allowed_file(filename, 'video'):
+            return jsonify({'error': f"Invalid file type. Allowed: {', '.join(config.allowed_video_formats)}"}), 400
+        session = upload_sessions.create(filename, int(data.get('size') or 0), data.get('sha256'))
+        return jsonify(session), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/upload-video/sessions/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def upload_session(upload_id):
+    """
+    GET: received byte ranges and the offset to resume from.
+    PUT ?offset=N (or a Content-Range header): write the raw request body at that offset.
+    DELETE: abandon the upload.
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify(upload_sessions.status(upload_id))
+        if request.method == 'DELETE':
+            upload_sessions.status(upload_id)
+            upload_sessions.abort(upload_id)
+            return jsonify({'success': True, 'upload_id': upload_id})
+
+        offset = request.args.get('offset', type=int)
+        content_range = parse_content_range_header(request.headers.get('Content-Range'))
+        if offset is None and content_range is not None:
+            offset = content_range.start
+        if offset is None:
+            return jsonify({'error': 'offset query parameter or Content-Range header is required'}), 400
+        # Read the body as a stream so chunks are never spooled in memory or to a temp file
+        return jsonify(upload_sessions.write_chunk(upload_id, offset, request.stream))
+    except KeyError:
+        return jsonify({'error': 'Upload session not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/upload-video/sessions/<upload_id>/complete', methods=['POST'])
+def complete_upload_session(upload_id):
+    """Verify a finished upload (size and optional sha256) and move it into output/videos"""
+    try:
+        data = request.get_json(silent=True) or {}
+        status = upload_sessions.status(upload_id)
+        filename = secure_filename(status['filename'])
+        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        filename = f"{timestamp}_{filename}"
+
+        file_path = blob_store.reserve(os.path.join("output/videos", filename))
+        try:
+            result = upload_sessions.complete(upload_id, file_path, data.get('sha256'))
+        except Exception:
+            os.remove(file_path)
+            raise
+        return jsonify(register_upload(file_path, os.path.basename(file_path), sha256=result['sha256']))
+    except KeyError:
+        return jsonify({'error': 'Upload session not found'}), 404
+    except LookupError as e:
+        return jsonify({'error': str(e), **upload_sessions.status(upload_id)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/list-images')
+@bp.route('/api/list-images')
 def list_images():
     try:
-        images = []
-        images_dir = f"{config.local_output_dir}/images"
-
-        # Create directory if it doesn't exist
-        os.makedirs(images_dir, exist_ok=True)
-
-        for file in os.listdir(images_dir):
-            if file.endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')):
-                file_path = os.path.join(images_dir, file)
-                file_size = os.path.getsize(file_path)
-                images.append({
-                    'name': file,
-                    'path': file_path,
-                    'size': file_size,
-                    'created': os.path.getctime(file_path)
-                })
-        return jsonify({'images': images})
+        return list_assets_response('image', 'images')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/preview/image/<path:filename>')
+def send_preview(path, mimetype=None):
+    """
+    send_file for preview responses: a strong ETag from the content hash,
+    Last-Modified, byte ranges (206) and 304s for conditional requests.
+    Versioned URLs (?v=<modified time>) never change, so browsers may keep them
+    without asking again; other URLs are revalidated against the ETag.
+    """
+    etag, weak = preview_cache.content_etag(path)
+    if not weak:
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=etag, max_age=None)
+    else:
+        # A size/mtime tag until the file is hashed. If-Range needs a strong validator,
+        # so a range request conditional on this tag gets the whole file
+        response = send_file(path, mimetype=mimetype, conditional=False, etag=False, max_age=None)
+        response.set_etag(etag, weak=True)
+        if_range = parse_if_range_header(request.headers.get('If-Range'))
+        response.make_conditional(request, accept_ranges=if_range.etag is None,
+                                  complete_length=os.path.getsize(path))
+    response.cache_control.public = True
+    if request.args.get('v'):
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = config.get('previews.immutable_max_age', 31536000)
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def preview_dimension(name):
+    """?w= / ?h= of a preview request: a positive int or None; anything else is a ValueError (400)"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a positive integer")
+    if value <= 0:
+        raise ValueError(f"'{name}' must be a positive integer")
+    return value
+
+@bp.route('/preview/image/<path:filename>')
 def preview_image(filename):
+    """Serve an image; ?thumb=1 gives the gallery thumbnail, ?w=/?h= a resized WebP copy"""
     try:
-        return send_file(os.path.join(f"{config.local_output_dir}/images", filename))
+        image_path = os.path.join(f"{config.local_output_dir}/images", filename)
+        width = preview_dimension('w')
+        height = preview_dimension('h')
+        if request.args.get('thumb'):
+            return send_preview(preview_cache.thumbnail(image_path), mimetype='image/webp')
+        if width or height:
+            return send_preview(preview_cache.image(image_path, width, height), mimetype='image/webp')
+        return send_preview(image_path)
+    except RequestedRangeNotSatisfiable:
+        raise
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
-@app.route('/preview/video/<path:filename>')
+@bp.route('/preview/video/<path:filename>')
 def preview_video(filename):
+    """Serve a video; ?thumb=1 or ?poster=1 (with optional ?w=/?h=) gives a WebP poster frame"""
     try:
-        return send_file(os.path.join(f"{config.local_output_dir}/videos", filename))
+        video_path = os.path.join(f"{config.local_output_dir}/videos", filename)
+        if request.args.get('thumb') or request.args.get('poster'):
+            # Posters are not worth downloading a GCS-only video for
+            if not os.path.exists(video_path):
+                return jsonify({'error': 'Poster not available until the video is downloaded'}), 404
+            if request.args.get('thumb'):
+                return send_preview(preview_cache.thumbnail(video_path), mimetype='image/webp')
+            return send_preview(preview_cache.video_poster(video_path, preview_dimension('w'),
+                                                           preview_dimension('h')),
+                                mimetype='image/webp')
+        return send_preview(remote_assets.materialize(video_path))
+    except RequestedRangeNotSatisfiable:
+        raise
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
-@app.route('/api/delete-file', methods=['DELETE'])
+@bp.route('/api/delete-file', methods=['DELETE'])
 def delete_file():
     try:
         data = request.json
@@ -622,27 +1159,48 @@ def delete_file():
         if not full_path.startswith(allowed_dir):
             return jsonify({'error': 'Invalid file path'}), 400
 
+        # Files that only exist in GCS are deleted there directly
+        if not os.path.exists(full_path) and remote_assets.lookup(full_path):
+            remote_assets.remove(full_path, delete_remote=True)
+            blob_store.release(full_path)
+            return jsonify({
+                'success': True,
+                'message': f'File {os.path.basename(full_path)} deleted successfully',
+                'deleted_path': file_path
+            })
+
         # Check if file exists
         if not os.path.exists(full_path):
             return jsonify({'error': 'File not found'}), 404
 
-        # Delete the file
+        # Delete the file; its bytes stay on disk while other files share them
         os.remove(full_path)
+        asset_index.discard(full_path)
+        blob = blob_store.release(full_path)
+        gcs_uploads.cancel(full_path)
 
         # Try to delete from GCS if it exists there
         try:
-            filename = os.path.basename(full_path)
-            # Check common GCS paths where the file might be
-            possible_gcs_paths = [
-                f"{GCS_FOLDER}/{filename}",
-                f"{GCS_FOLDER}/uploaded_{filename}",
-            ]
+            if blob is not None and blob['gcs_url']:
+                # Deduplicated content has one GCS copy, removed with its last file
+                if blob['refs'] == 0:
+                    gcs_blob = storage.Blob.from_string(blob['gcs_url'], client=get_storage_client())
+                    retry_policy.call('gcs', gcs_blob.delete)
+                remote_assets.remove(full_path, delete_remote=False)
+            # Veo output written straight to GCS lives under its own object path
+            elif not remote_assets.remove(full_path, delete_remote=True):
+                filename = os.path.basename(full_path)
+                # Check common GCS paths where the file might be
+                possible_gcs_paths = [
+                    f"{GCS_FOLDER}/{filename}",
+                    f"{GCS_FOLDER}/uploaded_{filename}",
+                ]
 
-            for gcs_path in possible_gcs_paths:
-                blob = bucket.blob(gcs_path)
-                if blob.exists():
-                    blob.delete()
-                    break
+                for gcs_path in possible_gcs_paths:
+                    blob = get_bucket().blob(gcs_path)
+                    if retry_policy.call('gcs', blob.exists):
+                        retry_policy.call('gcs', blob.delete)
+                        break
         except Exception as e:
             print(f"GCS deletion failed (non-critical): {e}")
 
@@ -655,54 +1213,179 @@ def delete_file():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-async def generate_video_async(prompt, aspect_ratio, negative_prompt='', resolution='1080p'):
-    max_retries = 5
-    base_wait_time = 60
+def image_file_fingerprint(params):
+    """Identify the current state of an input image so edits of a changed file aren't coalesced"""
+    try:
+        stat = os.stat(params['image_path'])
+        return {'image_state': (stat.st_size, stat.st_mtime_ns)}
+    except OSError:
+        return {}
+
+def image_content_fingerprint(*names):
+    """Cache fingerprint that keys the named image path arguments by file content instead of path"""
+    async def fingerprint(params):
+        return {name: await image_refs.content_hash(params[name]) for name in names}
+    return fingerprint
+
+def video_output_gcs_uri():
+    """GCS prefix Veo should write to in 'gcs' output mode, or None to receive the bytes"""
+    if config.video_output_mode == 'gcs':
+        return f"gs://{GCS_BUCKET_NAME}/{GCS_FOLDER}"
+    return None
+
+async def save_generated_video(generated_video, filename):
+    """
+    Record a Veo result under output/videos and return (local_path, gcs_url).
+    Videos Veo already wrote to GCS are only registered; the local copy is
+    downloaded on first preview or ffmpeg use. Other videos are queued for a
+    background GCS upload, so gcs_url is None until it finishes.
+    """
+    video_filename = f"{config.local_output_dir}/videos/{filename}"
 
-    for attempt in range(max_retries):
+    if generated_video.video.uri and not generated_video.video.video_bytes:
+        size = None
         try:
-            # Build video generation config
-            video_config = types.GenerateVideosConfig(
-                aspect_ratio=aspect_ratio,
-                resolution=resolution,
-                number_of_videos=1,
-                duration_seconds=8,
-                person_generation="allow_all",
-            )
+            blob = storage.Blob.from_string(generated_video.video.uri, client=get_storage_client())
+            await retry_policy.call_async('gcs', asyncio.to_thread, blob.reload)
+            size = blob.size
+        except Exception as e:
+            print(f"Could not read GCS object size: {e}")
 
-            # Add negative prompt if provided
-            if negative_prompt.strip():
-                video_config.negative_prompt = negative_prompt.strip()
+        await asyncio.to_thread(remote_assets.register, video_filename, generated_video.video.uri, size)
+        await asyncio.to_thread(asset_catalog.record, video_filename, gcs_url=generated_video.video.uri, size=size)
+        return video_filename, generated_video.video.uri
 
-            operation = client.models.generate_videos(
-                model=config.video_model_id,
-                prompt=prompt,
-                config=video_config,
-            )
-            break
+    # Save locally; the GCS copy is made in the background
+    video_filename = await write_file_async(video_filename, generated_video.video.video_bytes)
+    await asyncio.to_thread(gcs_uploads.enqueue, video_filename, f"{GCS_FOLDER}/{os.path.basename(video_filename)}")
 
-        except Exception as e:
-            if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                if attempt < max_retries - 1:
-                    wait_time = base_wait_time * (2 ** attempt) + random.uniform(0, 30)
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    return {'error': f'Max retries reached for prompt: {prompt}'}
-            else:
-                raise e
+    return video_filename, None
+
+def retry_service(service):
+    """Retry policy / circuit breaker bucket for a rate limiter service"""
+    return 'veo' if service == 'video_generation' else 'gemini'
 
-    # Wait for completion
-    while not operation.done:
-        await asyncio.sleep(10)
+async def call_model(service, model_id, fn, *args, **kwargs):
+    """Await an async Gemini/Veo call: each attempt waits for the rate limiter, failures go through the shared retry policy"""
+    async def attempt():
+        async with rate_limiter.limit(service, model_id):
+            return await fn(*args, **kwargs)
+
+    return await retry_policy.call_async(retry_service(service), attempt)
+
+async def model_parts(service, model_id, generate, generate_stream, stream=False, **kwargs):
+    """
+    Yield the response parts of a Gemini call in order. With stream=True the
+    streaming API is used and parts are yielded as chunks arrive; only opening
+    the stream is retried, since parts already sent to the browser can't be
+    taken back. The rate limiter slot is held until the stream is finished.
+    """
+    if not stream:
+        response = await call_model(service, model_id, generate, **kwargs)
+        for part in response.candidates[0].content.parts:
+            yield part
+        return
+
+    async def open_stream():
+        # The concurrency slot is kept after opening, until the stream is consumed or closed
+        slot = AsyncExitStack()
+        await slot.enter_async_context(rate_limiter.limit(service, model_id))
         try:
-            operation = client.operations.get(operation)
-        except Exception as e:
-            if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                await asyncio.sleep(60)
+            return slot, await generate_stream(**kwargs)
+        except BaseException:
+            await slot.aclose()
+            raise
+
+    slot, chunks = await retry_policy.call_async(retry_service(service), open_stream)
+    async with slot:
+        async for chunk in chunks:
+            if (
+                chunk.candidates is None
+                or chunk.candidates[0].content is None
+                or chunk.candidates[0].content.parts is None
+            ):
                 continue
-            else:
-                raise e
+            for part in chunk.candidates[0].content.parts:
+                yield part
+
+def strip_code_fence(text):
+    """Remove a surrounding ```json ... ``` markdown fence from a model's JSON answer"""
+    text = (text or '').strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        if text.rstrip().endswith('```'):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+async def read_file_async(path):
+    """Read a file's bytes without blocking the event loop"""
+    return await asyncio.to_thread(Path(path).read_bytes)
+
+def store_output(path, sha256=None, origin=None):
+    """Record a finished output file in the asset index and catalog and store it by content"""
+    asset_index.add(path)
+    asset_catalog.record(path, origin=origin)
+    blob = blob_store.adopt(path, sha256)
+    preview_cache.pregenerate(path)
+    return blob
+
+def discard_outputs(paths):
+    """Delete output files nobody will see (e.g. from a cancelled attempt) and forget them"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        asset_index.discard(path)
+        blob_store.release(path)
+
+def write_file(path, data):
+    """
+    Write bytes to a new file and record it in the asset index and catalog.
+    Returns the path actually used, which gets a _N suffix if path was taken.
+    """
+    path = blob_store.reserve(path)
+    try:
+        Path(path).write_bytes(data)
+    except Exception:
+        os.remove(path)
+        raise
+    store_output(path, hashlib.sha256(data).hexdigest())
+    return path
+
+async def write_file_async(path, data):
+    """Write bytes to a new file without blocking the event loop; returns the path used"""
+    return await asyncio.to_thread(write_file, path, data)
+
+@request_coalescer.coalesce('generate-video')
+async def generate_video_async(prompt, aspect_ratio, negative_prompt='', resolution='1080p'):
+    # Build video generation config
+    video_config = types.GenerateVideosConfig(
+        aspect_ratio=aspect_ratio,
+        resolution=resolution,
+        number_of_videos=1,
+        duration_seconds=8,
+        person_generation="allow_all",
+    )
+
+    # Add negative prompt if provided
+    if negative_prompt.strip():
+        video_config.negative_prompt = negative_prompt.strip()
+
+    # In GCS output mode Veo writes the video straight to the bucket
+    video_config.output_gcs_uri = video_output_gcs_uri()
+
+    # 429s and transient failures are retried by the shared retry policy
+    operation = await call_model(
+        'video_generation', config.video_model_id,
+        get_client().aio.models.generate_videos,
+        model=config.video_model_id,
+        prompt=prompt,
+        config=video_config,
+    )
+
+    # Wait for completion (polled centrally, shared backoff on 429)
+    operation = await operation_poller.wait(operation, config.video_model_id, resolution)
 
     if not operation.response or not operation.response.generated_videos:
         return {'error': 'No videos were generated'}
@@ -710,34 +1393,24 @@ async def generate_video_async(prompt, aspect_ratio, negative_prompt='', resolut
     generated_video = operation.response.generated_videos[0]
     timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
 
-    # Save locally
-    video_filename = f"{config.local_output_dir}/videos/{prompt[:10]}_{timestamp}.mp4"
-    with open(video_filename, 'wb') as f:
-        f.write(generated_video.video.video_bytes)
-
-    # Upload to GCS
-    gcs_path = f"{GCS_FOLDER}/{prompt[:10]}_{timestamp}.mp4"
-    blob = bucket.blob(gcs_path)
-
-    try:
-        blob.upload_from_filename(video_filename)
-        gcs_url = f"gs://{config.gcs_bucket_name}/{gcs_path}"
-    except Exception as e:
-        gcs_url = None
+    video_filename, gcs_url = await save_generated_video(generated_video, f"{prompt[:10]}_{timestamp}.mp4")
 
     return {
         'success': True,
         'local_path': video_filename,
         'gcs_url': gcs_url,
+        'materialized': os.path.exists(video_filename),
         'prompt': prompt
     }
 
-async def generate_image_async(prompt, candidate_count=1):
+@request_coalescer.coalesce('generate-image')
+async def generate_image_async(prompt, candidate_count=1, seed=None, variant_index=None):
     try:
         # Use Gemini 2.5 Flash Image for enhanced generation
         generate_content_config = types.GenerateContentConfig(
             response_modalities=["TEXT", "IMAGE"],
             candidate_count=candidate_count,
+            seed=seed,
             safety_settings=[
                 {
                     "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
@@ -747,27 +1420,36 @@ async def generate_image_async(prompt, candidate_count=1):
         )
 
         # Use API client for gemini-2.5-flash-image-preview
-        response = api_client.models.generate_content(
+        response = await call_model(
+            'image_generation', "gemini-2.5-flash-image-preview",
+            get_api_client().aio.models.generate_content,
             model="gemini-2.5-flash-image-preview",
             contents=prompt,
             config=generate_content_config
         )
 
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        # Variants generated in the same second need distinct file names
+        name_prefix = f"generated_{timestamp}" if variant_index is None else f"generated_{timestamp}_v{variant_index}"
         generated_images = []
+        image_data = []
 
-        # Process all generated parts
-        for part in response.candidates[0].content.parts:
-            if part.inline_data and part.inline_data.data:
-                file_index = len(generated_images)
-                file_extension = mimetypes.guess_extension(part.inline_data.mime_type) or '.png'
-                image_filename = f"{config.local_output_dir}/images/generated_{timestamp}_{file_index}{file_extension}"
+        # Process the generated parts of every candidate
+        for candidate in response.candidates or []:
+            if candidate.content is None or candidate.content.parts is None:
+                continue
+            for part in candidate.content.parts:
+                if part.inline_data and part.inline_data.data:
+                    file_index = len(generated_images)
+                    file_extension = mimetypes.guess_extension(part.inline_data.mime_type) or '.png'
+                    image_filename = f"{config.local_output_dir}/images/{name_prefix}_{file_index}{file_extension}"
 
-                # Save the image
-                with open(image_filename, 'wb') as f:
-                    f.write(part.inline_data.data)
+                    generated_images.append(image_filename)
+                    image_data.append(part.inline_data.data)
 
-                generated_images.append(image_filename)
+        # Save the images
+        generated_images = list(await asyncio.gather(*(write_file_async(filename, data)
+                                                       for filename, data in zip(generated_images, image_data))))
 
         if generated_images:
             return {
@@ -775,7 +1457,8 @@ async def generate_image_async(prompt, candidate_count=1):
                 'local_path': generated_images[0],  # Primary image
                 'all_images': generated_images,
                 'image_count': len(generated_images),
-                'prompt': prompt
+                'prompt': prompt,
+                'seed': seed
             }
         else:
             return {'error': 'No images were generated'}
@@ -783,12 +1466,51 @@ async def generate_image_async(prompt, candidate_count=1):
     except Exception as e:
         return {'error': str(e)}
 
-async def edit_image_async(image_path, edit_prompt):
-    try:
-        # Read the image
-        with open(image_path, 'rb') as f:
-            image_bytes = f.read()
+async def generate_image_variants_async(prompt, variants=4, seeds=None, candidate_count=1):
+    """
+    Generate several variants of one prompt concurrently, one model call per seed.
+    Calls share the image_generation rate limits; when run as a job each finished
+    variant is published as job progress so the browser can show it straight away.
+    """
+    if not seeds:
+        seeds = [random.randrange(2 ** 31) for _ in range(variants)]
 
+    tasks = [
+        asyncio.ensure_future(generate_image_async(prompt, candidate_count, seed=seed, variant_index=index))
+        for index, seed in enumerate(seeds)
+    ]
+
+    results = []
+    all_images = []
+    for finished in asyncio.as_completed(tasks):
+        result = await finished
+        results.append(result)
+        all_images.extend(result.get('all_images', []))
+        job_manager.publish_progress(completed=len(results), total=len(tasks), all_images=list(all_images))
+
+    succeeded = [result for result in results if not result.get('error')]
+    if not succeeded:
+        return {'error': results[0].get('error', 'No images were generated'), 'variants': results}
+
+    # Report variants in seed order
+    succeeded.sort(key=lambda result: seeds.index(result['seed']))
+    all_images = [path for result in succeeded for path in result['all_images']]
+    return {
+        'success': True,
+        'local_path': all_images[0],
+        'all_images': all_images,
+        'image_count': len(all_images),
+        'prompt': prompt,
+        'variants': [
+            {'seed': result['seed'], 'images': result['all_images']}
+            for result in succeeded
+        ],
+        'failed_variants': len(results) - len(succeeded)
+    }
+
+@request_coalescer.coalesce('edit-image', fingerprint=image_file_fingerprint)
+async def edit_image_async(image_path, edit_prompt, emit=None):
+    try:
         # Detect mime type
         mime_type, _ = mimetypes.guess_type(image_path)
         if not mime_type or not mime_type.startswith('image/'):
@@ -796,12 +1518,18 @@ async def edit_image_async(image_path, edit_prompt):
 
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
 
+        # Use API client for gemini-2.5-flash-image-preview
+        active_client = get_api_client() if config.image_edit_model_id == "gemini-2.5-flash-image-preview" else get_client()
+
+        # Retries of the same edit reuse the uploaded image instead of resending its bytes
+        image_part = await image_refs.part_for_file(active_client, image_path, mime_type)
+
         # Create content following your exact pattern
         contents = [
             types.Content(
                 role="user",
                 parts=[
-                    types.Part.from_bytes(data=image_bytes, mime_type=mime_type),
+                    image_part,
                     types.Part.from_text(text=edit_prompt),
                 ],
             ),
@@ -814,45 +1542,46 @@ async def edit_image_async(image_path, edit_prompt):
             ],
         )
 
-        # Use streaming following your exact pattern
         edited_images = []
         description = ""
         file_index = 0
 
-        # Use API client for gemini-2.5-flash-image-preview
-        active_client = api_client if config.image_edit_model_id == "gemini-2.5-flash-image-preview" else client
-
-        for chunk in active_client.models.generate_content_stream(
+        # Streaming callers get each part as it arrives; otherwise the call is retried as a whole
+        parts = model_parts(
+            'image_editing', config.image_edit_model_id,
+            active_client.aio.models.generate_content,
+            active_client.aio.models.generate_content_stream,
+            stream=emit is not None,
             model=config.image_edit_model_id,
             contents=contents,
             config=generate_content_config,
-        ):
-            if (
-                chunk.candidates is None
-                or chunk.candidates[0].content is None
-                or chunk.candidates[0].content.parts is None
-            ):
-                continue
-
-            if chunk.candidates[0].content.parts[0].inline_data and chunk.candidates[0].content.parts[0].inline_data.data:
-                file_name = f"edited_{timestamp}_{file_index}"
-                file_index += 1
-                inline_data = chunk.candidates[0].content.parts[0].inline_data
-                data_buffer = inline_data.data
-                file_extension = mimetypes.guess_extension(inline_data.mime_type)
-
-                # Save to output directory
-                edited_image_filename = f"{config.local_output_dir}/images/{file_name}{file_extension}"
-
-                with open(edited_image_filename, 'wb') as f:
-                    f.write(data_buffer)
+        )
 
-                edited_images.append(edited_image_filename)
-                print(f"Image saved to: {edited_image_filename}")
-            else:
-                if hasattr(chunk, 'text') and chunk.text:
-                    description += chunk.text
-                    print(chunk.text)
+        try:
+            async for part in parts:
+                if part.inline_data and part.inline_data.data:
+                    file_name = f"edited_{timestamp}_{file_index}"
+                    file_index += 1
+                    file_extension = mimetypes.guess_extension(part.inline_data.mime_type)
+
+                    # Save to output directory
+                    edited_image_filename = f"{config.local_output_dir}/images/{file_name}{file_extension}"
+
+                    edited_image_filename = await write_file_async(edited_image_filename, part.inline_data.data)
+
+                    edited_images.append(edited_image_filename)
+                    print(f"Image saved to: {edited_image_filename}")
+                    if emit:
+                        await emit('image', {'path': edited_image_filename})
+                elif part.text:
+                    description += part.text
+                    print(part.text)
+                    if emit:
+                        await emit('text', {'text': part.text})
+        except asyncio.CancelledError:
+            # An abandoned edit (lost speculative attempt, client gone) leaves no half-finished output
+            discard_outputs(edited_images)
+            raise
 
         return {
             'success': True,
@@ -865,20 +1594,29 @@ async def edit_image_async(image_path, edit_prompt):
     except Exception as e:
         return {'error': str(e)}
 
-async def validate_image_edit_async(original_image_path, edited_description, edit_prompt):
+@response_cache.cached('validate-image-edit', version=2, model_id=lambda: config.image_edit_model_id,
+                       fingerprint=image_content_fingerprint('original_image_path'))
+async def validate_image_edit_async(original_image_path, edited_description, edit_prompt, attempt_prompt=None):
     """
-    Validate if the image edit matches the requested prompt using Gemini
+    Validate if the image edit matches the requested prompt using Gemini.
+    This is a fused judge call: on failure it also returns the enhanced prompt
+    for the next attempt, so the retry loop usually needs no separate enhancement call.
     """
     try:
-        # Read the original image
-        with open(original_image_path, 'rb') as f:
-            image_bytes = f.read()
+        # The original image is uploaded once and referenced on every validation round
+        mime_type, _ = mimetypes.guess_type(original_image_path)
+        if not mime_type or not mime_type.startswith('image/'):
+            mime_type = "image/png"
+        image_part = await image_refs.part_for_file(get_client(), original_image_path, mime_type)
+
+        attempt_prompt = attempt_prompt or edit_prompt
+        attempt_line = f'PROMPT USED FOR THIS ATTEMPT: "{attempt_prompt}"\n' if attempt_prompt != edit_prompt else ''
 
         validation_prompt = f"""
-You are an expert at analyzing image editing results. Please analyze the following:
+You are an expert at analyzing image editing results and at writing effective image editing prompts. Please analyze the following:
 
 ORIGINAL EDIT REQUEST: "{edit_prompt}"
-EDIT RESULT DESCRIPTION: "{edited_description}"
+{attempt_line}EDIT RESULT DESCRIPTION: "{edited_description}"
 
 Please provide a JSON response with the following format:
 {{
@@ -886,7 +1624,7 @@ Please provide a JSON response with the following format:
     "confidence_score": 0.0-1.0,
     "analysis": "Brief explanation of whether the edit matches the request",
     "suggested_improvements": "If validation failed, suggest specific improvements to the prompt",
-    "enhanced_prompt": "If validation failed, provide an improved version of the original prompt"
+    "enhanced_prompt": "If validation failed, an improved prompt for the next attempt: more specific, clear and actionable, and fixing what this attempt got wrong"
 }}
 
 Focus on whether the described changes actually address what was requested in the original edit prompt.
@@ -897,20 +1635,22 @@ Focus on whether the described changes actually address what was requested in th
                 role="user",
                 parts=[
                     types.Part.from_text(text=validation_prompt),
-                    types.Part.from_bytes(data=image_bytes, mime_type="image/png")
+                    image_part
                 ]
             )
         ]
 
-        response = client.models.generate_content(
+        response = await call_model(
+            'image_editing', config.image_edit_model_id,
+            get_client().aio.models.generate_content,
             model=config.image_edit_model_id,
             contents=contents
         )
 
-        # Try to parse JSON response
+        # Try to parse JSON response (the model sometimes wraps it in a markdown code block)
         try:
             import json
-            result = json.loads(response.text)
+            result = json.loads(strip_code_fence(response.text))
             return result
         except json.JSONDecodeError:
             # If JSON parsing fails, return a structured response
@@ -920,7 +1660,8 @@ Focus on whether the described changes actually address what was requested in th
                 'analysis': 'Could not parse validation response',
                 'suggested_improvements': 'Try being more specific in your edit request',
                 'enhanced_prompt': edit_prompt,
-                'raw_response': response.text
+                'raw_response': response.text,
+                'fallback': True
             }
 
     except Exception as e:
@@ -929,9 +1670,11 @@ Focus on whether the described changes actually address what was requested in th
             'confidence_score': 0.0,
             'analysis': f'Validation failed: {str(e)}',
             'suggested_improvements': 'Try a different approach',
-            'enhanced_prompt': edit_prompt
+            'enhanced_prompt': edit_prompt,
+            'fallback': True
         }
 
+@response_cache.cached('enhance-edit-prompt', version=1, model_id=lambda: config.prompt_refine_model_id)
 async def enhance_edit_prompt_async(original_prompt, failure_reason=""):
     """
     Enhance an image edit prompt using Gemini to make it more effective
@@ -958,7 +1701,9 @@ Please provide a JSON response with:
 }}
 """
 
-        response = client.models.generate_content(
+        response = await call_model(
+            'prompt_refinement', config.prompt_refine_model_id,
+            get_client().aio.models.generate_content,
             model=config.prompt_refine_model_id,
             contents=[types.Content(
                 role="user",
@@ -974,20 +1719,27 @@ Please provide a JSON response with:
             return {
                 'enhanced_prompt': original_prompt + " (please be more specific)",
                 'explanation': 'Could not parse enhancement response',
-                'key_changes': ['Made prompt more specific']
+                'key_changes': ['Made prompt more specific'],
+                'fallback': True
             }
 
     except Exception as e:
         return {
             'enhanced_prompt': original_prompt,
             'explanation': f'Enhancement failed: {str(e)}',
-            'key_changes': []
+            'key_changes': [],
+            'fallback': True
         }
 
-async def edit_image_with_validation_async(image_path, edit_prompt, max_retries=5):
+async def edit_image_with_validation_async(image_path, edit_prompt, max_retries=5, parallel_attempts=1):
     """
-    Edit image with AI validation and automatic retry with enhanced prompts
+    Edit image with AI validation and automatic retry with enhanced prompts.
+    With parallel_attempts > 1 the attempts run speculatively instead of in sequence.
     """
+    if parallel_attempts > 1:
+        return await speculative_edit_with_validation_async(image_path, edit_prompt, min(parallel_attempts, max_retries),
+                                                            max_retries)
+
     attempts = []
     current_prompt = edit_prompt
 
@@ -1022,7 +1774,8 @@ async def edit_image_with_validation_async(image_path, edit_prompt, max_retries=
             validation_result = await validate_image_edit_async(
                 image_path,
                 edit_result.get('description', ''),
-                edit_prompt
+                edit_prompt,
+                current_prompt
             )
 
             # Store attempt information
@@ -1048,11 +1801,24 @@ async def edit_image_with_validation_async(image_path, edit_prompt, max_retries=
 
             # If validation failed but we have retries left, enhance prompt
             if attempt < max_retries - 1:
-                print("⚠️ Validation failed, enhancing prompt...")
-                enhancement_result = await enhance_edit_prompt_async(
-                    current_prompt,
-                    validation_result.get('analysis', 'Validation failed')
-                )
+                # Fallback answers (unparseable or failed judge calls) echo the original prompt back
+                judged_prompt = None if validation_result.get('fallback') else validation_result.get('enhanced_prompt')
+                if (isinstance(judged_prompt, str) and judged_prompt.strip()
+                        and judged_prompt.strip() != current_prompt.strip()):
+                    # The judge already wrote the next prompt; skip the extra round trip
+                    print("⚠️ Validation failed, retrying with the validator's enhanced prompt...")
+                    enhancement_result = {
+                        'enhanced_prompt': judged_prompt.strip(),
+                        'explanation': validation_result.get('suggested_improvements') or 'Improved by the validation step',
+                        'key_changes': [],
+                        'source': 'validation'
+                    }
+                else:
+                    print("⚠️ Validation failed, enhancing prompt...")
+                    enhancement_result = await enhance_edit_prompt_async(
+                        current_prompt,
+                        validation_result.get('analysis', 'Validation failed')
+                    )
                 current_prompt = enhancement_result.get('enhanced_prompt', current_prompt)
                 attempts[-1]['enhancement'] = enhancement_result
 
@@ -1074,11 +1840,138 @@ async def edit_image_with_validation_async(image_path, edit_prompt, max_retries=
         'suggestion': 'Try a different editing approach or more specific prompt'
     }
 
+async def edit_prompt_variants_async(edit_prompt, count):
+    """
+    Ask Gemini for up to `count` differently worded versions of an edit prompt.
+    The original prompt is always the first variant. Duplicates are dropped, so
+    fewer than `count` come back if the model repeats itself or fails.
+    """
+    variants = [edit_prompt]
+    if count <= 1:
+        return variants
+
+    variants_prompt = f"""
+You are an expert at writing effective image editing prompts. Rewrite the following prompt in {count - 1} different ways.
+Each version should be specific, clear and actionable for AI image editing, and take a different angle on the wording.
+
+ORIGINAL PROMPT: "{edit_prompt}"
+
+Please provide a JSON response with:
+{{
+    "variants": ["first rewritten prompt", "second rewritten prompt"]
+}}
+"""
+
+    try:
+        response = await call_model(
+            'prompt_refinement', config.prompt_refine_model_id,
+            get_client().aio.models.generate_content,
+            model=config.prompt_refine_model_id,
+            contents=[types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=variants_prompt)]
+            )],
+            config=types.GenerateContentConfig(response_mime_type="application/json")
+        )
+        for variant in json.loads(response.text).get('variants', []):
+            if isinstance(variant, str) and variant.strip() and variant.strip() not in variants:
+                variants.append(variant.strip())
+    except Exception as e:
+        print(f"⚠️ Could not create prompt variants: {e}")
+
+    return variants[:count]
+
+async def speculative_edit_with_validation_async(image_path, edit_prompt, parallel_attempts=3, max_retries=5):
+    """
+    Speculative version of the validated edit loop: run one edit per distinct
+    prompt variant concurrently, validate each result as it lands, return the
+    first one that passes and cancel the rest. If none passes, the remaining
+    retries go through the sequential loop.
+    """
+    prompts = await edit_prompt_variants_async(edit_prompt, parallel_attempts)
+    print(f"🚀 Running {len(prompts)} speculative edit attempts in parallel")
+
+    async def attempt(number, prompt):
+        # fresh=True: every attempt is its own model call, never coalesced with a sibling
+        edit_result = await edit_image_async(image_path, prompt, fresh=True)
+        if edit_result.get('error'):
+            return {'attempt': number, 'prompt': prompt, 'result': 'failed', 'error': edit_result['error']}
+
+        try:
+            validation_result = await validate_image_edit_async(
+                image_path,
+                edit_result.get('description', ''),
+                edit_prompt,
+                prompt
+            )
+        except asyncio.CancelledError:
+            # Another attempt won; this one's images are never returned
+            discard_outputs(edit_result.get('edited_images', []))
+            raise
+        return {
+            'attempt': number,
+            'prompt': prompt,
+            'result': 'success',
+            'edit_result': edit_result,
+            'validation': validation_result
+        }
+
+    tasks = [asyncio.ensure_future(attempt(number, prompt)) for number, prompt in enumerate(prompts, 1)]
+    attempts = []
+    try:
+        for finished in asyncio.as_completed(tasks):
+            try:
+                record = await finished
+            except Exception as e:
+                attempts.append({'result': 'error', 'error': str(e)})
+                continue
+
+            attempts.append(record)
+            validation_result = record.get('validation') or {}
+            if validation_result.get('validation_passed', False) and validation_result.get('confidence_score', 0) > 0.7:
+                print(f"🎉 Validation passed on speculative attempt {record['attempt']}")
+                return {
+                    'success': True,
+                    'final_result': record['edit_result'],
+                    'validation': validation_result,
+                    'attempts': attempts,
+                    'total_attempts': len(attempts),
+                    'final_prompt': record['prompt'],
+                    'speculative': True
+                }
+    finally:
+        # Stop edits and validations that are still running
+        for task in tasks:
+            task.cancel()
+
+    remaining = max_retries - len(prompts)
+    if not any(record.get('result') == 'success' for record in attempts):
+        # Nothing came back at all (e.g. every call errored); give the sequential loop a go regardless
+        remaining = max(remaining, 1)
+    if remaining > 0:
+        print(f"⚠️ No speculative attempt passed, continuing with {remaining} sequential attempt(s)")
+        result = await edit_image_with_validation_async(image_path, edit_prompt, remaining)
+        return {
+            **result,
+            'attempts': attempts + result['attempts'],
+            'total_attempts': len(attempts) + result['total_attempts'],
+            'speculative': True
+        }
+
+    return {
+        'success': False,
+        'error': 'Failed to achieve satisfactory edit result after maximum retries',
+        'attempts': attempts,
+        'total_attempts': len(attempts),
+        'final_prompt': edit_prompt,
+        'suggestion': 'Try a different editing approach or more specific prompt',
+        'speculative': True
+    }
+
 async def generate_video_from_image_async(prompt, image_path, aspect_ratio, negative_prompt='', resolution='1080p'):
     try:
         # Read the image
-        with open(image_path, 'rb') as f:
-            image_bytes = f.read()
+        image_bytes = await read_file_async(image_path)
 
         image_data = types.Image(
             image_bytes=image_bytes,
@@ -1098,17 +1991,20 @@ async def generate_video_from_image_async(prompt, image_path, aspect_ratio, nega
         if negative_prompt.strip():
             video_config.negative_prompt = negative_prompt.strip()
 
-        operation = client.models.generate_videos(
+        # In GCS output mode Veo writes the video straight to the bucket
+        video_config.output_gcs_uri = video_output_gcs_uri()
+
+        operation = await call_model(
+            'video_generation', config.video_model_id,
+            get_client().aio.models.generate_videos,
             model=config.video_model_id,
             prompt=prompt,
             image=image_data,
             config=video_config,
         )
 
-        # Wait for completion
-        while not operation.done:
-            await asyncio.sleep(10)
-            operation = client.operations.get(operation)
+        # Wait for completion (polled centrally, shared backoff on 429)
+        operation = await operation_poller.wait(operation, config.video_model_id, resolution)
 
         if not operation.response or not operation.response.generated_videos:
             return {'error': 'No videos were generated'}
@@ -1116,24 +2012,13 @@ async def generate_video_from_image_async(prompt, image_path, aspect_ratio, nega
         generated_video = operation.response.generated_videos[0]
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
 
-        video_filename = f"{config.local_output_dir}/videos/from_image_{timestamp}.mp4"
-        with open(video_filename, 'wb') as f:
-            f.write(generated_video.video.video_bytes)
-
-        # Upload to GCS
-        gcs_path = f"{GCS_FOLDER}/from_image_{timestamp}.mp4"
-        blob = bucket.blob(gcs_path)
-
-        try:
-            blob.upload_from_filename(video_filename)
-            gcs_url = f"gs://{config.gcs_bucket_name}/{gcs_path}"
-        except:
-            gcs_url = None
+        video_filename, gcs_url = await save_generated_video(generated_video, f"from_image_{timestamp}.mp4")
 
         return {
             'success': True,
             'local_path': video_filename,
             'gcs_url': gcs_url,
+            'materialized': os.path.exists(video_filename),
             'prompt': prompt,
             'source_image': image_path
         }
@@ -1141,6 +2026,7 @@ async def generate_video_from_image_async(prompt, image_path, aspect_ratio, nega
     except Exception as e:
         return {'error': str(e)}
 
+@response_cache.cached('refine-prompt', version=1, model_id=lambda: config.prompt_refine_model_id)
 async def refine_prompt_with_gemini(original_prompt, focus='general'):
     try:
         # Create focus-specific instructions
@@ -1203,7 +2089,9 @@ Format your response as JSON:
 """
 
         # Use Gemini to refine the prompt
-        response = client.models.generate_content(
+        response = await call_model(
+            'prompt_refinement', config.prompt_refine_model_id,
+            get_client().aio.models.generate_content,
             model=config.prompt_refine_model_id,
             contents=[types.Content(
                 role="user",
@@ -1229,7 +2117,8 @@ Format your response as JSON:
                 'original_prompt': original_prompt,
                 'refined_prompt': response.text,
                 'explanation': 'Raw response from Gemini (JSON parsing failed)',
-                'alternatives': []
+                'alternatives': [],
+                'fallback': True
             }
 
     except Exception as e:
@@ -1237,18 +2126,22 @@ Format your response as JSON:
 
 def join_videos_ffmpeg(video_paths):
     try:
+        # Download any GCS-only inputs (concurrently) before handing them to ffmpeg
+        failed = {path: error for path, error in remote_assets.materialize_many(video_paths).items() if error}
+        if failed:
+            return {'error': f'Could not download input videos: {failed}'}
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        output_path = f"output/videos/joined_{timestamp}.mp4"
+        output_path = blob_store.reserve(f"output/videos/joined_{timestamp}.mp4")
 
         # Create file list for ffmpeg
-        list_file = f"temp/video_list_{timestamp}.txt"
+        list_file = f"temp/video_list_{os.path.basename(output_path)}.txt"
         with open(list_file, 'w') as f:
             for video_path in video_paths:
                 f.write(f"file '{os.path.abspath(video_path)}'\n")
 
         # Run ffmpeg command
         cmd = [
-            'ffmpeg', '-f', 'concat', '-safe', '0',
+            'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
             '-i', list_file, '-c', 'copy', output_path
         ]
 
@@ -1258,12 +2151,17 @@ def join_videos_ffmpeg(video_paths):
         os.remove(list_file)
 
         if result.returncode == 0:
+            store_output(output_path, origin='/api/join-videos')
+            # Joined videos can be large; they go to GCS in parallel chunks in the background
+            gcs_uploads.enqueue(output_path, f"{GCS_FOLDER}/{os.path.basename(output_path)}")
             return {
                 'success': True,
                 'output_path': output_path,
-                'input_videos': video_paths
+                'input_videos': video_paths,
+                'upload_state': 'pending'
             }
         else:
+            os.remove(output_path)
             return {'error': f'FFmpeg error: {result.stderr}'}
 
     except Exception as e:
@@ -1271,6 +2169,7 @@ def join_videos_ffmpeg(video_paths):
 
 def extract_frames_ffmpeg(video_path):
     try:
+        video_path = remote_assets.materialize(video_path)
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
         frames_dir = f"output/frames_{timestamp}"
         os.makedirs(frames_dir, exist_ok=True)
@@ -1299,24 +2198,27 @@ def extract_frames_ffmpeg(video_path):
 
 def extract_first_frame_ffmpeg(video_path):
     try:
+        video_path = remote_assets.materialize(video_path)
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        frame_filename = f"{config.local_output_dir}/images/first_frame_{timestamp}.png"
+        frame_filename = blob_store.reserve(f"{config.local_output_dir}/images/first_frame_{timestamp}.png")
 
         # Extract first frame
         cmd = [
-            'ffmpeg', '-i', video_path, '-vframes', '1', '-q:v', '2',
+            'ffmpeg', '-y', '-i', video_path, '-vframes', '1', '-q:v', '2',
             frame_filename
         ]
 
         result = subprocess.run(cmd, capture_output=True, text=True)
 
         if result.returncode == 0:
+            store_output(frame_filename, origin='/api/extract-first-frame')
             return {
                 'success': True,
                 'frame_path': frame_filename,
                 'frame_type': 'first'
             }
         else:
+            os.remove(frame_filename)
             return {'error': f'FFmpeg error: {result.stderr}'}
 
     except Exception as e:
@@ -1324,6 +2226,7 @@ def extract_first_frame_ffmpeg(video_path):
 
 def extract_last_frame_ffmpeg(video_path):
     try:
+        video_path = remote_assets.materialize(video_path)
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
         frame_filename = f"{config.local_output_dir}/images/last_frame_{timestamp}.png"
 
@@ -1346,33 +2249,37 @@ def extract_last_frame_ffmpeg(video_path):
             return {'error': 'Invalid video duration'}
 
         # Extract last frame
+        frame_filename = blob_store.reserve(frame_filename)
         cmd = [
-            'ffmpeg', '-ss', str(seek_time), '-i', video_path,
+            'ffmpeg', '-y', '-ss', str(seek_time), '-i', video_path,
             '-vframes', '1', '-q:v', '2', frame_filename
         ]
 
         result = subprocess.run(cmd, capture_output=True, text=True)
 
         if result.returncode == 0:
+            store_output(frame_filename, origin='/api/extract-last-frame')
             return {
                 'success': True,
                 'frame_path': frame_filename,
                 'frame_type': 'last'
             }
         else:
+            os.remove(frame_filename)
             return {'error': f'FFmpeg error: {result.stderr}'}
 
     except Exception as e:
         return {'error': str(e)}
 
-@app.route('/api/mix-image-styles', methods=['POST'])
+@bp.route('/api/mix-image-styles', methods=['POST'])
 def mix_image_styles():
+    return run_handler(handle_mix_image_styles)
+
+async def handle_mix_image_styles(data):
     """Mix styles from multiple images using Gemini"""
     try:
-        data = request.get_json()
-
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return {'error': 'No data provided'}, 400
 
         # Support both 'image_paths' and 'images' for compatibility
         image_paths = data.get('image_paths', data.get('images', []))
@@ -1380,90 +2287,21 @@ def mix_image_styles():
         mixing_mode = data.get('mixing_mode', data.get('mode', 'analyze'))
 
         if not image_paths:
-            return jsonify({'error': 'No images provided'}), 400
+            return {'error': 'No images provided'}, 400
 
         if len(image_paths) > 5:
-            return jsonify({'error': 'Maximum 5 images allowed'}), 400
+            return {'error': 'Maximum 5 images allowed'}, 400
 
         # Validate that all image files exist
+        full_paths = []
         for image_path in image_paths:
-            # Try multiple possible paths with fallback
-            possible_paths = [
-                image_path,  # Use as-is (for absolute paths or correct relative paths)
-                os.path.join(config.local_output_dir, image_path),  # Join with output dir
-                os.path.join(os.getcwd(), image_path),  # Join with current working directory
-                os.path.join(os.getcwd(), config.local_output_dir, image_path),  # Full path from cwd
-            ]
-
-            # If path starts with output/, also try without the output prefix
-            if image_path.startswith('output/'):
-                relative_path = image_path[7:]  # Remove 'output/' prefix
-                possible_paths.extend([
-                    relative_path,
-                    os.path.join(config.local_output_dir, relative_path),
-                    os.path.join(os.getcwd(), config.local_output_dir, relative_path),
-                ])
-
-            # Find the first path that exists
-            full_path = None
-            for try_path in possible_paths:
-                if os.path.exists(try_path):
-                    full_path = try_path
-                    print(f"✅ Found image at: {full_path}")
-                    break
-
+            full_path = await asyncio.to_thread(asset_index.resolve, image_path)
             if not full_path:
-                # Debug: show all attempted paths
-                print(f"❌ Could not find image: {image_path}")
-                print(f"❌ Tried paths: {possible_paths}")
-                return jsonify({'error': f'Image not found: {image_path}. Tried: {possible_paths}'}), 404
-
-        # Prepare content for Gemini
-        contents = []
-
-        # Add images to the content
-        for i, image_path in enumerate(image_paths):
-            # Try multiple possible paths with fallback (same logic as validation)
-            possible_paths = [
-                image_path,  # Use as-is
-                os.path.join(config.local_output_dir, image_path),  # Join with output dir
-                os.path.join(os.getcwd(), image_path),  # Join with current working directory
-                os.path.join(os.getcwd(), config.local_output_dir, image_path),  # Full path from cwd
-            ]
-
-            # If path starts with output/, also try without the output prefix
-            if image_path.startswith('output/'):
-                relative_path = image_path[7:]  # Remove 'output/' prefix
-                possible_paths.extend([
-                    relative_path,
-                    os.path.join(config.local_output_dir, relative_path),
-                    os.path.join(os.getcwd(), config.local_output_dir, relative_path),
-                ])
-
-            # Find the first path that exists
-            full_path = None
-            for try_path in possible_paths:
-                if os.path.exists(try_path):
-                    full_path = try_path
-                    break
-
-            if not full_path:
-                # This shouldn't happen since we validated earlier, but just in case
-                raise FileNotFoundError(f"Image not found: {image_path}")
-
-            with open(full_path, 'rb') as f:
-                image_data = f.read()
-
-            # Get file extension from the actual file path
-            file_extension = full_path.split('.')[-1].lower()
-            mime_type = f"image/{file_extension}"
-            if file_extension == 'jpg':
-                mime_type = "image/jpeg"
+                return {'error': f'Image not found: {image_path}'}, 404
+            full_paths.append(full_path)
 
-            contents.append(types.Part.from_bytes(
-                data=image_data,
-                mime_type=mime_type
-            ))
+        # Use API client for gemini-2.5-flash-image-preview
+        active_client = get_api_client() if config.image_edit_model_id == "gemini-2.5-flash-image-preview" else get_client()
 
         # Create the analysis prompt based on mixing mode
         if mixing_mode == 'analyze':
@@ -1561,29 +2399,44 @@ Please provide detailed guidance in JSON format:
 }}
 """
 
-        # Add the text prompt (following official examples)
-        contents.append(prompt)
-
-        # Call Gemini API with config (following the exact format from your example)
-        generate_content_config = types.GenerateContentConfig(
-            response_modalities=["TEXT"],
-            candidate_count=1,
-            safety_settings=[
-                {
-                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                }
-            ]
-        )
-
-        # Use API client for gemini-2.5-flash-image-preview
-        active_client = api_client if config.image_edit_model_id == "gemini-2.5-flash-image-preview" else client
+        async def analyze_styles():
+            # Add images to the content (loaded concurrently and downscaled to the configured max edge)
+            contents = await image_prep.parts(active_client, full_paths)
+
+            # Add the text prompt (following official examples)
+            contents.append(prompt)
+
+            # Call Gemini API with config (following the exact format from your example)
+            generate_content_config = types.GenerateContentConfig(
+                response_modalities=["TEXT"],
+                candidate_count=1,
+                safety_settings=[
+                    {
+                        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                    }
+                ]
+            )
 
-        response = active_client.models.generate_content(
-            model=config.image_edit_model_id,
-            contents=contents,
-            config=generate_content_config
-        )
+            response = await call_model(
+                'image_editing', config.image_edit_model_id,
+                active_client.aio.models.generate_content,
+                model=config.image_edit_model_id,
+                contents=contents,
+                config=generate_content_config
+            )
+            return response.text
+
+        if mixing_mode in ('analyze', 'guide'):
+            # Analysis and guidance depend only on the images and the request, so repeats come from the cache
+            image_hashes = await asyncio.gather(*[image_refs.content_hash(path) for path in full_paths])
+            response_text, cache_hit = await response_cache.get_or_compute(
+                'mix-image-styles', 1, config.image_edit_model_id,
+                {'mixing_mode': mixing_mode, 'style_prompt': style_prompt, 'images': image_hashes},
+                analyze_styles, cacheable=bool
+            )
+        else:
+            response_text, cache_hit = await analyze_styles(), False
 
         # Parse the response - handle markdown code blocks and other formatting
         def parse_gemini_response(text):
@@ -1630,7 +2483,7 @@ Please provide detailed guidance in JSON format:
         # Try to parse JSON response
         try:
             import json
-            result = parse_gemini_response(response.text)
+            result = parse_gemini_response(response_text)
 
             # Save the analysis to a file
             timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
@@ -1648,14 +2501,15 @@ Please provide detailed guidance in JSON format:
             with open(analysis_filename, 'w') as f:
                 json.dump(analysis_data, f, indent=2)
 
-            return jsonify({
+            return {
                 'success': True,
                 'mixing_mode': mixing_mode,
                 'image_count': len(image_paths),
                 'analysis': result,
                 'user_prompt': style_prompt,
-                'saved_file': analysis_filename
-            })
+                'saved_file': analysis_filename,
+                'cache_hit': cache_hit
+            }, 200
 
         except json.JSONDecodeError:
             # If JSON parsing fails, return raw response and save it
@@ -1668,7 +2522,7 @@ Please provide detailed guidance in JSON format:
                 'image_count': len(image_paths),
                 'image_paths': image_paths,
                 'user_prompt': style_prompt,
-                'raw_response': response.text
+                'raw_response': response_text
             }
 
             with open(analysis_filename, 'w') as f:
@@ -1678,85 +2532,56 @@ Please provide detailed guidance in JSON format:
                 f.write(f"Images: {len(image_paths)}\n")
                 f.write(f"Prompt: {style_prompt}\n\n")
                 f.write("Response:\n")
-                f.write(response.text)
+                f.write(response_text)
 
-            return jsonify({
+            return {
                 'success': True,
                 'mixing_mode': mixing_mode,
                 'image_count': len(image_paths),
                 'analysis': {
-                    'raw_response': response.text,
+                    'raw_response': response_text,
                     'note': 'Could not parse as JSON, showing raw response'
                 },
                 'user_prompt': style_prompt,
-                'saved_file': analysis_filename
-            })
+                'saved_file': analysis_filename,
+                'cache_hit': cache_hit
+            }, 200
 
     except Exception as e:
         print(f"❌ Style mixing error: {str(e)}")
-        return jsonify({
+        return {
             'error': f'Style mixing failed: {str(e)}'
-        }), 500
+        }, 500
 
-@app.route('/api/generate-from-multiple-images', methods=['POST'])
+@bp.route('/api/generate-from-multiple-images', methods=['POST'])
 def generate_from_multiple_images():
+    return run_handler(handle_generate_from_multiple_images)
+
+async def handle_generate_from_multiple_images(data):
     """Generate new images by combining elements from multiple reference images"""
     try:
-        data = request.get_json()
-
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return {'error': 'No data provided'}, 400
 
         image_paths = data.get('image_paths', data.get('images', []))
         prompt = data.get('prompt', '')
 
         if not image_paths:
-            return jsonify({'error': 'No images provided'}), 400
+            return {'error': 'No images provided'}, 400
 
         if not prompt:
-            return jsonify({'error': 'Prompt is required'}), 400
+            return {'error': 'Prompt is required'}, 400
 
-        # Validate and prepare image parts
-        contents = []
+        # Validate image paths
+        full_paths = []
         for image_path in image_paths:
-            # Use the same path resolution logic as style mixing
-            possible_paths = [
-                image_path,
-                os.path.join(config.local_output_dir, image_path),
-                os.path.join(os.getcwd(), image_path),
-                os.path.join(os.getcwd(), config.local_output_dir, image_path),
-            ]
-
-            if image_path.startswith('output/'):
-                relative_path = image_path[7:]
-                possible_paths.extend([
-                    relative_path,
-                    os.path.join(config.local_output_dir, relative_path),
-                    os.path.join(os.getcwd(), config.local_output_dir, relative_path),
-                ])
-
-            full_path = None
-            for try_path in possible_paths:
-                if os.path.exists(try_path):
-                    full_path = try_path
-                    break
-
+            full_path = await asyncio.to_thread(asset_index.resolve, image_path)
             if not full_path:
-                return jsonify({'error': f'Image not found: {image_path}'}), 404
+                return {'error': f'Image not found: {image_path}'}, 404
+            full_paths.append(full_path)
 
-            # Read and add image to contents
-            with open(full_path, 'rb') as f:
-                image_data = f.read()
-
-            file_extension = full_path.split('.')[-1].lower()
-            mime_type = f"image/{file_extension}"
-            if file_extension == 'jpg':
-                mime_type = "image/jpeg"
-
-            contents.append(types.Part.from_bytes(
-                data=image_data,
-                mime_type=mime_type
-            ))
+        # Load, downscale and add the images to contents
+        contents = await image_prep.parts(get_api_client(), full_paths)
 
         # Add the text prompt
         contents.append(prompt)
@@ -1774,7 +2599,9 @@ def generate_from_multiple_images():
         )
 
         # Use API client for gemini-2.5-flash-image-preview
-        response = api_client.models.generate_content(
+        response = await call_model(
+            'image_generation', "gemini-2.5-flash-image-preview",
+            get_api_client().aio.models.generate_content,
             model="gemini-2.5-flash-image-preview",
             contents=contents,
             config=generate_content_config
@@ -1791,80 +2618,50 @@ def generate_from_multiple_images():
                 file_extension = mimetypes.guess_extension(part.inline_data.mime_type) or '.png'
                 image_filename = f"{config.local_output_dir}/images/multi_ref_{timestamp}_{file_index}{file_extension}"
 
-                with open(image_filename, 'wb') as f:
-                    f.write(part.inline_data.data)
+                image_filename = await write_file_async(image_filename, part.inline_data.data)
 
                 generated_images.append(image_filename)
             elif part.text:
                 description += part.text
 
-        return jsonify({
+        return {
             'success': True,
             'generated_images': generated_images,
             'image_count': len(generated_images),
             'description': description,
             'prompt': prompt,
             'source_images': len(image_paths)
-        })
+        }, 200
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
-@app.route('/api/subject-customization', methods=['POST'])
+@bp.route('/api/subject-customization', methods=['POST'])
 def subject_customization():
+    return run_handler(handle_subject_customization)
+
+async def handle_subject_customization(data, emit=None):
     """Create variations of a subject in different styles or settings"""
     try:
-        data = request.get_json()
-
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return {'error': 'No data provided'}, 400
 
         image_path = data.get('image_path')
         customization_prompt = data.get('prompt', '')
 
         if not image_path:
-            return jsonify({'error': 'Image path is required'}), 400
+            return {'error': 'Image path is required'}, 400
 
         if not customization_prompt:
-            return jsonify({'error': 'Customization prompt is required'}), 400
-
-        # Find the image file using same logic as other functions
-        possible_paths = [
-            image_path,
-            os.path.join(config.local_output_dir, image_path),
-            os.path.join(os.getcwd(), image_path),
-            os.path.join(os.getcwd(), config.local_output_dir, image_path),
-        ]
-
-        if image_path.startswith('output/'):
-            relative_path = image_path[7:]
-            possible_paths.extend([
-                relative_path,
-                os.path.join(config.local_output_dir, relative_path),
-                os.path.join(os.getcwd(), config.local_output_dir, relative_path),
-            ])
-
-        full_path = None
-        for try_path in possible_paths:
-            if os.path.exists(try_path):
-                full_path = try_path
-                break
+            return {'error': 'Customization prompt is required'}, 400
 
+        full_path = await asyncio.to_thread(asset_index.resolve, image_path)
         if not full_path:
-            return jsonify({'error': f'Image not found: {image_path}'}), 404
-
-        # Read the image
-        with open(full_path, 'rb') as f:
-            image_data = f.read()
-
-        file_extension = full_path.split('.')[-1].lower()
-        mime_type = f"image/{file_extension}"
-        if file_extension == 'jpg':
-            mime_type = "image/jpeg"
+            return {'error': f'Image not found: {image_path}'}, 404
 
         # Create contents
         contents = [
-            types.Part.from_bytes(data=image_data, mime_type=mime_type),
+            *await image_prep.parts(get_api_client(), [full_path]),
             customization_prompt
         ]
 
@@ -1881,7 +2678,11 @@ def subject_customization():
         )
 
         # Generate the customized images
-        response = api_client.models.generate_content(
+        parts = model_parts(
+            'image_generation', "gemini-2.5-flash-image-preview",
+            get_api_client().aio.models.generate_content,
+            get_api_client().aio.models.generate_content_stream,
+            stream=emit is not None,
             model="gemini-2.5-flash-image-preview",
             contents=contents,
             config=generate_content_config
@@ -1892,44 +2693,48 @@ def subject_customization():
         description = ""
 
         # Process response
-        for part in response.candidates[0].content.parts:
+        async for part in parts:
             if part.inline_data and part.inline_data.data:
                 file_index = len(generated_images)
                 file_extension = mimetypes.guess_extension(part.inline_data.mime_type) or '.png'
                 image_filename = f"{config.local_output_dir}/images/custom_{timestamp}_{file_index}{file_extension}"
 
-                with open(image_filename, 'wb') as f:
-                    f.write(part.inline_data.data)
+                image_filename = await write_file_async(image_filename, part.inline_data.data)
 
                 generated_images.append(image_filename)
+                if emit:
+                    await emit('image', {'path': image_filename})
             elif part.text:
                 description += part.text
+                if emit:
+                    await emit('text', {'text': part.text})
 
-        return jsonify({
+        return {
             'success': True,
             'generated_images': generated_images,
             'image_count': len(generated_images),
             'description': description,
             'prompt': customization_prompt,
             'original_image': image_path
-        })
+        }, 200
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
-@app.route('/api/generate-interleaved', methods=['POST'])
+@bp.route('/api/generate-interleaved', methods=['POST'])
 def generate_interleaved():
+    return run_handler(handle_generate_interleaved)
+
+async def handle_generate_interleaved(data, emit=None):
     """Generate interleaved text and images for tutorials or step-by-step content"""
     try:
-        data = request.get_json()
-
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return {'error': 'No data provided'}, 400
 
         prompt = data.get('prompt', '')
 
         if not prompt:
-            return jsonify({'error': 'Prompt is required'}), 400
+            return {'error': 'Prompt is required'}, 400
 
         # Generate content config
         generate_content_config = types.GenerateContentConfig(
@@ -1944,7 +2749,11 @@ def generate_interleaved():
         )
 
         # Generate interleaved content
-        response = api_client.models.generate_content(
+        parts = model_parts(
+            'image_generation', "gemini-2.5-flash-image-preview",
+            get_api_client().aio.models.generate_content,
+            get_api_client().aio.models.generate_content_stream,
+            stream=emit is not None,
             model="gemini-2.5-flash-image-preview",
             contents=prompt,
             config=generate_content_config
@@ -1954,24 +2763,29 @@ def generate_interleaved():
         generated_images = []
         text_parts = []
         content_sequence = []
+        i = 0
 
         # Process response in sequence
-        for i, part in enumerate(response.candidates[0].content.parts):
+        async for part in parts:
             if part.text:
                 text_parts.append(part.text)
                 content_sequence.append({'type': 'text', 'content': part.text, 'index': i})
+                if emit:
+                    await emit('text', {'text': part.text, 'index': i})
             elif part.inline_data and part.inline_data.data:
                 file_index = len(generated_images)
                 file_extension = mimetypes.guess_extension(part.inline_data.mime_type) or '.png'
                 image_filename = f"{config.local_output_dir}/images/interleaved_{timestamp}_{file_index}{file_extension}"
 
-                with open(image_filename, 'wb') as f:
-                    f.write(part.inline_data.data)
+                image_filename = await write_file_async(image_filename, part.inline_data.data)
 
                 generated_images.append(image_filename)
                 content_sequence.append({'type': 'image', 'content': image_filename, 'index': i})
+                if emit:
+                    await emit('image', {'path': image_filename, 'index': i})
+            i += 1
 
-        return jsonify({
+        return {
             'success': True,
             'generated_images': generated_images,
             'text_parts': text_parts,
@@ -1979,15 +2793,15 @@ def generate_interleaved():
             'image_count': len(generated_images),
             'text_count': len(text_parts),
             'prompt': prompt
-        })
+        }, 200
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
 # Global chat sessions storage (in production, use proper session management or database)
 chat_sessions = {}
 
-@app.route('/api/start-chat-editing', methods=['POST'])
+@bp.route('/api/start-chat-editing', methods=['POST'])
 def start_chat_editing():
     """Start a new conversational image editing session"""
     try:
@@ -1999,7 +2813,7 @@ def start_chat_editing():
         session_id = f"chat_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
 
         # Create a new chat session
-        chat = api_client.chats.create(model="gemini-2.5-flash-image-preview")
+        chat = get_api_client().aio.chats.create(model="gemini-2.5-flash-image-preview")
         chat_sessions[session_id] = chat
 
         return jsonify({
@@ -2011,27 +2825,28 @@ def start_chat_editing():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/chat-edit-image', methods=['POST'])
+@bp.route('/api/chat-edit-image', methods=['POST'])
 def chat_edit_image():
+    return run_handler(handle_chat_edit_image)
+
+async def handle_chat_edit_image(data, emit=None):
     """Send a message to edit an image in an ongoing chat session"""
     try:
-        data = request.get_json()
-
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return {'error': 'No data provided'}, 400
 
         session_id = data.get('session_id')
         prompt = data.get('prompt', '')
         image_path = data.get('image_path')
 
         if not session_id:
-            return jsonify({'error': 'Session ID is required'}), 400
+            return {'error': 'Session ID is required'}, 400
 
         if not prompt:
-            return jsonify({'error': 'Prompt is required'}), 400
+            return {'error': 'Prompt is required'}, 400
 
         if session_id not in chat_sessions:
-            return jsonify({'error': 'Chat session not found. Please start a new session.'}), 404
+            return {'error': 'Chat session not found. Please start a new session.'}, 404
 
         chat = chat_sessions[session_id]
 
@@ -2040,47 +2855,22 @@ def chat_edit_image():
 
         # Add image if provided
         if image_path:
-            # Find the image file using same logic as other functions
-            possible_paths = [
-                image_path,
-                os.path.join(config.local_output_dir, image_path),
-                os.path.join(os.getcwd(), image_path),
-                os.path.join(os.getcwd(), config.local_output_dir, image_path),
-            ]
-
-            if image_path.startswith('output/'):
-                relative_path = image_path[7:]
-                possible_paths.extend([
-                    relative_path,
-                    os.path.join(config.local_output_dir, relative_path),
-                    os.path.join(os.getcwd(), config.local_output_dir, relative_path),
-                ])
-
-            full_path = None
-            for try_path in possible_paths:
-                if os.path.exists(try_path):
-                    full_path = try_path
-                    break
-
+            full_path = await asyncio.to_thread(asset_index.resolve, image_path)
             if not full_path:
-                return jsonify({'error': f'Image not found: {image_path}'}), 404
-
-            # Read the image
-            with open(full_path, 'rb') as f:
-                image_data = f.read()
+                return {'error': f'Image not found: {image_path}'}, 404
 
-            file_extension = full_path.split('.')[-1].lower()
-            mime_type = f"image/{file_extension}"
-            if file_extension == 'jpg':
-                mime_type = "image/jpeg"
-
-            message_contents.append(types.Part.from_bytes(data=image_data, mime_type=mime_type))
+            # Images sent in earlier turns of the session are passed by reference
+            message_contents.extend(await image_prep.parts(get_api_client(), [full_path]))
 
         # Add the text prompt
         message_contents.append(prompt)
 
         # Send message to chat
-        response = chat.send_message(
+        parts = model_parts(
+            'image_editing', "gemini-2.5-flash-image-preview",
+            chat.send_message,
+            chat.send_message_stream,
+            stream=emit is not None,
             message=message_contents,
             config=types.GenerateContentConfig(
                 response_modalities=["TEXT", "IMAGE"],
@@ -2092,20 +2882,23 @@ def chat_edit_image():
         description = ""
 
         # Process response
-        for part in response.candidates[0].content.parts:
+        async for part in parts:
             if part.inline_data and part.inline_data.data:
                 file_index = len(generated_images)
                 file_extension = mimetypes.guess_extension(part.inline_data.mime_type) or '.png'
                 image_filename = f"{config.local_output_dir}/images/chat_edit_{session_id}_{timestamp}_{file_index}{file_extension}"
 
-                with open(image_filename, 'wb') as f:
-                    f.write(part.inline_data.data)
+                image_filename = await write_file_async(image_filename, part.inline_data.data)
 
                 generated_images.append(image_filename)
+                if emit:
+                    await emit('image', {'path': image_filename})
             elif part.text:
                 description += part.text
+                if emit:
+                    await emit('text', {'text': part.text})
 
-        return jsonify({
+        return {
             'success': True,
             'session_id': session_id,
             'generated_images': generated_images,
@@ -2113,12 +2906,12 @@ def chat_edit_image():
             'description': description,
             'prompt': prompt,
             'original_image': image_path
-        })
+        }, 200
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
-@app.route('/api/end-chat-editing/<session_id>', methods=['DELETE'])
+@bp.route('/api/end-chat-editing/<session_id>', methods=['DELETE'])
 def end_chat_editing(session_id):
     """End a conversational image editing session"""
     try:
@@ -2134,7 +2927,7 @@ def end_chat_editing(session_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/list-chat-sessions', methods=['GET'])
+@bp.route('/api/list-chat-sessions', methods=['GET'])
 def list_chat_sessions():
     """List all active chat sessions"""
     try:
@@ -2196,4 +2989,5 @@ if __name__ == '__main__':
     print("🔄 Press Ctrl+C to stop the server")
     print("="*62)
 
+    app = create_app()
     app.run(debug=config.server_debug, host=config.server_host, port=port)
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+ASGI Entry Point for Video Generation Studio
+
+This module serves the studio under an ASGI server, e.g.:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8088
+
+The long-latency generation endpoints are native async views that await the
+same handlers the Flask routes use, so a request waiting on Gemini/Veo costs
+a coroutine instead of a thread. Every other route is served by the Flask app
+through a WSGI bridge.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as studio
+from async_runtime import runtime
+from config_manager import config
+from gcs_uploads import gcs_uploads
+from job_manager import job_manager
+
+# Routes served natively on the event loop; everything else goes to Flask
+ASYNC_ROUTES = {
+    '/api/generate-video': studio.handle_generate_video,
+    '/api/generate-video-from-image': studio.handle_generate_video_from_image,
+    '/api/generate-image': studio.handle_generate_image,
+    '/api/edit-image': studio.handle_edit_image,
+    '/api/refine-prompt': studio.handle_refine_prompt,
+    '/api/mix-image-styles': studio.handle_mix_image_styles,
+    '/api/generate-from-multiple-images': studio.handle_generate_from_multiple_images,
+    '/api/subject-customization': studio.handle_subject_customization,
+    '/api/generate-interleaved': studio.handle_generate_interleaved,
+    '/api/chat-edit-image': studio.handle_chat_edit_image,
+}
+
+
+def async_view(handler):
+    """Wrap a (data) -> (payload, status) handler as a Starlette endpoint"""
+    async def view(request: Request):
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if studio.wants_stream(handler, data):
+            return StreamingResponse(studio.handler_events(handler, data, request.url.path),
+                                     media_type='text/event-stream',
+                                     headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        payload, status = await studio.call_handler(handler, data, request.url.path)
+        return JSONResponse(payload, status_code=status)
+    return view
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Generation coroutines, background jobs and the operation poller share the server's loop
+    runtime.adopt(asyncio.get_running_loop())
+    # Create the clients off the loop now, so the first requests rarely have to wait for them
+    warm_up = asyncio.create_task(studio.ensure_clients())
+    print("✅ ASGI server ready, async runtime attached to the server event loop")
+    yield
+    await warm_up
+    job_manager.shutdown(wait=False)
+    # Give queued GCS uploads a bounded chance to finish; the rest resume on the next start
+    await asyncio.to_thread(gcs_uploads.shutdown)
+    runtime.shutdown()
+
+
+application = Starlette(
+    routes=[
+        *[Route(path, async_view(handler), methods=['POST']) for path, handler in ASYNC_ROUTES.items()],
+        # Blocking Flask views (uploads, ffmpeg, SSE) run on the bridge's thread pool
+        Mount('/', app=WSGIMiddleware(studio.create_app(), workers=config.get('server.wsgi_workers', 32))),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(application, host=config.server_host, port=config.server_ports[0])
@@ -0,0 +1,426 @@
+"""
+Asset Catalog for Video Generation Studio
+
+This module keeps a SQLite catalog of generated and uploaded images and videos
+(size, timestamps, dimensions, duration, origin endpoint, GCS URL, upload
+state and content hash) so listing
+endpoints query an index instead of stat-ing every file on every request.
+Files written by the app are recorded as they are created; files added or
+removed behind the app's back are picked up by a cheap directory diff that
+only runs when the directory itself has changed. It also keeps the reference
+counts of the content-addressed blob store.
+"""
+
+import base64
+import contextvars
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import Image
+
+from config_manager import config
+
+# Same lists the upload endpoints accept
+IMAGE_EXTENSIONS = tuple(f".{extension.lower()}" for extension in config.allowed_image_formats)
+VIDEO_EXTENSIONS = tuple(f".{extension.lower()}" for extension in config.allowed_video_formats)
+SORT_COLUMNS = ('created', 'modified', 'size', 'name')
+
+# Endpoint the current request came in on, recorded as the origin of files it writes
+_origin: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('asset_origin', default=None)
+
+
+def _encode_cursor(values: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    # [sort value, path], as written by _encode_cursor
+    if (not isinstance(values, list) or len(values) != 2
+            or not isinstance(values[0], (str, int, float)) or not isinstance(values[1], str)):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
+class AssetCatalog:
+    def __init__(self, db_path: str, directories: Dict[str, str]):
+        self.db_path = db_path
+        # kind ('image' / 'video') -> directory holding that kind of asset
+        self.directories = directories
+        self._db: Optional[sqlite3.Connection] = None
+        self._dir_state: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def set_origin(self, origin: Optional[str]) -> None:
+        """Set the origin recorded for files written by the current request or job"""
+        _origin.set(origin)
+
+    def _connect_locked(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS assets (
+                    path TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    modified REAL NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    duration REAL,
+                    origin TEXT,
+                    gcs_url TEXT,
+                    remote INTEGER NOT NULL DEFAULT 0,
+                    upload_state TEXT,
+                    sha256 TEXT
+                )
+            ''')
+            columns = {row['name'] for row in self._db.execute('PRAGMA table_info(assets)')}
+            # Catalogs created before background GCS uploads / the blob store
+            for column in ('upload_state', 'sha256'):
+                if column not in columns:
+                    self._db.execute(f'ALTER TABLE assets ADD COLUMN {column} TEXT')
+            self._db.execute('CREATE INDEX IF NOT EXISTS assets_sha256 ON assets (sha256)')
+            # Content-addressed blobs: how many assets alias each one, and its single GCS copy
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    refs INTEGER NOT NULL DEFAULT 0,
+                    gcs_url TEXT
+                )
+            ''')
+            for column in SORT_COLUMNS:
+                self._db.execute(f'CREATE INDEX IF NOT EXISTS assets_{column} ON assets (kind, {column}, path)')
+        return self._db
+
+    def _kind_of(self, path: str) -> Optional[str]:
+        directory = os.path.abspath(os.path.dirname(path))
+        extension = os.path.splitext(path)[1].lower()
+        for kind, kind_directory in self.directories.items():
+            if os.path.abspath(kind_directory) == directory:
+                allowed = IMAGE_EXTENSIONS if kind == 'image' else VIDEO_EXTENSIONS
+                return kind if extension in allowed else None
+        return None
+
+    def _key(self, path: str) -> str:
+        """Catalog key: the file name under its configured directory, however the path was spelled"""
+        kind = self._kind_of(path)
+        if kind is None:
+            return os.path.normpath(path)
+        return os.path.normpath(os.path.join(self.directories[kind], os.path.basename(path)))
+
+    @staticmethod
+    def _probe(path: str, kind: str) -> Dict[str, Any]:
+        """Dimensions (and duration for videos) read from the file headers"""
+        try:
+            if kind == 'image':
+                with Image.open(path) as image:
+                    return {'width': image.width, 'height': image.height}
+            if shutil.which('ffprobe'):
+                output = subprocess.run(
+                    ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+                     '-show_entries', 'stream=width,height:format=duration', '-of', 'json', path],
+                    capture_output=True, text=True, timeout=10
+                ).stdout
+                info = json.loads(output or '{}')
+                stream = (info.get('streams') or [{}])[0]
+                duration = info.get('format', {}).get('duration')
+                return {'width': stream.get('width'), 'height': stream.get('height'),
+                        'duration': float(duration) if duration else None}
+        except Exception as e:
+            print(f"⚠️  Could not read metadata of {path}: {e}")
+        return {}
+
+    def _build_row(self, path: str, kind: str, origin: Optional[str], size: Optional[int],
+                   probe: bool) -> Dict[str, Any]:
+        try:
+            stat = os.stat(path)
+            row = {'size': stat.st_size, 'created': stat.st_ctime, 'modified': stat.st_mtime, 'remote': 0}
+            if probe:
+                row.update(self._probe(path, kind))
+        except FileNotFoundError:
+            now = time.time()
+            row = {'size': size or 0, 'created': now, 'modified': now, 'remote': 1}
+        row.update(path=self._key(path), kind=kind, name=os.path.basename(path), origin=origin)
+        return row
+
+    def _upsert_locked(self, db: sqlite3.Connection, row: Dict[str, Any], gcs_url: Optional[str]) -> None:
+        existing = db.execute('SELECT origin, gcs_url, upload_state, sha256 FROM assets WHERE path = ?',
+                              (row['path'],)).fetchone()
+        if existing is not None:
+            # Refreshing an entry keeps what we already knew about where it came from
+            row['origin'] = row['origin'] or existing['origin']
+            row['upload_state'] = existing['upload_state']
+            row['sha256'] = existing['sha256']
+            gcs_url = gcs_url or existing['gcs_url']
+        row['gcs_url'] = gcs_url
+        columns = ', '.join(row)
+        placeholders = ', '.join('?' for _ in row)
+        db.execute(f'INSERT OR REPLACE INTO assets ({columns}) VALUES ({placeholders})', tuple(row.values()))
+
+    def record(self, path: str, origin: Optional[str] = None, gcs_url: Optional[str] = None,
+               size: Optional[int] = None) -> None:
+        """
+        Add or refresh the catalog entry for an image or video. Files that do not
+        exist locally are recorded as remote (GCS-only) assets. Paths outside the
+        cataloged directories are ignored.
+        """
+        kind = self._kind_of(path)
+        if kind is None:
+            return
+
+        row = self._build_row(path, kind, origin or _origin.get(), size, probe=True)
+        with self._lock:
+            db = self._connect_locked()
+            self._upsert_locked(db, row, gcs_url)
+            db.commit()
+
+    def import_remote(self, assets: List[Dict[str, Any]]) -> None:
+        """Add GCS-only assets registered before the catalog existed (entries already present are kept)"""
+        rows = []
+        for asset in assets:
+            kind = self._kind_of(asset['local_path'])
+            if kind is not None:
+                created = asset.get('created') or time.time()
+                rows.append((self._key(asset['local_path']), kind, os.path.basename(asset['local_path']),
+                             asset.get('size') or 0, created, created, asset['gcs_uri']))
+        with self._lock:
+            db = self._connect_locked()
+            db.executemany(
+                'INSERT OR IGNORE INTO assets (path, kind, name, size, created, modified, gcs_url, remote) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, 1)', rows
+            )
+            db.commit()
+
+    def set_gcs_url(self, path: str, gcs_url: Optional[str]) -> None:
+        """Attach the GCS copy of an already recorded asset"""
+        with self._lock:
+            db = self._connect_locked()
+            db.execute('UPDATE assets SET gcs_url = ? WHERE path = ?', (gcs_url, self._key(path)))
+            db.commit()
+
+    def set_upload_state(self, path: str, state: Optional[str], gcs_url: Optional[str] = None) -> None:
+        """
+        Record the background GCS upload state of an asset. Once uploaded, the GCS
+        URL is attached to its blob and to every other alias of the same content.
+        """
+        with self._lock:
+            db = self._connect_locked()
+            if gcs_url is None:
+                db.execute('UPDATE assets SET upload_state = ? WHERE path = ?', (state, self._key(path)))
+            else:
+                db.execute('UPDATE assets SET upload_state = ?, gcs_url = ? WHERE path = ?',
+                           (state, gcs_url, self._key(path)))
+                row = db.execute('SELECT sha256 FROM assets WHERE path = ?', (self._key(path),)).fetchone()
+                if row is not None and row['sha256']:
+                    db.execute('UPDATE blobs SET gcs_url = ? WHERE sha256 = ?', (gcs_url, row['sha256']))
+                    db.execute('UPDATE assets SET upload_state = ?, gcs_url = ? WHERE sha256 = ?',
+                               (state, gcs_url, row['sha256']))
+            db.commit()
+
+    def _count_refs_locked(self, db: sqlite3.Connection, sha256: str) -> int:
+        refs = db.execute('SELECT COUNT(*) FROM assets WHERE sha256 = ?', (sha256,)).fetchone()[0]
+        db.execute('UPDATE blobs SET refs = ? WHERE sha256 = ?', (refs, sha256))
+        return refs
+
+    def set_content(self, path: str, sha256: str, size: int) -> Dict[str, Any]:
+        """
+        Point an asset at its content blob and return the blob entry
+        {'sha256', 'size', 'refs', 'gcs_url'}; refs counts the aliases of the blob.
+        """
+        with self._lock:
+            db = self._connect_locked()
+            previous = db.execute('SELECT sha256 FROM assets WHERE path = ?', (self._key(path),)).fetchone()
+            db.execute('INSERT OR IGNORE INTO blobs (sha256, size) VALUES (?, ?)', (sha256, size))
+            db.execute('UPDATE assets SET sha256 = ? WHERE path = ?', (sha256, self._key(path)))
+            if previous is not None and previous['sha256'] and previous['sha256'] != sha256:
+                # The file was overwritten with other content
+                self._count_refs_locked(db, previous['sha256'])
+            self._count_refs_locked(db, sha256)
+            db.commit()
+            return dict(db.execute('SELECT * FROM blobs WHERE sha256 = ?', (sha256,)).fetchone())
+
+    def content_of(self, path: str) -> Optional[Dict[str, Any]]:
+        """Blob entry of an asset, or None if its content is not tracked"""
+        with self._lock:
+            row = self._connect_locked().execute(
+                'SELECT blobs.* FROM assets JOIN blobs ON blobs.sha256 = assets.sha256 WHERE assets.path = ?',
+                (self._key(path),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def remove(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Drop the catalog entry for a deleted asset. Returns its blob entry with the
+        remaining reference count (refs == 0 means this was the last alias), or
+        None if the asset's content was not tracked.
+        """
+        with self._lock:
+            db = self._connect_locked()
+            row = db.execute('SELECT sha256 FROM assets WHERE path = ?', (self._key(path),)).fetchone()
+            db.execute('DELETE FROM assets WHERE path = ?', (self._key(path),))
+            blob = None
+            if row is not None and row['sha256']:
+                self._count_refs_locked(db, row['sha256'])
+                blob = dict(db.execute('SELECT * FROM blobs WHERE sha256 = ?', (row['sha256'],)).fetchone())
+                if blob['refs'] == 0:
+                    db.execute('DELETE FROM blobs WHERE sha256 = ?', (row['sha256'],))
+            db.commit()
+            return blob
+
+    def unreferenced_blobs(self) -> List[str]:
+        """Blobs no asset points at any more (e.g. their files were deleted outside the app)"""
+        with self._lock:
+            db = self._connect_locked()
+            db.execute('UPDATE blobs SET refs = (SELECT COUNT(*) FROM assets WHERE assets.sha256 = blobs.sha256)')
+            db.commit()
+            return [row['sha256'] for row in db.execute('SELECT sha256 FROM blobs WHERE refs = 0')]
+
+    def forget_blob(self, sha256: str) -> None:
+        """Drop an unreferenced blob entry after its bytes were removed"""
+        with self._lock:
+            db = self._connect_locked()
+            db.execute('DELETE FROM blobs WHERE sha256 = ? AND refs = 0', (sha256,))
+            db.commit()
+
+    def blob_stats(self) -> Dict[str, Any]:
+        """Number of blobs, their aliases, stored bytes and bytes saved by deduplication"""
+        with self._lock:
+            row = self._connect_locked().execute(
+                'SELECT COUNT(*) AS blobs, COALESCE(SUM(refs), 0) AS aliases, COALESCE(SUM(size), 0) AS bytes, '
+                'COALESCE(SUM(MAX(refs - 1, 0) * size), 0) AS saved_bytes FROM blobs'
+            ).fetchone()
+        return dict(row)
+
+    def _sync_locked(self, kind: str) -> None:
+        """
+        Reconcile the catalog with the directory if it changed since the last
+        sync: only new names are stat-ed, vanished local files are dropped.
+        """
+        directory = self.directories[kind]
+        os.makedirs(directory, exist_ok=True)
+        dir_mtime = os.stat(directory).st_mtime_ns
+        if self._dir_state.get(kind) == dir_mtime:
+            return
+
+        allowed = IMAGE_EXTENSIONS if kind == 'image' else VIDEO_EXTENSIONS
+        with os.scandir(directory) as entries:
+            on_disk = {
+                os.path.normpath(entry.path) for entry in entries
+                if entry.name.lower().endswith(allowed) and not entry.name.startswith('.') and entry.is_file()
+            }
+
+        db = self._connect_locked()
+        cataloged = {row['path']: row['remote'] for row in
+                     db.execute('SELECT path, remote FROM assets WHERE kind = ?', (kind,))}
+
+        for path in on_disk - cataloged.keys():
+            try:
+                reserved = os.path.getsize(path) == 0
+            except OSError:
+                continue
+            if reserved:
+                # A name reserved by blob_store whose content is still being written; recorded once written
+                continue
+            # Video metadata needs ffprobe, so it is only collected for files the app writes itself
+            self._upsert_locked(db, self._build_row(path, kind, None, None, probe=(kind == 'image')), None)
+        vanished = [(path,) for path, remote in cataloged.items() if path not in on_disk and not remote]
+        db.executemany('DELETE FROM assets WHERE path = ?', vanished)
+        if vanished:
+            db.execute('UPDATE blobs SET refs = (SELECT COUNT(*) FROM assets WHERE assets.sha256 = blobs.sha256)')
+        # Remote assets that have since been downloaded are local now
+        db.executemany('UPDATE assets SET remote = 0 WHERE path = ?',
+                       [(path,) for path, remote in cataloged.items() if remote and path in on_disk])
+        db.commit()
+        self._dir_state[kind] = dir_mtime
+
+    def query(self, kind: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+              sort: str = 'created', order: str = 'desc', search: Optional[str] = None,
+              origin: Optional[str] = None, remote: Optional[bool] = None,
+              upload_state: Optional[str] = None, created_after: Optional[float] = None,
+              created_before: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """
+        List assets of a kind. Returns (items, next_cursor, total). Pages are
+        keyset-paginated on (sort column, path), so deep pages stay cheap and
+        stable while new files are being added.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Invalid sort field: {sort}. Use one of {', '.join(SORT_COLUMNS)}")
+        if order not in ('asc', 'desc'):
+            raise ValueError("Invalid order: use 'asc' or 'desc'")
+
+        where, params = ['kind = ?'], [kind]
+        if search:
+            where.append('name LIKE ?')
+            params.append(f"%{search}%")
+        if origin:
+            where.append('origin = ?')
+            params.append(origin)
+        if remote is not None:
+            where.append('remote = ?')
+            params.append(1 if remote else 0)
+        if upload_state:
+            where.append('upload_state = ?')
+            params.append(upload_state)
+        if created_after is not None:
+            where.append('created >= ?')
+            params.append(created_after)
+        if created_before is not None:
+            where.append('created < ?')
+            params.append(created_before)
+
+        with self._lock:
+            self._sync_locked(kind)
+            db = self._connect_locked()
+            total = db.execute(f"SELECT COUNT(*) FROM assets WHERE {' AND '.join(where)}", params).fetchone()[0]
+
+            if cursor:
+                value, path = _decode_cursor(cursor)
+                comparison = '<' if order == 'desc' else '>'
+                where.append(f'({sort}, path) {comparison} (?, ?)')
+                params.extend([value, path])
+
+            sql = f"SELECT * FROM assets WHERE {' AND '.join(where)} ORDER BY {sort} {order}, path {order}"
+            if limit is not None:
+                sql += ' LIMIT ?'
+                params.append(limit + 1)
+            rows = db.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor([rows[-1][sort], rows[-1]['path']])
+
+        items = []
+        for row in rows:
+            item = {key: row[key] for key in ('name', 'path', 'size', 'created', 'modified', 'width',
+                                              'height', 'duration', 'origin', 'gcs_url', 'upload_state',
+                                              'sha256')}
+            if row['remote']:
+                item['remote'] = True
+            items.append(item)
+        return items, next_cursor, total
+
+
+# Create global asset catalog instance
+asset_catalog = AssetCatalog(
+    os.path.join(config.local_output_dir, 'asset_catalog.sqlite3'),
+    directories={
+        'image': os.path.join(config.local_output_dir, 'images'),
+        'video': os.path.join(config.local_output_dir, 'videos'),
+    }
+)
@@ -0,0 +1,136 @@
+"""
+Asset Index for Video Generation Studio
+
+This module resolves user-supplied image and video paths to files under the
+managed roots (output/ and uploads/). Every file is indexed once under the
+spellings clients use for it ("output/images/a.png", "images/a.png", the
+absolute path), so resolving a path is a dictionary lookup instead of a
+series of os.path.exists probes. Paths outside the managed roots are rejected.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+from config_manager import config
+
+
+class AssetIndex:
+    def __init__(self, roots: List[str]):
+        self.roots = roots
+        # alias -> canonical path ("<root>/<relative path>")
+        self._aliases: Dict[str, str] = {}
+        # canonical path -> its aliases, so removals can drop all of them
+        self._files: Dict[str, List[str]] = {}
+        self._scanned = False
+        self._lock = threading.RLock()
+
+    def _root_of(self, path: str) -> Optional[str]:
+        """The managed root containing path (symlinks resolved), or None"""
+        real = os.path.realpath(path)
+        for root in self.roots:
+            real_root = os.path.realpath(root)
+            if real == real_root or real.startswith(real_root + os.sep):
+                return root
+        return None
+
+    def _aliases_for(self, root: str, relative: str) -> List[str]:
+        canonical = os.path.normpath(os.path.join(root, relative))
+        aliases = [canonical, os.path.abspath(canonical)]
+        if root == self.roots[0]:
+            # Paths relative to the output directory, e.g. "images/a.png"
+            aliases.append(os.path.normpath(relative))
+        return aliases
+
+    def _add_locked(self, root: str, relative: str) -> str:
+        aliases = self._aliases_for(root, relative)
+        canonical = aliases[0]
+        self._files[canonical] = aliases
+        for alias in aliases:
+            # A path that names a file directly wins over an output-relative alias
+            if alias not in self._aliases or alias == canonical:
+                self._aliases[alias] = canonical
+        return canonical
+
+    def _scan_locked(self) -> None:
+        self._aliases.clear()
+        self._files.clear()
+        for root in self.roots:
+            for directory, subdirs, files in os.walk(root):
+                # Internal stores (caches, blob stores) and in-progress files (upload
+                # temp files) are dot-named and not addressable assets
+                subdirs[:] = [name for name in subdirs if not name.startswith('.')]
+                for name in files:
+                    if name.startswith('.'):
+                        continue
+                    relative = os.path.relpath(os.path.join(directory, name), root)
+                    self._add_locked(root, relative)
+        self._scanned = True
+
+    def _ensure_scanned(self) -> None:
+        with self._lock:
+            if not self._scanned:
+                self._scan_locked()
+
+    def refresh(self) -> None:
+        """Rebuild the index from disk"""
+        with self._lock:
+            self._scan_locked()
+
+    def add(self, path: str) -> Optional[str]:
+        """Record a file created under a managed root; returns its canonical path (None if not an asset)"""
+        root = self._root_of(path)
+        if root is None:
+            return None
+        relative = os.path.relpath(os.path.realpath(path), os.path.realpath(root))
+        if any(part.startswith('.') for part in relative.split(os.sep)):
+            # Same rule as the scan: dot-named files and directories are never assets
+            return None
+        with self._lock:
+            if not self._scanned:
+                self._scan_locked()
+                return self._aliases.get(os.path.normpath(os.path.join(root, relative)))
+            return self._add_locked(root, relative)
+
+    def discard(self, path: str) -> None:
+        """Forget a file that was deleted"""
+        self._ensure_scanned()
+        with self._lock:
+            canonical = self._aliases.get(os.path.normpath(path)) or self._aliases.get(os.path.abspath(path))
+            if canonical is None:
+                return
+            for alias in self._files.pop(canonical, []):
+                if self._aliases.get(alias) == canonical:
+                    del self._aliases[alias]
+
+    def resolve(self, path: str) -> Optional[str]:
+        """
+        Canonical path of the managed file a client refers to, or None if it is
+        unknown or lies outside the managed roots. The first call scans every
+        root, so coroutines call this through asyncio.to_thread.
+        """
+        if not path:
+            return None
+        self._ensure_scanned()
+
+        normalized = os.path.normpath(path)
+        with self._lock:
+            canonical = self._aliases.get(normalized)
+        if canonical is not None:
+            return canonical
+
+        # Not indexed yet (e.g. written by ffmpeg or another process): check the
+        # two places the file could be and index it if it is inside a root
+        for candidate in (normalized, os.path.join(self.roots[0], normalized)):
+            if self._root_of(candidate) is not None and os.path.isfile(candidate):
+                return self.add(candidate)
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        """Number of indexed files and lookup aliases"""
+        with self._lock:
+            return {'files': len(self._files), 'aliases': len(self._aliases)}
+
+
+# Create global asset index instance
+asset_index = AssetIndex(roots=[config.local_output_dir, config.get('file_handling.upload.folder', 'uploads')])
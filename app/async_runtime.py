@@ -0,0 +1,112 @@
+"""
+Async Runtime for Video Generation Studio
+
+This module owns the one long-lived event loop that all generation coroutines
+run on. Synchronous request handlers hand coroutines to it instead of creating
+and tearing down a loop per request, so async SDK clients, background jobs and
+the operation poller all share the same loop and can overlap their awaits.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+from config_manager import config
+
+
+class AsyncRuntime:
+    def __init__(self, max_blocking_threads: int = 32):
+        self.max_blocking_threads = max_blocking_threads
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._adopted = False
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The shared event loop, started on first use"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._start_locked()
+            return self._loop
+
+    def _blocking_executor(self) -> ThreadPoolExecutor:
+        # Blocking work (file I/O, GCS transfers) goes through asyncio.to_thread on this pool
+        return ThreadPoolExecutor(max_workers=self.max_blocking_threads, thread_name_prefix='blocking')
+
+    def _start_locked(self) -> None:
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(self._blocking_executor())
+        ready = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run_loop, name='async-runtime', daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+
+    def adopt(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Use an already running loop (e.g. the ASGI server's) instead of starting
+        our own. Must be called from that loop's thread before any work is submitted.
+        """
+        with self._lock:
+            if self._loop is not None and not self._loop.is_closed() and self._loop is not loop:
+                raise RuntimeError("Async runtime already started its own event loop")
+            loop.set_default_executor(self._blocking_executor())
+            self._loop = loop
+            self._thread = threading.current_thread()
+            self._adopted = True
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the shared loop and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the shared loop and block the calling thread until it finishes"""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("runtime.run() called from the event loop thread; await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+    def iterate(self, agen: AsyncIterator, timeout: Optional[float] = None) -> Iterator:
+        """
+        Drive an async generator on the shared loop from a synchronous caller
+        (e.g. a streaming Flask response), yielding its items as they arrive.
+        """
+        async def step():
+            return await agen.__anext__()
+
+        try:
+            while True:
+                try:
+                    yield self.run(step(), timeout)
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Runs when the consumer stops early too (e.g. the client disconnected)
+            self.submit(agen.aclose())
+
+    def shutdown(self) -> None:
+        """Stop the loop (pending tasks are abandoned). An adopted loop is only released."""
+        with self._lock:
+            if self._adopted:
+                self._adopted = False
+            elif self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+# Create global async runtime instance
+runtime = AsyncRuntime(max_blocking_threads=config.get('server.max_blocking_threads', 32))
@@ -0,0 +1,135 @@
+"""
+Content-Addressed Blob Store for Video Generation Studio
+
+This module stores the bytes of generated and uploaded media once per SHA-256
+under output/.blobs. The human-friendly files in output/images and
+output/videos are hard links to their blob, so every existing reader (previews,
+ffmpeg, send_file) keeps working while identical files share one copy on disk.
+The asset catalog counts the aliases of each blob; deleting a file only drops
+the bytes when its last alias goes. It also hands out unique file names, so
+two requests in the same second cannot overwrite each other's output.
+"""
+
+import errno
+import hashlib
+import os
+import threading
+import uuid
+from typing import Dict, Any, Optional
+
+from asset_catalog import asset_catalog
+from config_manager import config
+
+# Errors from os.link meaning the filesystem will never support it here
+LINKS_UNSUPPORTED = (errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = root
+        self._links_supported = True
+        self._lock = threading.Lock()
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def reserve(self, path: str) -> str:
+        """
+        Claim a file name that no other writer can take: path itself, or
+        name_1.ext, name_2.ext, ... if it exists. An empty placeholder is created.
+        """
+        base, extension = os.path.splitext(path)
+        candidate, counter = path, 0
+        while True:
+            try:
+                os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                return candidate
+            except FileExistsError:
+                counter += 1
+                candidate = f"{base}_{counter}{extension}"
+
+    def adopt(self, path: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store the file at path by content. If the same bytes are already stored,
+        path becomes another hard link to them and its own copy is freed.
+        Returns the catalog's blob entry plus 'duplicate'.
+        """
+        sha256 = sha256 or _hash_file(path)
+        blob_path = self._blob_path(sha256)
+        duplicate = False
+
+        with self._lock:
+            # Another worker process may store or drop the same blob between the checks
+            # and the link; each such race is retried against the state it left behind
+            attempts = 3 if self._links_supported else 0
+            for _ in range(attempts):
+                try:
+                    if os.path.exists(blob_path):
+                        if not os.path.samefile(blob_path, path):
+                            # Swap the fresh copy for a link to the stored bytes in one atomic step
+                            link_path = f"{path}.{uuid.uuid4().hex}.link"
+                            os.link(blob_path, link_path)
+                            os.replace(link_path, path)
+                            duplicate = True
+                    else:
+                        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                        os.link(path, blob_path)
+                    break
+                except (FileExistsError, FileNotFoundError):
+                    continue
+                except OSError as e:
+                    if e.errno in LINKS_UNSUPPORTED:
+                        # e.g. output/ spread over several filesystems; GCS copies are still deduplicated
+                        print(f"⚠️  Hard links unavailable, storing files without local deduplication: {e}")
+                        self._links_supported = False
+                    else:
+                        print(f"⚠️  Could not deduplicate {os.path.basename(path)}, keeping its own copy: {e}")
+                    break
+
+        blob = asset_catalog.set_content(path, sha256, os.path.getsize(path))
+        if duplicate:
+            print(f"♻️  {os.path.basename(path)} has the same content as {blob['refs'] - 1} other file(s); stored once")
+        return {**blob, 'duplicate': duplicate}
+
+    def release(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Forget an alias that was deleted. When it was the last one the stored
+        bytes are removed too; the returned blob entry then has refs == 0.
+        Returns None for files whose content was never tracked.
+        """
+        blob = asset_catalog.remove(path)
+        if blob is not None and blob['refs'] == 0:
+            self._unlink(blob['sha256'])
+        return blob
+
+    def _unlink(self, sha256: str) -> None:
+        try:
+            os.remove(self._blob_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def prune(self) -> int:
+        """Remove blobs no file refers to any more; returns how many"""
+        orphans = asset_catalog.unreferenced_blobs()
+        for sha256 in orphans:
+            self._unlink(sha256)
+            asset_catalog.forget_blob(sha256)
+        if orphans:
+            print(f"🧹 Removed {len(orphans)} unreferenced blob(s)")
+        return len(orphans)
+
+    def stats(self) -> Dict[str, Any]:
+        """Blob count, aliases, stored bytes and bytes saved by deduplication"""
+        return {**asset_catalog.blob_stats(), 'hard_links': self._links_supported}
+
+
+# Create global blob store instance
+blob_store = BlobStore(config.get('blob_store.root', os.path.join(config.local_output_dir, '.blobs')))
@@ -138,6 +138,30 @@ class ConfigManager:
     def video_retry_attempts(self) -> int:
         return self.get('generation_settings.video.retry_attempts', 3)
 
+    @property
+    def video_output_mode(self) -> str:
+        return self.get('generation_settings.video.output_mode', 'local')
+
+    @property
+    def video_poll_min_interval(self) -> float:
+        return self.get('generation_settings.video.poll_min_interval_seconds', 5)
+
+    @property
+    def video_poll_max_interval(self) -> float:
+        return self.get('generation_settings.video.poll_max_interval_seconds', 60)
+
+    @property
+    def video_expected_duration(self) -> float:
+        return self.get('generation_settings.video.expected_duration_seconds', 120)
+
+    @property
+    def job_max_workers(self) -> int:
+        return self.get('generation_settings.jobs.max_workers', 16)
+
+    @property
+    def job_retention_seconds(self) -> int:
+        return self.get('generation_settings.jobs.retention_seconds', 3600)
+
     @property
     def image_timeout(self) -> int:
         return self.get('generation_settings.image.timeout_seconds', 60)
@@ -0,0 +1,112 @@
+"""
+GCS Transfers for Video Generation Studio
+
+This module moves files between local disk and Google Cloud Storage. Objects
+at or above config.gcs_upload_threshold_mb are split into chunks that are
+transferred over several parallel streams with the storage transfer manager:
+uploads go through a multipart upload that GCS reassembles server-side, and
+downloads fetch byte ranges concurrently into one preallocated file. Smaller
+objects use a single request, where the extra round trips would not pay off.
+"""
+
+import mimetypes
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
+
+from google.cloud.storage import transfer_manager
+
+from config_manager import config
+from retry_policy import retry_policy
+
+
+class GcsTransfer:
+    def __init__(self, threshold_bytes: int, chunk_bytes: int = 32 * 1024 * 1024, max_workers: int = 8):
+        self.threshold_bytes = threshold_bytes
+        self.chunk_bytes = chunk_bytes
+        self.max_workers = max_workers
+        self._stats = {'uploads': 0, 'parallel_uploads': 0, 'downloads': 0, 'parallel_downloads': 0, 'bytes': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, kind: str, parallel: bool, size: int) -> None:
+        with self._lock:
+            self._stats[kind] += 1
+            if parallel:
+                self._stats[f"parallel_{kind}"] += 1
+            self._stats['bytes'] += size
+
+    def upload(self, blob, local_path: str, max_attempts: Optional[int] = None) -> None:
+        """
+        Upload local_path to blob, in parallel chunks if it is large. max_attempts
+        limits retry_policy's retries (the upload queue passes 1 and retries itself).
+        """
+        size = os.path.getsize(local_path)
+        parallel = size >= self.threshold_bytes
+        if parallel:
+            content_type = mimetypes.guess_type(local_path)[0] or 'application/octet-stream'
+            retry_policy.call(
+                'gcs', transfer_manager.upload_chunks_concurrently, local_path, blob,
+                content_type=content_type, chunk_size=self.chunk_bytes,
+                worker_type=transfer_manager.THREAD, max_workers=self.max_workers, max_attempts=max_attempts
+            )
+        else:
+            retry_policy.call('gcs', blob.upload_from_filename, local_path, max_attempts=max_attempts)
+        self._count('uploads', parallel, size)
+
+    def download(self, blob, local_path: str) -> None:
+        """
+        Download blob to local_path, in parallel byte ranges if it is large. The
+        file is written under a temporary name and moved into place when complete.
+        """
+        if blob.size is None:
+            retry_policy.call('gcs', blob.reload)
+        size = blob.size or 0
+        parallel = size >= self.threshold_bytes
+
+        os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+        tmp_path = f"{local_path}.download"
+        try:
+            if parallel:
+                retry_policy.call(
+                    'gcs', transfer_manager.download_chunks_concurrently, blob, tmp_path,
+                    chunk_size=self.chunk_bytes, worker_type=transfer_manager.THREAD,
+                    max_workers=self.max_workers
+                )
+            else:
+                retry_policy.call('gcs', blob.download_to_filename, tmp_path)
+            os.replace(tmp_path, local_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._count('downloads', parallel, size)
+
+    def run_many(self, fn: Callable[[str], Any], items: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Apply fn to every item on a bounded pool; returns item -> error message
+        (None on success). Large items already fan out into parallel chunks, so
+        the pool is kept small.
+        """
+        def attempt(item):
+            try:
+                fn(item)
+                return None
+            except Exception as e:
+                print(f"⚠️  Transfer of {item} failed: {e}")
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(4, len(items))), thread_name_prefix='gcs-transfer') as pool:
+            return dict(zip(items, pool.map(attempt, items)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Transfer counts (how many went through parallel chunks) and bytes moved"""
+        with self._lock:
+            return {**self._stats, 'threshold_bytes': self.threshold_bytes}
+
+
+# Create global GCS transfer instance
+gcs_transfer = GcsTransfer(
+    threshold_bytes=config.gcs_upload_threshold_mb * 1024 * 1024,
+    chunk_bytes=config.get('gcs_transfer.chunk_mb', 32) * 1024 * 1024,
+    max_workers=config.get('gcs_transfer.max_workers', 8)
+)
@@ -0,0 +1,309 @@
+"""
+Background GCS Uploads for Video Generation Studio
+
+This module copies generated and uploaded files to Google Cloud Storage after
+the response has been sent, so request latency only depends on the local disk.
+Uploads are queued in SQLite (and so survive a restart), run on a bounded pool
+of worker threads, are retried with exponential backoff, and their state
+(pending / uploading / uploaded / failed) is written to the asset catalog for
+the listing endpoints. With several server worker processes they share one
+queue: an upload is claimed atomically by one of them, and uploads whose
+owning process has exited are queued again. On shutdown the queue is flushed
+for a bounded time; anything left over is picked up on the next start.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from asset_catalog import asset_catalog
+from config_manager import config
+from gcs_transfer import gcs_transfer
+from job_manager import pid_alive
+
+
+class GcsUploadQueue:
+    def __init__(self, db_path: str, workers: int = 4, max_attempts: int = 8,
+                 base_delay: float = 5.0, max_delay: float = 900.0, flush_timeout: float = 60.0):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.flush_timeout = flush_timeout
+        self._bucket_factory: Optional[Callable[[], Any]] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._flush_started: Optional[float] = None
+        self._changed = threading.Condition()
+
+    def set_bucket_factory(self, factory: Callable[[], Any]) -> None:
+        """Set the callable returning the google.cloud.storage bucket uploads go to"""
+        self._bucket_factory = factory
+
+    def _connect_locked(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS uploads (
+                    local_path TEXT PRIMARY KEY,
+                    gcs_path TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL DEFAULT 0,
+                    error TEXT,
+                    enqueued REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    owner INTEGER
+                )
+            ''')
+            columns = [row['name'] for row in self._db.execute('PRAGMA table_info(uploads)')]
+            if 'owner' not in columns:
+                self._db.execute('ALTER TABLE uploads ADD COLUMN owner INTEGER')
+            self._db.execute('CREATE INDEX IF NOT EXISTS uploads_due ON uploads (state, next_attempt)')
+        return self._db
+
+    def start(self) -> None:
+        """Start the workers (idempotent); uploads interrupted by a restart are queued again"""
+        with self._changed:
+            if self._threads or self._stopping:
+                return
+            db = self._connect_locked()
+            # This process has no uploads running yet, so rows it appears to own are from an
+            # earlier process that had the same ID
+            self._requeue_orphans_locked(db, (os.getpid(),))
+            # Older queues stored paths as given; keys are absolute now
+            for row in db.execute('SELECT local_path FROM uploads').fetchall():
+                if not os.path.isabs(row['local_path']):
+                    db.execute('UPDATE OR REPLACE uploads SET local_path = ? WHERE local_path = ?',
+                               (os.path.abspath(row['local_path']), row['local_path']))
+            db.commit()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"gcs-upload-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            atexit.register(self.shutdown)
+
+    def enqueue(self, local_path: str, gcs_path: str) -> None:
+        """Queue local_path for upload to gcs_path in the configured bucket"""
+        local_path = os.path.abspath(local_path)
+        now = time.time()
+        with self._changed:
+            db = self._connect_locked()
+            db.execute(
+                "INSERT OR REPLACE INTO uploads (local_path, gcs_path, state, attempts, next_attempt, error, "
+                "enqueued, updated) VALUES (?, ?, 'pending', 0, 0, NULL, ?, ?)",
+                (local_path, gcs_path, now, now)
+            )
+            db.commit()
+            self._changed.notify()
+        asset_catalog.set_upload_state(local_path, 'pending')
+        self.start()
+
+    def cancel(self, local_path: str) -> None:
+        """Drop a queued upload, e.g. because the file was deleted"""
+        local_path = os.path.abspath(local_path)
+        with self._changed:
+            db = self._connect_locked()
+            db.execute('DELETE FROM uploads WHERE local_path = ?', (local_path,))
+            db.commit()
+
+    def _requeue_orphans_locked(self, db: sqlite3.Connection, dead_pids: Tuple[int, ...] = ()) -> None:
+        """Queue again uploads whose owning worker process has exited mid-upload"""
+        orphaned = [row['local_path'] for row in db.execute(
+            "SELECT local_path, owner FROM uploads WHERE state = 'uploading'"
+        ) if row['owner'] is None or row['owner'] in dead_pids or not pid_alive(row['owner'])]
+        db.executemany(
+            "UPDATE uploads SET state = 'pending', owner = NULL WHERE local_path = ? AND state = 'uploading'",
+            [(path,) for path in orphaned]
+        )
+        db.commit()
+
+    def _due_clause(self) -> tuple:
+        """
+        SQL condition (and parameters) for pending uploads that may start now.
+        While flushing, uploads waiting out a backoff get one extra attempt each:
+        those not attempted since the flush began.
+        """
+        flush_started = -1.0 if self._flush_started is None else self._flush_started
+        return "state = 'pending' AND (next_attempt <= ? OR updated < ?)", (time.time(), flush_started)
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Next due upload, marked as uploading, or None after waiting a while for one"""
+        with self._changed:
+            while not self._stopping:
+                db = self._connect_locked()
+                clause, params = self._due_clause()
+                row = db.execute(
+                    f"SELECT * FROM uploads WHERE {clause} ORDER BY next_attempt, enqueued LIMIT 1", params
+                ).fetchone()
+                if row is not None:
+                    # Another worker process may claim the same row between the SELECT and here
+                    claimed = db.execute(
+                        "UPDATE uploads SET state = 'uploading', owner = ?, updated = ? "
+                        "WHERE local_path = ? AND state = 'pending'",
+                        (os.getpid(), time.time(), row['local_path'])
+                    ).rowcount
+                    db.commit()
+                    if claimed:
+                        return dict(row)
+                    continue
+                self._requeue_orphans_locked(db)
+                upcoming = db.execute(
+                    "SELECT MIN(next_attempt) FROM uploads WHERE state = 'pending'"
+                ).fetchone()[0]
+                self._changed.wait(timeout=max(0.1, min(30.0, (upcoming or time.time() + 30) - time.time())))
+        return None
+
+    def _finish(self, local_path: str, **changes) -> None:
+        changes['updated'] = time.time()
+        assignments = ', '.join(f"{column} = ?" for column in changes)
+        with self._changed:
+            db = self._connect_locked()
+            # The row may have been re-queued or cancelled while the upload ran
+            db.execute(
+                f"UPDATE uploads SET {assignments}, owner = NULL "
+                "WHERE local_path = ? AND state = 'uploading' AND owner = ?",
+                (*changes.values(), local_path, os.getpid())
+            )
+            db.commit()
+            self._changed.notify_all()
+
+    def _work(self) -> None:
+        while True:
+            item = self._claim()
+            if item is None:
+                return
+            local_path = item['local_path']
+            if not os.path.exists(local_path):
+                self.cancel(local_path)
+                continue
+
+            # Identical content uploaded under another name is shared instead of sent again
+            content = asset_catalog.content_of(local_path)
+            if content is not None and content['gcs_url']:
+                self._finish(local_path, state='uploaded', error=None)
+                asset_catalog.set_upload_state(local_path, 'uploaded', gcs_url=content['gcs_url'])
+                print(f"♻️  {local_path} is already in GCS as {content['gcs_url']}")
+                continue
+
+            asset_catalog.set_upload_state(local_path, 'uploading')
+            try:
+                blob = self._bucket_factory().blob(item['gcs_path'])
+                # Large files go up as parallel chunks that GCS reassembles. One attempt
+                # per claim: the queue's own backoff does the retrying
+                gcs_transfer.upload(blob, local_path, max_attempts=1)
+            except Exception as e:
+                attempts = item['attempts'] + 1
+                if attempts >= self.max_attempts:
+                    print(f"❌ GCS upload of {local_path} failed after {attempts} attempts: {e}")
+                    self._finish(local_path, state='failed', attempts=attempts, error=str(e))
+                    asset_catalog.set_upload_state(local_path, 'failed')
+                else:
+                    delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                    print(f"⚠️  GCS upload of {local_path} failed ({e}); retry {attempts} in {delay:.0f}s")
+                    self._finish(local_path, state='pending', attempts=attempts, error=str(e),
+                                 next_attempt=time.time() + delay)
+                    asset_catalog.set_upload_state(local_path, 'pending')
+                continue
+
+            gcs_url = f"gs://{blob.bucket.name}/{item['gcs_path']}"
+            self._finish(local_path, state='uploaded', error=None)
+            asset_catalog.set_upload_state(local_path, 'uploaded', gcs_url=gcs_url)
+            print(f"☁️  Uploaded {local_path} to {gcs_url}")
+
+    def status(self, local_path: str) -> Optional[Dict[str, Any]]:
+        """Queue entry for a file, or None if it was never queued"""
+        with self._changed:
+            row = self._connect_locked().execute(
+                'SELECT * FROM uploads WHERE local_path = ?', (os.path.abspath(local_path),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        """Uploads that are pending, running or have failed"""
+        with self._changed:
+            rows = self._connect_locked().execute(
+                "SELECT * FROM uploads WHERE state != 'uploaded' ORDER BY enqueued"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def retry_failed(self) -> int:
+        """Queue failed uploads again; returns how many"""
+        with self._changed:
+            db = self._connect_locked()
+            paths = [row['local_path'] for row in db.execute("SELECT local_path FROM uploads WHERE state = 'failed'")]
+            db.execute("UPDATE uploads SET state = 'pending', attempts = 0, next_attempt = 0 WHERE state = 'failed'")
+            db.commit()
+            self._changed.notify_all()
+        for path in paths:
+            asset_catalog.set_upload_state(path, 'pending')
+        if paths:
+            self.start()
+        return len(paths)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Upload everything queued now, giving uploads that are waiting out a
+        backoff one more attempt each (failures are not retried in a loop).
+        Returns True if the queue drained within timeout.
+        """
+        deadline = time.time() + (self.flush_timeout if timeout is None else timeout)
+        with self._changed:
+            self._flush_started = time.time()
+            self._changed.notify_all()
+            try:
+                while time.time() < deadline:
+                    db = self._connect_locked()
+                    clause, params = self._due_clause()
+                    # Uploads running in other worker processes are theirs to finish
+                    active = db.execute(
+                        f"SELECT COUNT(*) FROM uploads WHERE (state = 'uploading' AND owner = ?) OR ({clause})",
+                        (os.getpid(), *params)
+                    ).fetchone()[0]
+                    if active == 0 or not self._threads:
+                        return db.execute(
+                            "SELECT COUNT(*) FROM uploads WHERE state IN ('pending', 'uploading')"
+                        ).fetchone()[0] == 0
+                    self._changed.wait(timeout=min(1.0, deadline - time.time()))
+                return False
+            finally:
+                self._flush_started = None
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Flush the queue and stop the workers; unfinished uploads resume on the next start"""
+        if self._stopping or not self._threads:
+            return
+        if not self.flush(timeout):
+            print("⚠️  Shutting down with GCS uploads still queued; they resume on next start")
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of queued uploads per state"""
+        with self._changed:
+            rows = self._connect_locked().execute(
+                'SELECT state, COUNT(*) AS count FROM uploads GROUP BY state'
+            ).fetchall()
+        return {'workers': self.workers, **{row['state']: row['count'] for row in rows}}
+
+
+# Create global GCS upload queue instance
+gcs_uploads = GcsUploadQueue(
+    os.path.join(config.local_output_dir, 'gcs_uploads.sqlite3'),
+    workers=config.get('gcs_uploads.workers', 4),
+    max_attempts=config.get('gcs_uploads.max_attempts', 8),
+    base_delay=config.get('gcs_uploads.base_delay_seconds', 5.0),
+    max_delay=config.get('gcs_uploads.max_delay_seconds', 900.0),
+    flush_timeout=config.get('gcs_uploads.flush_timeout_seconds', 60.0)
+)
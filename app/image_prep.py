@@ -0,0 +1,159 @@
+"""
+Reference Image Preprocessing for Video Generation Studio
+
+This module prepares reference images before they are sent to Gemini: files
+are loaded concurrently, the real format is sniffed from magic bytes, images
+larger than the configured maximum edge are downscaled and re-encoded, and the
+prepared bytes are cached by content hash so the same reference is only
+processed once.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from config_manager import config
+from image_refs import image_refs
+
+# Formats Gemini accepts as-is when they are already small enough
+PASSTHROUGH_MIME_TYPES = ('image/jpeg', 'image/png', 'image/webp')
+
+
+def sniff_image_mime(data: bytes) -> Optional[str]:
+    """Mime type from the file's magic bytes, or None if it is not a known image format"""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data.startswith(b'BM'):
+        return 'image/bmp'
+    if data[:4] in (b'II*\x00', b'MM\x00*'):
+        return 'image/tiff'
+    if data[4:8] == b'ftyp' and data[8:12] in (b'heic', b'heix', b'mif1', b'msf1'):
+        return 'image/heic'
+    return None
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class ReferenceImagePreprocessor:
+    def __init__(self, max_edge: int = 1536, jpeg_quality: int = 90, cache_bytes: int = 128 * 1024 * 1024):
+        self.max_edge = max_edge
+        self.jpeg_quality = jpeg_quality
+        self.cache_bytes = cache_bytes
+        # (abspath, size, mtime_ns) -> source sha256, so unchanged files are not re-read
+        self._sources: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        # source sha256 -> prepared image
+        self._prepared: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def _process(self, data: bytes) -> Dict[str, Any]:
+        """Downscale and re-encode if needed (runs on a worker thread)"""
+        mime_type = sniff_image_mime(data)
+        if mime_type is None:
+            raise ValueError("Unsupported or corrupt image file")
+        if mime_type == 'image/heic':
+            # Pillow cannot decode HEIC without a plugin; Gemini accepts it directly
+            return {'data': data, 'mime_type': mime_type, 'width': None, 'height': None}
+
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            if max(width, height) <= self.max_edge and mime_type in PASSTHROUGH_MIME_TYPES:
+                return {'data': data, 'mime_type': mime_type, 'width': width, 'height': height}
+
+            if mime_type == 'image/jpeg':
+                # Let the JPEG decoder skip straight to a reduced scale
+                image.draft('RGB', (self.max_edge, self.max_edge))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+
+            output = io.BytesIO()
+            has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+            if has_alpha:
+                image.save(output, format='PNG')
+                mime_type = 'image/png'
+            else:
+                image.convert('RGB').save(output, format='JPEG', quality=self.jpeg_quality, optimize=True)
+                mime_type = 'image/jpeg'
+            return {'data': output.getvalue(), 'mime_type': mime_type,
+                    'width': image.width, 'height': image.height}
+
+    def _remember_locked(self, source_sha: str, prepared: Dict[str, Any]) -> None:
+        if source_sha in self._prepared:
+            self._cached_bytes -= len(self._prepared.pop(source_sha)['data'])
+        self._prepared[source_sha] = prepared
+        self._cached_bytes += len(prepared['data'])
+        while self._cached_bytes > self.cache_bytes and len(self._prepared) > 1:
+            _, evicted = self._prepared.popitem(last=False)
+            self._cached_bytes -= len(evicted['data'])
+
+    async def prepare(self, path: str) -> Dict[str, Any]:
+        """
+        Prepared version of the image at path:
+        {'data', 'mime_type', 'sha256', 'source_sha256', 'width', 'height', 'source_bytes'}
+        """
+        stat = await asyncio.to_thread(os.stat, path)
+        file_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            source_sha = self._sources.get(file_key)
+            prepared = self._prepared.get(source_sha) if source_sha else None
+            if prepared is not None:
+                self._prepared.move_to_end(source_sha)
+                return prepared
+
+        data = await asyncio.to_thread(_read_bytes, path)
+        source_sha = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            self._sources[file_key] = source_sha
+            while len(self._sources) > 1024:
+                self._sources.popitem(last=False)
+            prepared = self._prepared.get(source_sha)
+        if prepared is not None:
+            return prepared
+
+        prepared = await asyncio.to_thread(self._process, data)
+        prepared.update(sha256=hashlib.sha256(prepared['data']).hexdigest(),
+                        source_sha256=source_sha, source_bytes=len(data))
+        if prepared['source_bytes'] != len(prepared['data']):
+            print(f"🗜️  Prepared {os.path.basename(path)}: {len(data) // 1024} KB -> "
+                  f"{len(prepared['data']) // 1024} KB ({prepared['width']}x{prepared['height']})")
+
+        with self._lock:
+            self._remember_locked(source_sha, prepared)
+        return prepared
+
+    async def prepare_many(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """Prepare several images concurrently, keeping their order"""
+        return list(await asyncio.gather(*[self.prepare(path) for path in paths]))
+
+    async def parts(self, client, paths: List[str]) -> list:
+        """Request Parts for the prepared images, uploaded once per content via the image reference registry"""
+        prepared = await self.prepare_many(paths)
+        return list(await asyncio.gather(*[
+            image_refs.part_for_bytes(client, image['data'], image['mime_type'], image['sha256'])
+            for image in prepared
+        ]))
+
+
+# Create global reference image preprocessor instance
+image_prep = ReferenceImagePreprocessor(
+    max_edge=config.get('image_preprocessing.max_edge', 1536),
+    jpeg_quality=config.get('image_preprocessing.jpeg_quality', 90),
+    cache_bytes=config.get('image_preprocessing.cache_mb', 128) * 1024 * 1024
+)
@@ -0,0 +1,153 @@
+"""
+Image References for Video Generation Studio
+
+This module turns source images into request Parts so the same bytes are not
+re-read and re-sent on every call. Images are keyed by content hash: for the
+Gemini Developer API they are uploaded once through the Files API and later
+calls pass the file URI (re-uploading shortly before the file expires). Vertex
+AI has no Files API, so there the prepared inline Part is memoized instead.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from google.genai import types
+
+from config_manager import config
+from request_coalescer import request_coalescer
+from retry_policy import retry_policy
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class ImageReferenceRegistry:
+    def __init__(self, ttl_seconds: float = 47 * 3600, refresh_margin: float = 600,
+                 max_entries: int = 64):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        # (abspath, size, mtime_ns) -> sha256, so unchanged files are not re-read
+        self._hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        # sha256 -> {'data', 'mime_type', 'inline': Part, 'file': {...}}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stats = {'uploads': 0, 'reused': 0, 'inline': 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _uses_files_api(client) -> bool:
+        return not getattr(client, 'vertexai', False)
+
+    def _remember_locked(self, table: OrderedDict, key, value) -> None:
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.max_entries:
+            table.popitem(last=False)
+
+    async def part_for_file(self, client, path: str, mime_type: str) -> types.Part:
+        """Part referencing the image at path; the file is only read again if it changed"""
+        stat = await asyncio.to_thread(os.stat, path)
+        file_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            sha = self._hashes.get(file_key)
+            entry = self._entries.get(sha) if sha else None
+
+        if entry is None:
+            data = await asyncio.to_thread(_read_bytes, path)
+            sha = hashlib.sha256(data).hexdigest()
+            with self._lock:
+                self._remember_locked(self._hashes, file_key, sha)
+            return await self.part_for_bytes(client, data, mime_type, sha)
+
+        return await self.part_for_bytes(client, entry['data'], mime_type, sha)
+
+    async def content_hash(self, path: str) -> str:
+        """SHA-256 of the image at path, only re-read if the file changed"""
+        stat = await asyncio.to_thread(os.stat, path)
+        file_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            sha = self._hashes.get(file_key)
+        if sha is None:
+            data = await asyncio.to_thread(_read_bytes, path)
+            sha = hashlib.sha256(data).hexdigest()
+            with self._lock:
+                self._remember_locked(self._hashes, file_key, sha)
+        return sha
+
+    async def part_for_bytes(self, client, data: bytes, mime_type: str, sha: Optional[str] = None) -> types.Part:
+        """Part for in-memory image bytes, uploaded at most once per content hash"""
+        sha = sha or hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            entry = self._entries.get(sha)
+            if entry is None or entry['mime_type'] != mime_type:
+                entry = {'data': data, 'mime_type': mime_type, 'inline': None, 'file': None}
+                self._remember_locked(self._entries, sha, entry)
+            else:
+                self._entries.move_to_end(sha)
+
+        if self._uses_files_api(client):
+            uploaded = entry['file']
+            if uploaded and uploaded['expires_at'] - self.refresh_margin > time.time():
+                with self._lock:
+                    self._stats['reused'] += 1
+                return types.Part.from_uri(file_uri=uploaded['uri'], mime_type=uploaded['mime_type'])
+
+            try:
+                # Concurrent requests for the same image share one upload
+                uploaded = await request_coalescer.run(f"image-ref:{sha}", self._upload, client, entry, sha)
+                return types.Part.from_uri(file_uri=uploaded['uri'], mime_type=uploaded['mime_type'])
+            except Exception as e:
+                print(f"⚠️  Files API upload failed, sending image inline: {e}")
+
+        with self._lock:
+            self._stats['inline'] += 1
+            if entry['inline'] is None:
+                entry['inline'] = types.Part.from_bytes(data=entry['data'], mime_type=mime_type)
+            return entry['inline']
+
+    async def _upload(self, client, entry: Dict[str, Any], sha: str) -> Dict[str, Any]:
+        uploaded = entry['file']
+        if uploaded and uploaded['expires_at'] - self.refresh_margin > time.time():
+            return uploaded
+
+        file = await retry_policy.call_async(
+            'gemini', client.aio.files.upload,
+            file=io.BytesIO(entry['data']),
+            config=types.UploadFileConfig(mime_type=entry['mime_type'], display_name=f"ref-{sha[:16]}")
+        )
+        expires_at = file.expiration_time.timestamp() if file.expiration_time else time.time() + self.ttl_seconds
+        uploaded = {
+            'uri': file.uri,
+            'name': file.name,
+            'mime_type': file.mime_type or entry['mime_type'],
+            'expires_at': min(expires_at, time.time() + self.ttl_seconds)
+        }
+        with self._lock:
+            entry['file'] = uploaded
+            self._stats['uploads'] += 1
+        print(f"📤 Uploaded reference image {sha[:12]} as {file.name}")
+        return uploaded
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts of uploads, reused file references and inline sends"""
+        with self._lock:
+            return {**self._stats, 'cached_images': len(self._entries)}
+
+
+# Create global image reference registry instance
+image_refs = ImageReferenceRegistry(
+    ttl_seconds=config.get('image_refs.ttl_seconds', 47 * 3600),
+    refresh_margin=config.get('image_refs.refresh_margin_seconds', 600),
+    max_entries=config.get('image_refs.max_entries', 64)
+)
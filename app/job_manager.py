@@ -0,0 +1,259 @@
+"""
+Job Manager for Video Generation Studio
+
+This module runs long generation tasks in the background so request handlers
+can return a job ID immediately and the browser can poll for the result.
+Jobs run as tasks on the shared async runtime, so a waiting job costs a
+coroutine rather than a thread. Job state is kept in SQLite, so with several
+server worker processes a poll or event stream can be answered by any of
+them, not only the one running the job.
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from config_manager import config
+from async_runtime import runtime
+
+TERMINAL_STATES = ('succeeded', 'failed', 'cancelled')
+
+# Columns stored as JSON text
+_JSON_COLUMNS = ('params', 'progress', 'result')
+
+# ID of the job the current coroutine is running under
+_current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('current_job', default=None)
+
+
+def pid_alive(pid: int) -> bool:
+    """True if a process with this ID is running (it may belong to another user)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobManager:
+    def __init__(self, db_path: str, max_workers: int = 16, retention_seconds: int = 3600,
+                 poll_interval: float = 0.5):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.retention_seconds = retention_seconds
+        self.poll_interval = poll_interval
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._futures: Dict[str, Any] = {}
+        self._changed = threading.Condition()
+
+    def _connect_locked(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    owner INTEGER NOT NULL
+                )
+            ''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)')
+            # Jobs whose worker process has exited will never finish
+            orphaned = [row['job_id'] for row in self._db.execute(
+                "SELECT job_id, owner FROM jobs WHERE status IN ('queued', 'running')"
+            ) if not pid_alive(row['owner'])]
+            self._db.executemany(
+                "UPDATE jobs SET status = 'failed', error = 'Server worker exited before the job finished', "
+                "finished_at = ?, version = version + 1 WHERE job_id = ?",
+                [(time.time(), job_id) for job_id in orphaned]
+            )
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def _snapshot(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        del job['owner']
+        for column in _JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] is not None else None
+        return job
+
+    def submit(self, kind: str, coro_fn: Callable[..., Awaitable[Dict[str, Any]]],
+               *args, params: Optional[Dict[str, Any]] = None, **kwargs) -> str:
+        """
+        Queue a coroutine function for background execution and return its job ID.
+        The coroutine is expected to return a result dict; a dict containing
+        an 'error' key marks the job as failed.
+        """
+        job_id = uuid.uuid4().hex
+
+        with self._changed:
+            db = self._connect_locked()
+            self._prune_locked(db)
+            db.execute(
+                "INSERT INTO jobs (job_id, kind, status, params, created_at, owner) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(params or {}, default=str), time.time(), os.getpid())
+            )
+            db.commit()
+            self._futures[job_id] = runtime.submit(self._run(job_id, coro_fn, args, kwargs))
+
+        return job_id
+
+    async def _run(self, job_id: str, coro_fn, args, kwargs) -> None:
+        if self._slots is None:
+            # Created lazily so it binds to the runtime loop
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        try:
+            async with self._slots:
+                await self._execute(job_id, coro_fn, args, kwargs)
+        except BaseException:
+            # Cancelled (e.g. at shutdown) while queued or running: the job must not stay
+            # 'queued' or 'running' in the shared store. _execute handles ordinary errors
+            self._update(job_id, status='failed', error='Job was interrupted before it finished',
+                         finished_at=time.time())
+            raise
+        finally:
+            with self._changed:
+                self._futures.pop(job_id, None)
+
+    async def _execute(self, job_id: str, coro_fn, args, kwargs) -> None:
+        if not self._update(job_id, status='running', started_at=time.time()):
+            return
+        _current_job.set(job_id)
+
+        try:
+            result = await coro_fn(*args, **kwargs)
+        except Exception as e:
+            self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+            return
+
+        if isinstance(result, dict) and result.get('error'):
+            self._update(job_id, status='failed', result=result, error=result['error'],
+                         finished_at=time.time())
+        else:
+            self._update(job_id, status='succeeded', result=result, finished_at=time.time())
+
+    def _update(self, job_id: str, **changes) -> bool:
+        """Apply changes to a job and wake any subscribers. Returns False if the job is gone or cancelled."""
+        values = {column: json.dumps(value, default=str) if column in _JSON_COLUMNS else value
+                  for column, value in changes.items()}
+        assignments = ', '.join(f"{column} = ?" for column in values)
+        with self._changed:
+            db = self._connect_locked()
+            # A job cancelled from another worker process stays cancelled
+            updated = db.execute(
+                f"UPDATE jobs SET {assignments}, version = version + 1 WHERE job_id = ? AND status != 'cancelled'",
+                (*values.values(), job_id)
+            ).rowcount
+            db.commit()
+            self._changed.notify_all()
+            return updated > 0
+
+    def publish_progress(self, **progress) -> bool:
+        """
+        Attach partial results to the job the calling coroutine runs under, so
+        pollers and event streams see them before the job finishes. Outside a
+        job this is a no-op and returns False.
+        """
+        job_id = _current_job.get()
+        if job_id is None:
+            return False
+        return self._update(job_id, progress=progress)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a snapshot of a job's current state"""
+        with self._changed:
+            return self._snapshot(self._connect_locked().execute(
+                'SELECT * FROM jobs WHERE job_id = ?', (job_id,)
+            ).fetchone())
+
+    def list_jobs(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List job snapshots, newest first"""
+        with self._changed:
+            db = self._connect_locked()
+            if kind is None:
+                rows = db.execute('SELECT * FROM jobs ORDER BY created_at DESC').fetchall()
+            else:
+                rows = db.execute('SELECT * FROM jobs WHERE kind = ? ORDER BY created_at DESC', (kind,)).fetchall()
+        return [self._snapshot(row) for row in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started running yet (from any worker process)"""
+        with self._changed:
+            db = self._connect_locked()
+            cancelled = db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ?, version = version + 1 "
+                "WHERE job_id = ? AND status = 'queued'", (time.time(), job_id)
+            ).rowcount
+            db.commit()
+            if not cancelled:
+                return False
+            future = self._futures.pop(job_id, None)
+            if future is not None:
+                future.cancel()
+            self._changed.notify_all()
+            return True
+
+    def wait_for_change(self, job_id: str, version: int, timeout: float = 15.0) -> Optional[Dict[str, Any]]:
+        """
+        Block until the job's version moves past `version` or the timeout expires.
+        Returns the latest snapshot, or None if the job does not exist. Changes
+        made in this process wake the waiter at once; changes from other worker
+        processes are seen within poll_interval.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['version'] != version or remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(timeout=min(self.poll_interval, remaining))
+
+    def _prune_locked(self, db: sqlite3.Connection) -> None:
+        """Drop finished jobs older than the retention window"""
+        db.execute(
+            f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(TERMINAL_STATES))}) AND COALESCE(finished_at, 0) < ?",
+            (*TERMINAL_STATES, time.time() - self.retention_seconds)
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Cancel this process's queued jobs and optionally wait for its running ones"""
+        with self._changed:
+            futures = dict(self._futures)
+        for job_id in futures:
+            self.cancel(job_id)
+        if wait:
+            for future in futures.values():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+
+
+# Create global job manager instance
+job_manager = JobManager(os.path.join(config.local_output_dir, 'jobs.sqlite3'),
+                         max_workers=config.job_max_workers,
+                         retention_seconds=config.job_retention_seconds)
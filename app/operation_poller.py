@@ -0,0 +1,281 @@
+"""
+Operation Poller for Video Generation Studio
+
+This module tracks every in-flight Veo long-running operation in one place and
+schedules their polls from a single task on the event loop; each poll runs as
+its own task, so operations that come due together are refreshed concurrently.
+Poll times are scheduled from the observed completion times per model and
+resolution, and a 429 on operations.get backs off every poll together instead
+of each caller retrying on its own. Other transient failures retry that one
+operation's poll with backoff; only permanent errors fail its waiters.
+"""
+
+import asyncio
+import inspect
+import random
+import threading
+import time
+from typing import Dict, Any, Optional, Callable
+
+from config_manager import config
+from retry_policy import CircuitOpenError, is_throttle, is_transient
+
+
+def _resolve(future: asyncio.Future, result: Any = None, error: Optional[Exception] = None) -> None:
+    # Runs on the waiter's own event loop
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class OperationPoller:
+    def __init__(self, min_interval: float = 5.0, max_interval: float = 60.0,
+                 default_duration: float = 120.0, backoff_base: float = 15.0,
+                 backoff_max: float = 300.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_duration = default_duration
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._fetch: Optional[Callable[[Any], Any]] = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._durations: Dict[str, float] = {}
+        self._paused_until = 0.0
+        self._consecutive_throttles = 0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._task_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def set_fetcher(self, fetch: Callable[[Any], Any]) -> None:
+        """Set the callable used to refresh an operation (e.g. client.aio.operations.get)"""
+        self._fetch = fetch
+
+    async def wait(self, operation, model_id: str, resolution: str = '') -> Any:
+        """
+        Wait until the operation is done and return the completed operation.
+        Concurrent waits on the same operation share a single poll schedule.
+        """
+        if operation.done:
+            return operation
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = f"{model_id}:{resolution}"
+        name = operation.name or str(id(operation))
+
+        with self._lock:
+            entry = self._pending.get(name)
+            if entry is None:
+                now = time.time()
+                entry = {
+                    'operation': operation,
+                    'key': key,
+                    'submitted_at': now,
+                    'next_poll': max(now + self._next_delay(key, 0.0), self._paused_until),
+                    'polls': 0,
+                    'waiters': []
+                }
+                self._pending[name] = entry
+            entry['waiters'].append((loop, future))
+
+        self._ensure_task(loop)
+        self._wake()
+        try:
+            while True:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(future), timeout=self.max_interval)
+                except asyncio.TimeoutError:
+                    # The poller may have stopped with the loop it ran on (another
+                    # thread's, now finished); restart it here if so
+                    self._ensure_task(loop)
+                    self._wake()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    def expected_duration(self, key: str) -> float:
+        """Learned completion time for a model/resolution key, in seconds"""
+        return self._durations.get(key, self.default_duration)
+
+    def _next_delay(self, key: str, elapsed: float) -> float:
+        """Aim polls at the expected completion time, halving the gap each time"""
+        remaining = self.expected_duration(key) - elapsed
+        if remaining > 0:
+            delay = remaining / 2
+        else:
+            # Overdue: poll steadily, a little less often the longer it runs
+            delay = elapsed * 0.1
+        return min(self.max_interval, max(self.min_interval, delay))
+
+    def _record_duration(self, key: str, duration: float) -> None:
+        previous = self._durations.get(key)
+        if previous is None:
+            self._durations[key] = duration
+        else:
+            # Exponentially weighted moving average
+            self._durations[key] = 0.7 * previous + 0.3 * duration
+
+    def _ensure_task(self, loop: asyncio.AbstractEventLoop) -> None:
+        with self._lock:
+            if (self._task is not None and not self._task.done()
+                    and not self._task_loop.is_closed()):
+                return
+            # Polls started by a previous task died with it (its loop may have closed)
+            for entry in self._pending.values():
+                entry['polling'] = False
+            self._task_loop = loop
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    def _wake(self) -> None:
+        """Re-evaluate the poll schedule; safe to call from any thread or loop"""
+        with self._lock:
+            loop, wakeup = self._task_loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # The poller's loop has already closed
+            pass
+
+    async def _run(self) -> None:
+        polls = set()
+        while True:
+            self._wakeup.clear()
+            with self._lock:
+                # Drop operations nobody is waiting on anymore
+                for name in [n for n, e in self._pending.items()
+                             if all(f.done() for _, f in e['waiters'])]:
+                    del self._pending[name]
+
+                now = time.time()
+                idle = {n: e for n, e in self._pending.items() if not e.get('polling')}
+                if not idle:
+                    timeout, due = 30.0, []
+                else:
+                    timeout = min(e['next_poll'] for e in idle.values()) - now
+                    due = [(n, e) for n, e in idle.items() if e['next_poll'] <= now]
+                for _, entry in due:
+                    entry['polling'] = True
+
+            if not due:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, timeout))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Each poll runs on its own, so one that is slow or retrying holds up no other
+            for name, entry in due:
+                task = asyncio.ensure_future(self._poll(name, entry))
+                polls.add(task)
+                task.add_done_callback(polls.discard)
+
+    async def _poll(self, name: str, entry: Dict[str, Any]) -> None:
+        """Refresh one operation and reschedule it, or hand the outcome to its waiters"""
+        try:
+            operation = self._fetch(entry['operation'])
+            if inspect.isawaitable(operation):
+                operation = await operation
+        except Exception as e:
+            self._poll_failed(name, entry, e)
+        else:
+            self._poll_succeeded(name, entry, operation)
+        finally:
+            entry['polling'] = False
+            self._wake()
+
+    def _poll_succeeded(self, name: str, entry: Dict[str, Any], operation) -> None:
+        now = time.time()
+        with self._lock:
+            self._consecutive_throttles = 0
+            entry['operation'] = operation
+            entry['polls'] += 1
+            entry['failures'] = 0
+
+            if not operation.done:
+                elapsed = now - entry['submitted_at']
+                entry['next_poll'] = max(now + self._next_delay(entry['key'], elapsed), self._paused_until)
+                return
+
+            self._pending.pop(name, None)
+            self._record_duration(entry['key'], now - entry['submitted_at'])
+
+        self._notify(entry, result=operation)
+
+    def _poll_failed(self, name: str, entry: Dict[str, Any], error: Exception) -> None:
+        """
+        A failed poll says nothing about the operation, which keeps running
+        server-side: throttles pause every poll, other transient errors (and an
+        open circuit) retry this one with backoff, and only a permanent error
+        is passed on to the waiters.
+        """
+        if is_throttle(error):
+            self._back_off()
+            return
+        if isinstance(error, CircuitOpenError) or is_transient(error):
+            with self._lock:
+                entry['failures'] = entry.get('failures', 0) + 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (entry['failures'] - 1))
+                delay += random.uniform(0, delay * 0.2)
+                if isinstance(error, CircuitOpenError):
+                    delay = max(delay, error.retry_in)
+                entry['next_poll'] = max(time.time() + delay, self._paused_until)
+            print(f"⚠️  Polling {name} failed ({error}); retrying in {delay:.0f}s")
+            return
+        with self._lock:
+            self._pending.pop(name, None)
+        self._notify(entry, error=error)
+
+    def _back_off(self) -> None:
+        """Pause all polls after a 429, growing the pause on consecutive throttles"""
+        with self._lock:
+            delay = min(self.backoff_max, self.backoff_base * (2 ** self._consecutive_throttles))
+            delay += random.uniform(0, delay * 0.2)
+            self._consecutive_throttles += 1
+            self._paused_until = time.time() + delay
+            for entry in self._pending.values():
+                entry['next_poll'] = max(entry['next_poll'], self._paused_until)
+        print(f"⏳ operations.get throttled, pausing all polls for {delay:.0f}s")
+
+    def _notify(self, entry: Dict[str, Any], result: Any = None, error: Optional[Exception] = None) -> None:
+        for loop, future in entry['waiters']:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+            except RuntimeError:
+                # The waiter's loop has already closed
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of in-flight operations and learned durations"""
+        now = time.time()
+        with self._lock:
+            return {
+                'in_flight': len(self._pending),
+                'paused_for_seconds': max(0.0, self._paused_until - now),
+                'expected_durations': dict(self._durations),
+                'operations': [
+                    {
+                        'name': name,
+                        'key': entry['key'],
+                        'elapsed_seconds': now - entry['submitted_at'],
+                        'polls': entry['polls'],
+                        'next_poll_in_seconds': max(0.0, entry['next_poll'] - now)
+                    }
+                    for name, entry in self._pending.items()
+                ]
+            }
+
+
+# Create global operation poller instance
+operation_poller = OperationPoller(
+    min_interval=config.video_poll_min_interval,
+    max_interval=config.video_poll_max_interval,
+    default_duration=config.video_expected_duration
+)
@@ -0,0 +1,275 @@
+"""
+Preview Derivatives for Video Generation Studio
+
+This module produces the small files the gallery shows instead of originals:
+WebP thumbnails of images, WebP poster frames of videos, and images resized
+on demand for ?w=/?h= preview requests. Derivatives are written once to an
+on-disk cache (bounded by size, least recently used evicted first) and
+thumbnails are generated in the background as soon as a file is created. It
+also provides the content hashes the preview endpoints use as strong ETags.
+"""
+
+import hashlib
+import io
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, Callable
+
+from PIL import Image, ImageOps
+
+from config_manager import config
+
+# Same lists the upload endpoints accept
+IMAGE_EXTENSIONS = tuple(f".{extension.lower()}" for extension in config.allowed_image_formats)
+VIDEO_EXTENSIONS = tuple(f".{extension.lower()}" for extension in config.allowed_video_formats)
+
+
+class PreviewCache:
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024, thumbnail_size: int = 320,
+                 max_dimension: int = 2048, quality: int = 80, workers: int = 2,
+                 inline_hash_bytes: int = 16 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.workers = workers
+        self.inline_hash_bytes = inline_hash_bytes
+        # derivative file name -> size, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # (abspath, size, mtime_ns) -> sha256, so unchanged files are only hashed once
+        self._hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._hashing: set = set()
+        self._content_lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None
+        self._lock = threading.Lock()
+
+    def set_content_lookup(self, lookup: Callable[[str], Optional[Dict[str, Any]]]) -> None:
+        """Set the callable returning the recorded {'sha256', 'size'} of a file, or None"""
+        self._content_lookup = lookup
+
+    def _submit(self, fn: Callable[[], None]) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='previews')
+            executor = self._executor
+        executor.submit(fn)
+
+    def _load_locked(self) -> None:
+        if self._loaded:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with os.scandir(self.cache_dir) as entries:
+            files = [(entry.stat().st_mtime, entry.name, entry.stat().st_size)
+                     for entry in entries if entry.is_file() and entry.name.endswith('.webp')]
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+        self._loaded = True
+
+    def _clamp(self, value: Optional[int]) -> Optional[int]:
+        if value is None:
+            return None
+        if value <= 0:
+            raise ValueError("Preview width and height must be positive")
+        return min(value, self.max_dimension)
+
+    def _cache_name(self, source: str, width: Optional[int], height: Optional[int], kind: str) -> str:
+        # Keyed by the source's identity and mtime, so a replaced file never serves a stale preview
+        stat = os.stat(source)
+        identity = f"{os.path.abspath(source)}|{stat.st_size}|{stat.st_mtime_ns}|{kind}|{width}|{height}"
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32] + '.webp'
+
+    def _lookup(self, name: str) -> Optional[str]:
+        path = os.path.join(self.cache_dir, name)
+        with self._lock:
+            self._load_locked()
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        if not os.path.exists(path):
+            with self._lock:
+                self._total_bytes -= self._entries.pop(name, 0)
+            return None
+        return path
+
+    def _store(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        evicted = []
+        with self._lock:
+            self._load_locked()
+            self._total_bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_name, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                evicted.append(old_name)
+        for old_name in evicted:
+            try:
+                os.remove(os.path.join(self.cache_dir, old_name))
+            except FileNotFoundError:
+                pass
+        return path
+
+    def _encode(self, image: Image.Image, width: Optional[int], height: Optional[int]) -> bytes:
+        image.thumbnail((width or self.max_dimension, height or self.max_dimension), Image.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        output = io.BytesIO()
+        image.save(output, format='WEBP', quality=self.quality, method=4)
+        return output.getvalue()
+
+    def image(self, source: str, width: Optional[int] = None, height: Optional[int] = None) -> str:
+        """Path of a WebP copy of the image fitting within width x height"""
+        width, height = self._clamp(width), self._clamp(height)
+        name = self._cache_name(source, width, height, 'image')
+        cached = self._lookup(name)
+        if cached:
+            return cached
+
+        with Image.open(source) as image:
+            # Let the JPEG decoder skip straight to a reduced scale
+            image.draft('RGB', (width or self.max_dimension, height or self.max_dimension))
+            data = self._encode(ImageOps.exif_transpose(image), width, height)
+        return self._store(name, data)
+
+    def video_poster(self, source: str, width: Optional[int] = None, height: Optional[int] = None) -> str:
+        """Path of a WebP poster frame of the video fitting within width x height"""
+        width, height = self._clamp(width), self._clamp(height)
+        name = self._cache_name(source, width, height, 'poster')
+        cached = self._lookup(name)
+        if cached:
+            return cached
+
+        frame = b''
+        # A frame a moment in is more representative than a fade-in; very short clips fall back to the start
+        for offset in ('0.5', '0'):
+            result = subprocess.run(
+                ['ffmpeg', '-v', 'error', '-ss', offset, '-i', source, '-frames:v', '1',
+                 '-f', 'image2pipe', '-vcodec', 'png', '-'],
+                capture_output=True, timeout=30
+            )
+            frame = result.stdout
+            if result.returncode == 0 and frame:
+                break
+        if not frame:
+            raise RuntimeError(f"Could not extract a poster frame from {source}")
+
+        with Image.open(io.BytesIO(frame)) as image:
+            data = self._encode(image, width, height)
+        return self._store(name, data)
+
+    def thumbnail(self, source: str) -> str:
+        """Path of the gallery thumbnail of an image or the poster of a video"""
+        if source.lower().endswith(VIDEO_EXTENSIONS):
+            return self.video_poster(source, self.thumbnail_size, self.thumbnail_size)
+        return self.image(source, self.thumbnail_size, self.thumbnail_size)
+
+    def pregenerate(self, source: str) -> None:
+        """Build the thumbnail of a newly written file in the background"""
+        if not source.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS):
+            return
+
+        def build():
+            try:
+                # The ETag is ready before the first preview request asks for it
+                self._hash(source)
+                self.thumbnail(source)
+            except Exception as e:
+                print(f"⚠️  Thumbnail generation failed for {source}: {e}")
+
+        self._submit(build)
+
+    def content_etag(self, path: str) -> Tuple[str, bool]:
+        """
+        ETag for the file at path and whether it is weak. The strong ETag is its
+        SHA-256, as recorded when the file was written or hashed once per change.
+        Large files nobody has hashed yet are hashed in the background and
+        meanwhile get a weak ETag from size and mtime, so a request (e.g. a video
+        seek) never waits for a full read.
+        """
+        stat = os.stat(path)
+        file_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        sha = self._known_hash(path, file_key)
+        if sha is not None:
+            return sha, False
+
+        if stat.st_size > self.inline_hash_bytes:
+            with self._lock:
+                queued = file_key in self._hashing
+                self._hashing.add(file_key)
+            if not queued:
+                self._submit(lambda: self._hash_quietly(path, file_key))
+            return f"{stat.st_size:x}-{stat.st_mtime_ns:x}", True
+        return self._hash(path), False
+
+    def _known_hash(self, path: str, file_key: Tuple[str, int, int]) -> Optional[str]:
+        """SHA-256 from the memo or from the catalog (if the size still matches), without reading the file"""
+        with self._lock:
+            sha = self._hashes.get(file_key)
+            if sha is not None:
+                self._hashes.move_to_end(file_key)
+                return sha
+        recorded = self._content_lookup(path) if self._content_lookup is not None else None
+        if recorded and recorded.get('sha256') and recorded.get('size') == file_key[1]:
+            self._remember(file_key, recorded['sha256'])
+            return recorded['sha256']
+        return None
+
+    def _hash_quietly(self, path: str, file_key: Tuple[str, int, int]) -> None:
+        try:
+            self._hash(path)
+        except OSError:
+            # Deleted or replaced meanwhile; the next request starts over
+            with self._lock:
+                self._hashing.discard(file_key)
+
+    def _remember(self, file_key: Tuple[str, int, int], sha: str) -> None:
+        with self._lock:
+            self._hashes[file_key] = sha
+            self._hashing.discard(file_key)
+            while len(self._hashes) > 4096:
+                self._hashes.popitem(last=False)
+
+    def _hash(self, path: str) -> str:
+        """SHA-256 of the file at path, read only if it is not known yet"""
+        stat = os.stat(path)
+        file_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        sha = self._known_hash(path, file_key)
+        if sha is not None:
+            return sha
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        sha = digest.hexdigest()
+        self._remember(file_key, sha)
+        return sha
+
+    def stats(self) -> Dict[str, Any]:
+        """Number and total size of cached derivatives"""
+        with self._lock:
+            self._load_locked()
+            return {'files': len(self._entries), 'bytes': self._total_bytes, 'max_bytes': self.max_bytes}
+
+
+# Create global preview cache instance
+preview_cache = PreviewCache(
+    cache_dir=config.get('previews.cache_dir', os.path.join(config.local_output_dir, '.previews')),
+    max_bytes=config.get('previews.cache_mb', 512) * 1024 * 1024,
+    thumbnail_size=config.get('previews.thumbnail_size', 320),
+    max_dimension=config.get('previews.max_dimension', 2048),
+    quality=config.get('previews.webp_quality', 80),
+    inline_hash_bytes=config.get('previews.inline_hash_mb', 16) * 1024 * 1024
+)
@@ -0,0 +1,204 @@
+"""
+Rate Limiter for Video Generation Studio
+
+This module enforces the configured rate_limiting.<service>.requests_per_<period>
+quotas with token buckets and caps concurrent calls per service and model ID
+(rate_limiting.<service>.max_concurrent), so requests queue locally instead of
+spending quota on calls the API would reject.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, List, Tuple
+
+from config_manager import config
+
+PERIOD_SECONDS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+
+class TokenBucket:
+    def __init__(self, limit: int, period_seconds: int):
+        self.capacity = float(limit)
+        self.refill_rate = limit / period_seconds
+        self.tokens = float(limit)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (0 if one is available now)"""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.refill_rate
+
+
+class Bulkhead:
+    """Concurrency cap shared by sync and async callers across threads and event loops"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+    def try_enter(self, waker=None) -> bool:
+        with self._lock:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if waker is not None:
+                self._waiters.append(waker)
+            return False
+
+    def forget(self, waker) -> None:
+        with self._lock:
+            try:
+                self._waiters.remove(waker)
+            except ValueError:
+                pass
+
+    def leave(self) -> None:
+        with self._lock:
+            self.active -= 1
+        self.wake_next()
+
+    def wake_next(self) -> None:
+        with self._lock:
+            waker = self._waiters.popleft() if self._waiters else None
+        if waker is not None:
+            waker()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+
+class RateLimiter:
+    def __init__(self, default_max_concurrent: int = 8):
+        self.default_max_concurrent = default_max_concurrent
+        self._buckets: Dict[str, List[TokenBucket]] = {}
+        # (service, model ID) -> bulkhead; services sharing a model each get their own limit
+        self._bulkheads: Dict[Tuple[str, str], Bulkhead] = {}
+        self._lock = threading.Lock()
+
+    def _service_buckets(self, service: str) -> List[TokenBucket]:
+        with self._lock:
+            if service not in self._buckets:
+                # Only enforce the periods that are actually configured
+                configured = config.get(f'rate_limiting.{service}', {}) or {}
+                self._buckets[service] = [
+                    TokenBucket(config.get_rate_limit(service, period), seconds)
+                    for period, seconds in PERIOD_SECONDS.items()
+                    if f'requests_per_{period}' in configured
+                ]
+            return self._buckets[service]
+
+    def _bulkhead(self, service: str, model_id: str) -> Bulkhead:
+        with self._lock:
+            key = (service, model_id)
+            if key not in self._bulkheads:
+                limit = config.get(f'rate_limiting.{service}.max_concurrent', self.default_max_concurrent)
+                self._bulkheads[key] = Bulkhead(limit)
+            return self._bulkheads[key]
+
+    def _take_token(self, service: str) -> float:
+        """Take a token from every bucket of the service, or return how long to wait"""
+        buckets = self._service_buckets(service)
+        with self._lock:
+            now = time.monotonic()
+            for bucket in buckets:
+                bucket.refill(now)
+            wait = max((bucket.wait_time() for bucket in buckets), default=0.0)
+            if wait == 0:
+                for bucket in buckets:
+                    bucket.tokens -= 1
+            return wait
+
+    @asynccontextmanager
+    async def limit(self, service: str, model_id: str):
+        """Async context manager that holds a concurrency slot and a rate token for one call"""
+        bulkhead = self._bulkhead(service, model_id)
+        loop = asyncio.get_running_loop()
+
+        while True:
+            future = loop.create_future()
+
+            def waker(future=future):
+                try:
+                    loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+                except RuntimeError:
+                    # The waiter's loop has closed; let the next waiter try instead
+                    bulkhead.wake_next()
+
+            if bulkhead.try_enter(waker):
+                break
+            try:
+                await future
+            except asyncio.CancelledError:
+                bulkhead.forget(waker)
+                if future.done() and not future.cancelled():
+                    # We were woken but won't retry; pass the wake-up on
+                    bulkhead.wake_next()
+                raise
+
+        try:
+            while True:
+                wait = self._take_token(service)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            bulkhead.leave()
+
+    @contextmanager
+    def hold(self, service: str, model_id: str):
+        """Blocking context manager equivalent of limit() for synchronous call sites"""
+        bulkhead = self._bulkhead(service, model_id)
+
+        while True:
+            event = threading.Event()
+            if bulkhead.try_enter(event.set):
+                break
+            event.wait()
+
+        try:
+            while True:
+                wait = self._take_token(service)
+                if wait == 0:
+                    break
+                time.sleep(wait)
+            yield
+        finally:
+            bulkhead.leave()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of bucket levels and per-service, per-model concurrency"""
+        with self._lock:
+            now = time.monotonic()
+            buckets = {}
+            for service, service_buckets in self._buckets.items():
+                for bucket in service_buckets:
+                    bucket.refill(now)
+                buckets[service] = [
+                    {'capacity': bucket.capacity, 'tokens': round(bucket.tokens, 2)}
+                    for bucket in service_buckets
+                ]
+            models = {
+                f"{service}/{model_id}": {'limit': b.limit, 'active': b.active, 'queued': b.queued}
+                for (service, model_id), b in self._bulkheads.items()
+            }
+        return {'buckets': buckets, 'models': models}
+
+
+# Create global rate limiter instance
+rate_limiter = RateLimiter(default_max_concurrent=config.get('rate_limiting.default_max_concurrent', 8))
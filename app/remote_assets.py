@@ -0,0 +1,172 @@
+"""
+Remote Asset Registry for Video Generation Studio
+
+This module tracks generated files that live only in GCS (for example Veo
+output written straight to the bucket) under the local path they would have
+had. The local copy is downloaded lazily the first time something needs it,
+such as a preview or an ffmpeg operation, or in bulk on request. Registrations
+are kept in SQLite, so every server worker process sees them.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Callable
+
+from google.cloud import storage
+
+from config_manager import config
+from gcs_transfer import gcs_transfer
+from retry_policy import retry_policy
+
+
+class RemoteAssetRegistry:
+    def __init__(self, db_path: str, legacy_index_path: Optional[str] = None):
+        self.db_path = db_path
+        self.legacy_index_path = legacy_index_path
+        self._storage_client_factory: Optional[Callable[[], Any]] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._path_locks: Dict[str, threading.Lock] = {}
+
+    def set_storage_client_factory(self, factory: Callable[[], Any]) -> None:
+        """Set the callable returning the google.cloud.storage client used for downloads and deletes"""
+        self._storage_client_factory = factory
+
+    def _connect_locked(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS remote_assets (
+                    key TEXT PRIMARY KEY,
+                    local_path TEXT NOT NULL,
+                    gcs_uri TEXT NOT NULL,
+                    size INTEGER,
+                    created REAL NOT NULL,
+                    directory TEXT NOT NULL
+                )
+            ''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS remote_assets_directory ON remote_assets (directory)')
+            self._import_legacy_locked(self._db)
+            self._db.commit()
+        return self._db
+
+    def _import_legacy_locked(self, db: sqlite3.Connection) -> None:
+        """Move registrations from the JSON index earlier versions kept"""
+        if not self.legacy_index_path:
+            return
+        try:
+            with open(self.legacy_index_path, 'r', encoding='utf-8') as f:
+                assets = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError as e:
+            print(f"⚠️  Ignoring corrupt remote asset index {self.legacy_index_path}: {e}")
+            return
+        db.executemany(
+            'INSERT OR IGNORE INTO remote_assets (key, local_path, gcs_uri, size, created, directory) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(key, asset['local_path'], asset['gcs_uri'], asset.get('size'), asset.get('created', time.time()),
+              os.path.dirname(key)) for key, asset in assets.items()]
+        )
+        db.commit()
+        try:
+            os.replace(self.legacy_index_path, f"{self.legacy_index_path}.imported")
+        except FileNotFoundError:
+            # Another worker process imported it at the same time
+            pass
+
+    @staticmethod
+    def _key(local_path: str) -> str:
+        return os.path.abspath(local_path)
+
+    @staticmethod
+    def _asset(row: sqlite3.Row) -> Dict[str, Any]:
+        return {column: row[column] for column in ('local_path', 'gcs_uri', 'size', 'created')}
+
+    def register(self, local_path: str, gcs_uri: str, size: Optional[int] = None) -> None:
+        """Record that local_path is backed by gcs_uri and has not been downloaded yet"""
+        key = self._key(local_path)
+        with self._lock:
+            db = self._connect_locked()
+            db.execute(
+                'INSERT OR REPLACE INTO remote_assets (key, local_path, gcs_uri, size, created, directory) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, local_path, gcs_uri, size, time.time(), os.path.dirname(key))
+            )
+            db.commit()
+
+    def lookup(self, local_path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect_locked().execute(
+                'SELECT * FROM remote_assets WHERE key = ?', (self._key(local_path),)
+            ).fetchone()
+        return self._asset(row) if row else None
+
+    def list_remote(self, directory: str) -> List[Dict[str, Any]]:
+        """Registered assets in a directory that have no local copy yet"""
+        with self._lock:
+            rows = self._connect_locked().execute(
+                'SELECT * FROM remote_assets WHERE directory = ?', (os.path.abspath(directory),)
+            ).fetchall()
+        return [self._asset(row) for row in rows if not os.path.exists(row['key'])]
+
+    def materialize(self, local_path: str) -> str:
+        """
+        Make sure local_path exists on disk, downloading it from GCS on first use.
+        Paths that are not registered are returned unchanged.
+        """
+        if os.path.exists(local_path):
+            return local_path
+
+        asset = self.lookup(local_path)
+        if not asset:
+            return local_path
+
+        key = self._key(local_path)
+        with self._lock:
+            path_lock = self._path_locks.setdefault(key, threading.Lock())
+
+        with path_lock:
+            # Another request may have downloaded it while we waited
+            if os.path.exists(local_path):
+                return local_path
+
+            blob = storage.Blob.from_string(asset['gcs_uri'], client=self._storage_client_factory())
+            # Large videos are fetched as parallel byte ranges
+            gcs_transfer.download(blob, local_path)
+            print(f"⬇️  Materialized {asset['gcs_uri']} -> {local_path}")
+
+        return local_path
+
+    def materialize_many(self, local_paths: List[str]) -> Dict[str, Optional[str]]:
+        """Download several registered assets concurrently; returns path -> error message (None on success)"""
+        return gcs_transfer.run_many(self.materialize, local_paths)
+
+    def remove(self, local_path: str, delete_remote: bool = False) -> bool:
+        """Forget a registered asset, optionally deleting the GCS object too"""
+        key = self._key(local_path)
+        with self._lock:
+            db = self._connect_locked()
+            row = db.execute('SELECT * FROM remote_assets WHERE key = ?', (key,)).fetchone()
+            deleted = db.execute('DELETE FROM remote_assets WHERE key = ?', (key,)).rowcount
+            db.commit()
+        # Only the process whose DELETE took effect goes on to delete the object
+        asset = self._asset(row) if row and deleted else None
+
+        if asset and delete_remote:
+            blob = storage.Blob.from_string(asset['gcs_uri'], client=self._storage_client_factory())
+            retry_policy.call('gcs', blob.delete)
+        return asset is not None
+
+
+# Create global remote asset registry instance
+remote_assets = RemoteAssetRegistry(
+    os.path.join(config.local_output_dir, 'remote_assets.sqlite3'),
+    legacy_index_path=os.path.join(config.local_output_dir, 'remote_assets.json')
+)
@@ -0,0 +1,145 @@
+"""
+Request Coalescer for Video Generation Studio
+
+This module de-duplicates identical generation requests while they are in
+flight (singleflight): the first caller runs the model call and later callers
+with the same canonical parameters attach to it and share its result.
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+from typing import Dict, Any, Optional, Callable
+
+
+def _resolve(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    # Runs on the waiter's own event loop
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class RequestCoalescer:
+    def __init__(self):
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, params: Dict[str, Any]) -> str:
+        """Canonical hash of a request: same kind and parameters give the same key"""
+        canonical = json.dumps({'kind': kind, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    async def run(self, key: str, coro_fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run coro_fn once per key; concurrent callers with the same key share the
+        result. The call runs as its own task, so a caller that is cancelled
+        (e.g. its client disconnected) does not take the others down with it;
+        the task is only cancelled when every caller has gone.
+        """
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            entry = self._inflight.get(key)
+            leader = entry is None
+            if leader:
+                entry = {'loop': loop, 'task': None, 'waiters': 0, 'remote': [], 'started_at': time.time()}
+                self._inflight[key] = entry
+            entry['waiters'] += 1
+            future = None
+            if entry['loop'] is not loop:
+                # Callers on another event loop are resolved from the task's loop
+                future = loop.create_future()
+                entry['remote'].append((loop, future))
+
+        if leader:
+            entry['task'] = loop.create_task(coro_fn(*args, **kwargs))
+            entry['task'].add_done_callback(functools.partial(self._finish, key, entry))
+
+        try:
+            result = await (future if future is not None else asyncio.shield(entry['task']))
+        except asyncio.CancelledError:
+            self._leave(key, entry)
+            raise
+
+        if not leader and isinstance(result, dict):
+            return {**result, 'coalesced': True}
+        return result
+
+    def _leave(self, key: str, entry: Dict[str, Any]) -> None:
+        """A caller stopped waiting; the last one to go cancels the shared call"""
+        with self._lock:
+            entry['waiters'] -= 1
+            last = entry['waiters'] == 0
+            if last and self._inflight.get(key) is entry:
+                del self._inflight[key]
+        if last:
+            try:
+                entry['loop'].call_soon_threadsafe(entry['task'].cancel)
+            except RuntimeError:
+                pass
+
+    def _finish(self, key: str, entry: Dict[str, Any], task: asyncio.Task) -> None:
+        with self._lock:
+            if self._inflight.get(key) is entry:
+                del self._inflight[key]
+            remote = list(entry['remote'])
+        if task.cancelled():
+            result, error = None, RuntimeError('Coalesced request was cancelled')
+        else:
+            result, error = (None, task.exception()) if task.exception() is not None else (task.result(), None)
+        for loop, future in remote:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+            except RuntimeError:
+                # The waiter's loop has already closed
+                pass
+
+    def coalesce(self, kind: str, fingerprint: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None):
+        """
+        Decorator for async generation functions. The wrapped function accepts an
+        extra `fresh=True` keyword to bypass coalescing and always start a new call.
+        `fingerprint` can add derived values (e.g. input file state) to the key.
+        """
+        def decorator(fn):
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            async def wrapper(*args, fresh: bool = False, **kwargs):
+                if fresh:
+                    return await fn(*args, **kwargs)
+
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                params = dict(bound.arguments)
+                if fingerprint is not None:
+                    params.update(fingerprint(params))
+
+                return await self.run(self.make_key(kind, params), fn, *args, **kwargs)
+
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of in-flight coalesced requests"""
+        now = time.time()
+        with self._lock:
+            return {
+                'in_flight': len(self._inflight),
+                'requests': [
+                    {'key': key[:12], 'waiters': entry['waiters'],
+                     'elapsed_seconds': now - entry['started_at']}
+                    for key, entry in self._inflight.items()
+                ]
+            }
+
+
+# Create global request coalescer instance
+request_coalescer = RequestCoalescer()
@@ -0,0 +1,242 @@
+"""
+Response Cache for Video Generation Studio
+
+This module caches the results of deterministic text-only model calls (prompt
+refinement, edit prompt enhancement, edit validation, style analysis). Results
+are keyed by model ID, prompt template version, inputs and image content
+hashes, and kept in an in-memory LRU in front of a SQLite store, so repeated
+requests are answered without a model call and survive restarts.
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
+
+from config_manager import config
+
+
+def _default_cacheable(result: Any) -> bool:
+    # Error results and parse-failure fallbacks are not worth replaying
+    if isinstance(result, dict):
+        return not result.get('error') and not result.get('fallback')
+    return result is not None
+
+
+class ResponseCache:
+    def __init__(self, path: str, ttl_seconds: float = 7 * 86400, memory_entries: int = 512,
+                 max_disk_bytes: int = 64 * 1024 * 1024, enabled: bool = True):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.enabled = enabled
+        # key -> (serialized value, expires_at)
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+        self._writes_since_prune = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, version: int, model_id: str, params: Dict[str, Any]) -> str:
+        """Canonical hash of a call: same kind, template version, model and inputs give the same key"""
+        canonical = json.dumps({'kind': kind, 'version': version, 'model': model_id, 'params': params},
+                               sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _connect_locked(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            ''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        return self._db
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self._stats['memory_hits'] += 1
+            return entry[0]
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._db_lock:
+            db = self._connect_locked()
+            row = db.execute('SELECT value, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                db.commit()
+                return None
+            db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+            db.commit()
+
+        self._remember(key, row[0], row[1])
+        with self._lock:
+            self._stats['disk_hits'] += 1
+        return row[0]
+
+    def _put_disk(self, key: str, kind: str, value: str, expires_at: float) -> None:
+        with self._db_lock:
+            db = self._connect_locked()
+            db.execute(
+                'INSERT OR REPLACE INTO responses (key, kind, value, size, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, kind, value, len(value), expires_at, time.time())
+            )
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 50:
+                self._prune_locked(db)
+            db.commit()
+
+    def _prune_locked(self, db: sqlite3.Connection) -> None:
+        """Drop expired rows, then least recently used rows until the store fits max_disk_bytes"""
+        self._writes_since_prune = 0
+        db.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),))
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        freed = 0
+        stale = []
+        for key, size in db.execute('SELECT key, size FROM responses ORDER BY accessed_at'):
+            if total - freed <= self.max_disk_bytes:
+                break
+            stale.append((key,))
+            freed += size
+        db.executemany('DELETE FROM responses WHERE key = ?', stale)
+
+    async def get_or_compute(self, kind: str, version: int, model_id: str, params: Dict[str, Any],
+                             compute: Callable[[], Awaitable[Any]],
+                             cacheable: Callable[[Any], bool] = _default_cacheable) -> Tuple[Any, bool]:
+        """
+        Return (result, cache_hit). On a miss compute() is awaited and its
+        result stored if it is JSON-serializable and cacheable(result) is true.
+        """
+        if not self.enabled:
+            return await compute(), False
+
+        key = self.make_key(kind, version, model_id, params)
+
+        value = self._get_memory(key)
+        if value is None:
+            try:
+                value = await asyncio.to_thread(self._get_disk, key)
+            except sqlite3.Error as e:
+                print(f"⚠️  Response cache lookup failed: {e}")
+        if value is not None:
+            return json.loads(value), True
+
+        with self._lock:
+            self._stats['misses'] += 1
+        result = await compute()
+
+        if cacheable(result):
+            try:
+                value = json.dumps(result)
+            except (TypeError, ValueError):
+                return result, False
+            expires_at = time.time() + self.ttl_seconds
+            self._remember(key, value, expires_at)
+            try:
+                await asyncio.to_thread(self._put_disk, key, kind, value, expires_at)
+            except sqlite3.Error as e:
+                print(f"⚠️  Response cache write failed: {e}")
+            with self._lock:
+                self._stats['stores'] += 1
+
+        return result, False
+
+    def cached(self, kind: str, version: int, model_id: Callable[[], str],
+               fingerprint: Optional[Callable[[Dict[str, Any]], Any]] = None,
+               cacheable: Callable[[Any], bool] = _default_cacheable):
+        """
+        Decorator for async model-call functions that return a dict. The result
+        gets a 'cache_hit' flag; pass `fresh=True` to bypass the cache. Bump
+        `version` whenever the prompt template changes. `fingerprint` (sync or
+        async) can replace inputs with derived values, e.g. an image path with
+        the image's content hash.
+        """
+        def decorator(fn):
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            async def wrapper(*args, fresh: bool = False, **kwargs):
+                if fresh:
+                    return await fn(*args, **kwargs)
+
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                params = dict(bound.arguments)
+                if fingerprint is not None:
+                    derived = fingerprint(params)
+                    if inspect.isawaitable(derived):
+                        derived = await derived
+                    params.update(derived)
+
+                result, hit = await self.get_or_compute(kind, version, model_id(), params,
+                                                        lambda: fn(*args, **kwargs), cacheable)
+                if isinstance(result, dict):
+                    return {**result, 'cache_hit': hit}
+                return result
+
+            return wrapper
+        return decorator
+
+    def clear(self) -> None:
+        """Drop every cached response from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            db = self._connect_locked()
+            db.execute('DELETE FROM responses')
+            db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts and the number of responses held in memory"""
+        with self._lock:
+            return {**self._stats, 'memory_entries': len(self._memory)}
+
+
+# Create global response cache instance
+response_cache = ResponseCache(
+    path=config.get('response_cache.path', os.path.join('cache', 'responses.sqlite3')),
+    ttl_seconds=config.get('response_cache.ttl_seconds', 7 * 86400),
+    memory_entries=config.get('response_cache.memory_entries', 512),
+    max_disk_bytes=config.get('response_cache.max_disk_mb', 64) * 1024 * 1024,
+    enabled=config.get('response_cache.enabled', True)
+)
@@ -0,0 +1,327 @@
+"""
+Retry Policy for Video Generation Studio
+
+This module is the single retry engine for Gemini, Veo and GCS calls. It
+retries transient failures with decorrelated jitter, honours Retry-After
+hints, caps retries with a per-service retry budget and opens a circuit
+breaker when a backend is hard-down so requests fail fast.
+"""
+
+import asyncio
+import functools
+import inspect
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable
+
+import google.auth.exceptions
+import httpx
+import requests
+
+from config_manager import config
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# google.rpc status names (genai's APIError.status) for the same failures
+RETRYABLE_STATUSES = {'RESOURCE_EXHAUSTED', 'UNAVAILABLE', 'DEADLINE_EXCEEDED', 'INTERNAL'}
+# Dropped connections and timeouts from the transports under the SDKs: httpx (genai),
+# requests (storage) and google.auth's token refresh
+TRANSPORT_ERRORS = (
+    ConnectionError, TimeoutError, asyncio.TimeoutError,
+    httpx.TransportError,
+    requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError,
+    google.auth.exceptions.TransportError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the backend while its circuit breaker is open"""
+
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(f"{service} is unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.service = service
+        self.retry_in = retry_in
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """Best-effort HTTP status code of an SDK / transport exception"""
+    for attr in ('code', 'status_code'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, 'response', None)
+    value = getattr(response, 'status_code', None)
+    return value if isinstance(value, int) else None
+
+
+def status_name(error: Exception) -> Optional[str]:
+    """google.rpc status name of an SDK exception (e.g. 'UNAVAILABLE'), if it carries one"""
+    value = getattr(error, 'status', None)
+    if isinstance(value, str):
+        return value
+    # google.api_core exceptions carry a grpc.StatusCode
+    value = getattr(getattr(error, 'grpc_status_code', None), 'name', None)
+    return value if isinstance(value, str) else None
+
+
+def is_throttle(error: Exception) -> bool:
+    code = status_code(error)
+    if code is not None:
+        return code == 429
+    return status_name(error) == 'RESOURCE_EXHAUSTED'
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Failures worth retrying: throttles, 5xx, timeouts and dropped connections.
+    Decided from the exception's type and status code only, never its message,
+    which may echo a prompt or a byte count.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, TRANSPORT_ERRORS):
+        return True
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    return status_name(error) in RETRYABLE_STATUSES
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Server-provided retry delay in seconds (Retry-After header or google.rpc.RetryInfo)"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        value = headers.get('Retry-After') or headers.get('retry-after')
+        if value is not None:
+            return float(value)
+    except (TypeError, ValueError):
+        pass
+
+    # google.rpc.RetryInfo, e.g. "retryDelay": "37s"
+    match = re.search(r'retryDelay["\']?\s*[:=]\s*["\']?(\d+(?:\.\d+)?)s', str(getattr(error, 'details', '')) or str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self, service: str) -> None:
+        with self._lock:
+            if self.state == 'closed':
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == 'open' and elapsed >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_in_flight:
+                # Let a single trial call through to probe the backend
+                self._trial_in_flight = True
+                return
+            raise CircuitOpenError(service, max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """The trial call ended without an answer (e.g. it was cancelled); let the next call probe"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self, hard: bool) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            if not hard:
+                if self.state == 'half_open':
+                    self.state = 'open'
+                    self.opened_at = time.monotonic()
+                return
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"🔌 Circuit opened after {self.failures} consecutive failures")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Allow retries up to `ratio` of recent requests (plus a small floor) per window"""
+
+    def __init__(self, ratio: float, minimum: int, window: float = 60.0):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) >= self.minimum + self.ratio * len(self._requests):
+                return False
+            self._retries.append(now)
+            return True
+
+
+class RetryPolicy:
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._budgets: Dict[str, RetryBudget] = {}
+        self._lock = threading.Lock()
+
+    def _setting(self, service: str, name: str, default: Any) -> Any:
+        return config.get(f'retry_policy.{service}.{name}', config.get(f'retry_policy.default.{name}', default))
+
+    def _breaker(self, service: str) -> CircuitBreaker:
+        with self._lock:
+            if service not in self._breakers:
+                self._breakers[service] = CircuitBreaker(
+                    self._setting(service, 'failure_threshold', 5),
+                    self._setting(service, 'reset_timeout_seconds', 30)
+                )
+            return self._breakers[service]
+
+    def _budget(self, service: str) -> RetryBudget:
+        with self._lock:
+            if service not in self._budgets:
+                self._budgets[service] = RetryBudget(
+                    self._setting(service, 'budget_ratio', 0.2),
+                    self._setting(service, 'budget_minimum', 10)
+                )
+            return self._budgets[service]
+
+    def _next_delay(self, service: str, error: Exception, previous: float) -> float:
+        base = self._setting(service, 'base_delay_seconds', 1.0)
+        cap = self._setting(service, 'max_delay_seconds', 60.0)
+        hinted = retry_after(error)
+        if hinted is not None:
+            return min(cap, hinted)
+        # Decorrelated jitter: sleep = min(cap, random(base, previous * 3))
+        return min(cap, random.uniform(base, max(base, previous * 3)))
+
+    def _should_retry(self, service: str, error: Exception, attempt: int, retry_throttled: bool,
+                      max_attempts: Optional[int] = None) -> bool:
+        if not is_transient(error):
+            return False
+        if is_throttle(error) and not retry_throttled:
+            return False
+        if attempt >= (max_attempts or self._setting(service, 'max_attempts', 5)):
+            return False
+        if not self._budget(service).try_spend():
+            print(f"⚠️  Retry budget for {service} exhausted, giving up")
+            return False
+        return True
+
+    def _record(self, service: str, error: Optional[Exception]) -> None:
+        breaker = self._breaker(service)
+        if error is None or not is_transient(error):
+            # Client errors (e.g. a 400) are still an answer from a working backend
+            breaker.record_success()
+        else:
+            # Throttles mean the backend is up but needs a break
+            breaker.record_failure(hard=not is_throttle(error))
+
+    async def call_async(self, service: str, fn: Callable, *args, retry_throttled: bool = True,
+                         max_attempts: Optional[int] = None, **kwargs) -> Any:
+        """
+        Call fn (sync or async) with the service's retry policy, without blocking
+        the event loop between attempts. max_attempts overrides the configured
+        limit, e.g. 1 for callers that schedule their own retries.
+        """
+        self._budget(service).record_request()
+        delay = self._setting(service, 'base_delay_seconds', 1.0)
+        attempt = 0
+
+        while True:
+            attempt += 1
+            self._breaker(service).before_call(service)
+            try:
+                result = fn(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+            except Exception as e:
+                self._record(service, e)
+                if not self._should_retry(service, e, attempt, retry_throttled, max_attempts):
+                    raise
+                delay = self._next_delay(service, e, delay)
+                print(f"🔁 {service} call failed ({e}); retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled: no verdict on the backend, but a half-open trial must be handed back
+                self._breaker(service).release_trial()
+                raise
+
+            self._record(service, None)
+            return result
+
+    def call(self, service: str, fn: Callable, *args, retry_throttled: bool = True,
+             max_attempts: Optional[int] = None, **kwargs) -> Any:
+        """Blocking equivalent of call_async() for synchronous call sites"""
+        self._budget(service).record_request()
+        delay = self._setting(service, 'base_delay_seconds', 1.0)
+        attempt = 0
+
+        while True:
+            attempt += 1
+            self._breaker(service).before_call(service)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self._record(service, e)
+                if not self._should_retry(service, e, attempt, retry_throttled, max_attempts):
+                    raise
+                delay = self._next_delay(service, e, delay)
+                print(f"🔁 {service} call failed ({e}); retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self._breaker(service).release_trial()
+                raise
+
+            self._record(service, None)
+            return result
+
+    def wrap(self, service: str, fn: Callable, retry_throttled: bool = True) -> Callable:
+        """Return a blocking callable that runs fn through call()"""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return self.call(service, fn, *args, retry_throttled=retry_throttled, **kwargs)
+        return wrapper
+
+    def stats(self) -> Dict[str, Any]:
+        """Circuit breaker state per service"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            service: {'state': breaker.state, 'consecutive_failures': breaker.failures}
+            for service, breaker in breakers.items()
+        }
+
+
+# Create global retry policy instance
+retry_policy = RetryPolicy()
@@ -0,0 +1,261 @@
+"""
+Resumable Uploads for Video Generation Studio
+
+This module implements chunked, resumable uploads for large files. A client
+opens a session with the file's name and size, PUTs chunks at byte offsets
+(in any order, retried or resumed after a dropped connection), asks which
+bytes the server already has, and finally completes the session. Chunks are
+written straight into a preallocated file, the SHA-256 is computed over the
+contiguous prefix as it grows, and completion checks the size and (if the
+client sent one) the expected hash before the file is moved into place.
+Session state is kept on disk and re-read, under a lock on the data file, on
+every call, so uploads survive a server restart and the chunks of one upload
+may land on different server worker processes.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+from config_manager import config
+
+
+def _merge(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    """Add [start, end) to a sorted list of disjoint byte ranges"""
+    merged = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+class UploadSessionManager:
+    def __init__(self, directory: str, chunk_size: int = 8 * 1024 * 1024,
+                 max_bytes: int = 10 * 1024 * 1024 * 1024, ttl_seconds: float = 24 * 3600):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # upload id -> (sha256 of the contiguous prefix, bytes hashed so far). Per process: one that
+        # falls behind (after a restart, or while another worker took the chunks) catches up from disk
+        self._hashers: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.json")
+
+    def _data_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def _save(self, session: Dict[str, Any]) -> None:
+        path = self._meta_path(session['id'])
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(session, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _get(self, upload_id: str) -> Dict[str, Any]:
+        """Current session state from disk; KeyError if unknown"""
+        # Ids are generated hex strings, never paths
+        if not upload_id.isalnum():
+            raise KeyError(upload_id)
+        try:
+            with open(self._meta_path(upload_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+
+    @contextmanager
+    def _open_data(self, upload_id: str) -> Iterator[Any]:
+        """The session's data file, opened unbuffered for reading and writing; KeyError if unknown"""
+        if not upload_id.isalnum():
+            raise KeyError(upload_id)
+        try:
+            f = open(self._data_path(upload_id), 'r+b', buffering=0)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+        with f:
+            yield f
+
+    @contextmanager
+    def _locked(self, f) -> Iterator[None]:
+        """
+        Exclusive lock on an upload across threads and worker processes, taken on
+        its open data file. Session state must be re-read once it is held.
+        """
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _expire_stale(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        with os.scandir(self.directory) as entries:
+            stale = [entry.name[:-5] for entry in entries
+                     if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff]
+        for upload_id in stale:
+            print(f"🧹 Discarding abandoned upload {upload_id}")
+            self.abort(upload_id)
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Open an upload session for a file of the given size"""
+        if size <= 0:
+            raise ValueError("Upload size must be positive")
+        if size > self.max_bytes:
+            raise ValueError(f"File too large: {size} bytes (limit {self.max_bytes})")
+        if sha256 is not None and (len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256.lower())):
+            raise ValueError("sha256 must be a hex SHA-256 digest")
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._expire_stale()
+
+        upload_id = uuid.uuid4().hex
+        # Preallocate so chunks can be written at any offset
+        with open(self._data_path(upload_id), 'wb') as f:
+            f.truncate(size)
+        session = {
+            'id': upload_id,
+            'filename': filename,
+            'size': size,
+            'sha256': sha256.lower() if sha256 else None,
+            'ranges': [],
+            'created': time.time()
+        }
+        self._save(session)
+        with self._lock:
+            self._hashers[upload_id] = (hashlib.sha256(), 0)
+        print(f"📥 Upload {upload_id} opened for {filename} ({size} bytes)")
+        return self.status(upload_id)
+
+    def _advance_hash_locked(self, session: Dict[str, Any], pos: int = 0, block: bytes = b'') -> None:
+        """
+        Extend the hash over newly contiguous bytes from the start of the file:
+        taken from block (just written at pos) where it continues the prefix, and
+        read back from disk only for ranges that arrived earlier out of order or
+        were written by another worker process.
+        """
+        upload_id = session['id']
+        hasher, hashed = self._hashers.get(upload_id) or (hashlib.sha256(), 0)
+        if block and pos <= hashed < pos + len(block):
+            hasher.update(block[hashed - pos:])
+            hashed = pos + len(block)
+        contiguous = session['ranges'][0][1] if session['ranges'] and session['ranges'][0][0] == 0 else 0
+        if contiguous > hashed:
+            with open(self._data_path(upload_id), 'rb') as f:
+                f.seek(hashed)
+                while hashed < contiguous:
+                    data = f.read(min(1024 * 1024, contiguous - hashed))
+                    if not data:
+                        break
+                    hasher.update(data)
+                    hashed += len(data)
+        self._hashers[upload_id] = (hasher, hashed)
+
+    def write_chunk(self, upload_id: str, offset: int, stream) -> Dict[str, Any]:
+        """
+        Write the bytes read from stream at offset. Bytes that arrived before a
+        dropped connection are kept, so the client can resume from there. Bytes
+        already covered by the hash may be sent again, but only unchanged;
+        different data there raises ValueError.
+        """
+        size = self._get(upload_id)['size']
+        if offset < 0 or offset >= size:
+            raise ValueError(f"Offset {offset} is outside the file (size {size})")
+
+        written = 0
+        with self._open_data(upload_id) as f:
+            while True:
+                block = stream.read(1024 * 1024)
+                if not block:
+                    break
+                pos = offset + written
+                if pos + len(block) > size:
+                    raise ValueError(f"Chunk at offset {offset} runs past the end of the file")
+                # Each block is recorded on its own, so bytes that arrived before an error are kept
+                with self._locked(f):
+                    # Other chunks, possibly in other worker processes, may have been written meanwhile
+                    session = self._get(upload_id)
+                    ranges = session['ranges']
+                    hashed = ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+                    if pos < hashed:
+                        f.seek(pos)
+                        overlap = min(len(block), hashed - pos)
+                        if f.read(overlap) != block[:overlap]:
+                            raise ValueError(f"Chunk at offset {offset} changes bytes that were already received")
+                    f.seek(pos)
+                    f.write(block)
+                    written += len(block)
+                    session['ranges'] = _merge(ranges, pos, pos + len(block))
+                    self._advance_hash_locked(session, pos, block)
+                    self._save(session)
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """Received byte ranges and the offset to resume a sequential upload from"""
+        session = self._get(upload_id)
+        ranges = [list(r) for r in session['ranges']]
+        received = sum(end - start for start, end in ranges)
+        return {
+            'upload_id': upload_id,
+            'filename': session['filename'],
+            'size': session['size'],
+            'received': received,
+            'offset': ranges[0][1] if ranges and ranges[0][0] == 0 else 0,
+            'ranges': ranges,
+            'complete': received == session['size'],
+            'chunk_size': self.chunk_size
+        }
+
+    def complete(self, upload_id: str, destination: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Verify the upload and move it to destination. Raises LookupError if bytes
+        are still missing and ValueError (discarding the upload) if the SHA-256
+        does not match.
+        """
+        with self._open_data(upload_id) as f, self._locked(f):
+            session = self._get(upload_id)
+            if self.status(upload_id)['received'] != session['size']:
+                raise LookupError("Upload is incomplete")
+            self._advance_hash_locked(session)
+            digest = self._hashers[upload_id][0].hexdigest()
+
+            expected = (sha256 or session['sha256'] or '').lower()
+            if expected and expected != digest:
+                self.abort(upload_id)
+                raise ValueError(f"Checksum mismatch: expected {expected}, received {digest}")
+
+            # Still locked, so a chunk waiting for the lock finds the session gone
+            os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+            shutil.move(self._data_path(upload_id), destination)
+            self.abort(upload_id)
+        print(f"✅ Upload {upload_id} complete: {destination} ({session['size']} bytes, sha256 {digest[:12]})")
+        return {'path': destination, 'size': session['size'], 'sha256': digest}
+
+    def abort(self, upload_id: str) -> None:
+        """Discard an upload session and its data"""
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+        for path in (self._data_path(upload_id), self._meta_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# Create global upload session manager instance
+upload_sessions = UploadSessionManager(
+    directory=config.get('uploads.sessions_dir',
+                         os.path.join(config.get('file_handling.upload.folder', 'uploads'), '.sessions')),
+    chunk_size=config.get('uploads.chunk_mb', 8) * 1024 * 1024,
+    max_bytes=config.get('uploads.max_resumable_mb', 10240) * 1024 * 1024,
+    ttl_seconds=config.get('uploads.session_ttl_hours', 24) * 3600
+)
@@ -0,0 +1,299 @@
+"""
+Streaming Upload Tee for Video Generation Studio
+
+This module handles multipart uploads in a single pass over the incoming
+stream. Each chunk the form parser hands over is written to a temporary file
+next to its final location, fed to a SHA-256 hasher, checked by an image
+header sniffer (which rejects non-images and decompression bombs as soon as
+the header has arrived) and pushed to a GCS resumable upload session on a
+background thread. Completing the upload is a rename, so every upload costs
+one disk write and no re-reads. If GCS falls behind or fails, the push is
+abandoned and the file goes through the background upload queue instead.
+"""
+
+import datetime
+import hashlib
+import io
+import mimetypes
+import os
+import queue
+import threading
+import uuid
+import warnings
+from typing import Dict, Any, Optional, Callable
+
+from PIL import Image
+from werkzeug.utils import secure_filename
+
+from asset_catalog import asset_catalog
+from blob_store import blob_store
+from config_manager import config
+from gcs_uploads import gcs_uploads
+from image_prep import sniff_image_mime
+
+# Header sizes at which reading an image's dimensions is attempted (the last one is final)
+SNIFF_LIMITS = (64 * 1024, 256 * 1024, 1024 * 1024)
+
+# Queue markers for the GCS push thread
+_DONE = object()
+_ABORT = object()
+
+
+class _GcsPush:
+    """Feeds chunks to a GCS resumable upload on its own thread, with a bounded buffer"""
+
+    def __init__(self, blob, content_type: str, chunk_bytes: int, buffer_bytes: int):
+        self.blob = blob
+        self.buffer_bytes = buffer_bytes
+        self.error: Optional[str] = None
+        self._buffered = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._on_done: Optional[Callable[[Optional[str]], None]] = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(content_type, chunk_bytes),
+                                        name='gcs-tee', daemon=True)
+        self._thread.start()
+
+    def push(self, data: bytes) -> None:
+        with self._lock:
+            if self.error is not None:
+                return
+            if self._buffered + len(data) > self.buffer_bytes:
+                # GCS is slower than the client; stop rather than hold the request back
+                self.error = 'GCS upload fell behind the incoming stream'
+                self._queue.put(_ABORT)
+                return
+            self._buffered += len(data)
+        self._queue.put(bytes(data))
+
+    def abort(self) -> None:
+        with self._lock:
+            if self.error is None:
+                self.error = 'Upload discarded'
+        self._queue.put(_ABORT)
+
+    def finish(self, on_done: Callable[[Optional[str]], None]) -> None:
+        """Close the session in the background; on_done gets the gs:// URL, or None if the push failed"""
+        self._on_done = on_done
+        self._queue.put(_DONE)
+
+    def _run(self, content_type: str, chunk_bytes: int) -> None:
+        writer = None
+        try:
+            writer = self.blob.open('wb', content_type=content_type, chunk_size=chunk_bytes)
+            while True:
+                item = self._queue.get()
+                if item is _ABORT:
+                    # The session is never finalized, so no object is created
+                    return
+                if item is _DONE:
+                    break
+                writer.write(item)
+                with self._lock:
+                    self._buffered -= len(item)
+            writer.close()
+        except Exception as e:
+            with self._lock:
+                self.error = str(e)
+            print(f"⚠️  Streaming GCS upload of {self.blob.name} failed: {e}")
+            # Wait for finish() so the fallback still runs
+            item = None
+            while item is not _DONE and item is not _ABORT:
+                item = self._queue.get()
+            if item is _ABORT:
+                return
+
+        if self._on_done is not None:
+            self._on_done(None if self.error else f"gs://{self.blob.bucket.name}/{self.blob.name}")
+
+
+class UploadTee:
+    """Writable, readable file object the form parser streams one uploaded file into"""
+
+    def __init__(self, directory: str, final_name: str, kind: str, gcs: Optional[_GcsPush],
+                 gcs_path: str, max_image_pixels: int):
+        self.final_name = final_name
+        self.path = os.path.join(directory, final_name)
+        self.kind = kind
+        self.gcs_path = gcs_path
+        self.max_image_pixels = max_image_pixels
+        self.size = 0
+        self.error: Optional[str] = None
+        self.image_size: Optional[tuple] = None
+        os.makedirs(directory, exist_ok=True)
+        self.temp_path = os.path.join(directory, f".{uuid.uuid4().hex}.upload")
+        self._file = open(self.temp_path, 'w+b')
+        self._sha = hashlib.sha256()
+        self._head = bytearray()
+        self._gcs = gcs
+        self._committed = False
+
+    # File interface used by the form parser and FileStorage
+
+    def write(self, data: bytes) -> int:
+        if self.error is None:
+            self._file.write(data)
+            self._sha.update(data)
+            self.size += len(data)
+            if self.kind == 'image' and self.image_size is None:
+                self._sniff(data)
+            if self._gcs is not None and self.error is None:
+                self._gcs.push(data)
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._file.readline(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def _reject(self, message: str) -> None:
+        self.error = message
+        if self._gcs is not None:
+            self._gcs.abort()
+
+    def _sniff(self, data: bytes, final: bool = False) -> None:
+        """Read the image dimensions from the header once enough of it has arrived"""
+        before = len(self._head)
+        self._head.extend(data[:SNIFF_LIMITS[-1] - before])
+        if not final and not any(before < limit <= len(self._head) for limit in SNIFF_LIMITS):
+            return
+        if sniff_image_mime(bytes(self._head[:16])) is None:
+            self._reject('File is not a supported image')
+            return
+        try:
+            with warnings.catch_warnings():
+                # The pixel limit is enforced below with our own threshold
+                warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+                with Image.open(io.BytesIO(bytes(self._head))) as image:
+                    width, height = image.size
+        except Image.DecompressionBombError as e:
+            self._reject(str(e))
+            return
+        except Exception:
+            if final or len(self._head) >= SNIFF_LIMITS[-1]:
+                self._reject('Could not read the image header')
+            return
+        if width * height > self.max_image_pixels:
+            self._reject(f"Image too large: {width}x{height} exceeds {self.max_image_pixels} pixels")
+            return
+        self.image_size = (width, height)
+
+    @property
+    def sha256(self) -> str:
+        return self._sha.hexdigest()
+
+    def commit(self, destination: str) -> None:
+        """Move the received file into place; raises ValueError if it was rejected"""
+        if self.error is None and self.kind == 'image' and self.image_size is None:
+            self._sniff(b'', final=True)
+        if self.error is not None:
+            self.close()
+            raise ValueError(self.error)
+        self._file.close()
+        os.replace(self.temp_path, destination)
+        self._committed = True
+
+    def discard_remote(self) -> None:
+        """Drop the streamed GCS copy, e.g. because the same content is already stored"""
+        if self._gcs is not None:
+            self._gcs.abort()
+
+    def finish_remote(self, destination: str) -> str:
+        """
+        Complete the streamed GCS copy of a committed file in the background (or
+        queue a regular upload if streaming was not possible); returns the upload state.
+        """
+        def on_done(gcs_url: Optional[str]) -> None:
+            if gcs_url:
+                asset_catalog.set_upload_state(destination, 'uploaded', gcs_url=gcs_url)
+                print(f"☁️  Streamed {destination} to {gcs_url}")
+            else:
+                gcs_uploads.enqueue(destination, self.gcs_path)
+
+        if self._gcs is None or self._gcs.error is not None:
+            if self._gcs is not None:
+                self._gcs.abort()
+            gcs_uploads.enqueue(destination, self.gcs_path)
+            return 'pending'
+        asset_catalog.set_upload_state(destination, 'uploading')
+        self._gcs.finish(on_done)
+        return 'uploading'
+
+    def close(self) -> None:
+        """Discard the upload unless it was committed (called when the request ends)"""
+        if self._committed:
+            return
+        if self._gcs is not None:
+            self._gcs.abort()
+        self._file.close()
+        # The reserved file name is given up along with the data
+        for path in (self.temp_path, self.path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class UploadTeeFactory:
+    def __init__(self, chunk_bytes: int = 8 * 1024 * 1024, buffer_bytes: int = 64 * 1024 * 1024,
+                 max_image_pixels: int = Image.MAX_IMAGE_PIXELS, stream_to_gcs: bool = True):
+        self.chunk_bytes = chunk_bytes
+        self.buffer_bytes = buffer_bytes
+        self.max_image_pixels = max_image_pixels
+        self.stream_to_gcs = stream_to_gcs
+        self._bucket_factory: Optional[Callable[[], Any]] = None
+
+    def set_bucket_factory(self, factory: Callable[[], Any]) -> None:
+        """Set the callable returning the google.cloud.storage bucket uploads are streamed to"""
+        self._bucket_factory = factory
+
+    def open(self, directory: str, filename: str, kind: str, content_type: Optional[str],
+             gcs_folder: str) -> UploadTee:
+        """Start receiving an uploaded file destined for directory under a name no other upload has"""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        os.makedirs(directory, exist_ok=True)
+        reserved = blob_store.reserve(os.path.join(directory, f"{timestamp}_{secure_filename(filename)}"))
+        final_name = os.path.basename(reserved)
+        gcs_path = f"{gcs_folder}/uploaded_{final_name}"
+
+        gcs = None
+        if self.stream_to_gcs and self._bucket_factory is not None:
+            try:
+                blob = self._bucket_factory().blob(gcs_path)
+                mime_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                gcs = _GcsPush(blob, mime_type, self.chunk_bytes, self.buffer_bytes)
+            except Exception as e:
+                print(f"⚠️  Not streaming upload to GCS: {e}")
+        return UploadTee(directory, final_name, kind, gcs, gcs_path, self.max_image_pixels)
+
+    def stats(self) -> Dict[str, Any]:
+        """Streaming settings in effect"""
+        return {'stream_to_gcs': self.stream_to_gcs, 'max_image_pixels': self.max_image_pixels}
+
+
+# Create global upload tee factory instance
+upload_tee = UploadTeeFactory(
+    chunk_bytes=config.get('uploads.gcs_chunk_mb', 8) * 1024 * 1024,
+    buffer_bytes=config.get('uploads.gcs_buffer_mb', 64) * 1024 * 1024,
+    max_image_pixels=config.get('uploads.max_image_pixels', Image.MAX_IMAGE_PIXELS),
+    stream_to_gcs=config.get('uploads.stream_to_gcs', True)
+)
@@ -0,0 +1,29 @@
+"""
+pytest setup for the tests that run without a server
+
+The app modules load config.json from the working directory when they are
+imported, so these tests run from a scratch directory with an empty config
+(every setting at its default) and never touch output/ or uploads/.
+"""
+
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix='video-studio-tests-')
+with open(os.path.join(_workdir, 'config.json'), 'w') as f:
+    f.write('{}')
+os.chdir(_workdir)
+
+# Scripts that drive a running studio at localhost:5000; run them directly instead
+collect_ignore = [
+    'test_api_key_implementation.py',
+    'test_image_editing.py',
+    'test_image_editing_advanced.py',
+    'test_job_api.py',
+    'test_model_availability.py',
+    'test_official_implementation.py',
+    'test_preview_caching.py',
+    'test_resumable_upload.py',
+    'test_standalone_image_generation.py',
+    'test_style_mixing.py',
+]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the background job API (async video generation)
+"""
+
+import os
+import sys
+import json
+import requests
+import time
+
+# Add app directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+def test_job_api():
+    """Submit an async video generation job and poll it to completion"""
+
+    BASE_URL = "http://localhost:5000"
+
+    print("🧪 Testing Background Job API...")
+
+    # Check if server is running
+    try:
+        response = requests.get(f"{BASE_URL}/", timeout=5)
+        print("✅ Server is running")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Server not running: {e}")
+        return False
+
+    # Test 1: Submit returns immediately with a job ID
+    print("\n🔄 Test 1: Submitting async video generation...")
+
+    submit_data = {
+        "prompt": "A slow pan across a misty mountain lake at sunrise",
+        "aspect_ratio": "16:9",
+        "resolution": "720p",
+        "async": True
+    }
+
+    try:
+        started = time.time()
+        response = requests.post(f"{BASE_URL}/api/generate-video", json=submit_data, timeout=10)
+        result = response.json()
+
+        if response.status_code != 202 or not result.get('job_id'):
+            print(f"❌ Submit did not return a job: {response.status_code} {result}")
+            return False
+
+        job_id = result['job_id']
+        print(f"✅ Job submitted in {time.time() - started:.2f}s: {job_id}")
+
+    except Exception as e:
+        print(f"❌ Submit error: {e}")
+        return False
+
+    # Test 2: Unknown jobs return 404
+    print("\n🔄 Test 2: Unknown job ID...")
+    response = requests.get(f"{BASE_URL}/api/jobs/does-not-exist", timeout=5)
+    if response.status_code != 404:
+        print(f"❌ Expected 404 for unknown job, got {response.status_code}")
+        return False
+    print("✅ Unknown job returns 404")
+
+    # Test 3: Poll until the job finishes
+    print("\n🔄 Test 3: Polling job status...")
+
+    deadline = time.time() + 900
+    job = None
+    while time.time() < deadline:
+        response = requests.get(f"{BASE_URL}/api/jobs/{job_id}", timeout=5)
+        job = response.json()
+        print(f"   Status: {job.get('status')}")
+
+        if job.get('status') in ('succeeded', 'failed', 'cancelled'):
+            break
+        time.sleep(10)
+
+    if not job or job.get('status') != 'succeeded':
+        print(f"❌ Job did not succeed: {json.dumps(job, indent=2)}")
+        return False
+
+    print(f"✅ Job succeeded: {job['result'].get('local_path')}")
+
+    # Test 4: Result endpoint returns the final payload
+    response = requests.get(f"{BASE_URL}/api/jobs/{job_id}/result", timeout=5)
+    if response.status_code != 200 or not response.json().get('success'):
+        print(f"❌ Result endpoint failed: {response.status_code}")
+        return False
+    print("✅ Result endpoint returned the generated video")
+
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting Job API Tests for Video Generation Studio")
+    print("="*60)
+
+    success = test_job_api()
+
+    print("\n" + "="*60)
+    print(f"📊 Job API: {'✅ PASS' if success else '❌ FAIL'}")
+    return success
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
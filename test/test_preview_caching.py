@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for conditional GET, ETag and byte-range support on the preview endpoints
+"""
+
+import os
+import sys
+import requests
+
+# Add app directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+BASE_URL = "http://localhost:5000"
+
+def first_asset(kind):
+    """Name of the newest local image or video, or None"""
+    response = requests.get(f"{BASE_URL}/api/list-{kind}s?limit=20", timeout=10)
+    for item in response.json().get(f"{kind}s", []):
+        if not item.get('remote'):
+            return item['name']
+    return None
+
+def check_caching(url):
+    """Validators, 304s and byte ranges for a single preview URL"""
+    response = requests.get(url, timeout=30)
+    if response.status_code != 200:
+        print(f"❌ GET {url} failed: {response.status_code}")
+        return False
+
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if not etag or etag.startswith('W/') or not last_modified:
+        print(f"❌ Missing strong ETag or Last-Modified: {etag} / {last_modified}")
+        return False
+    print(f"✅ ETag {etag[:20]}... Last-Modified {last_modified}")
+    print(f"   Cache-Control: {response.headers.get('Cache-Control')}")
+
+    # Matching validators return 304 without a body
+    response_304 = requests.get(url, headers={'If-None-Match': etag}, timeout=30)
+    if response_304.status_code != 304 or response_304.content:
+        print(f"❌ If-None-Match did not return an empty 304: {response_304.status_code}")
+        return False
+    response_304 = requests.get(url, headers={'If-Modified-Since': last_modified}, timeout=30)
+    if response_304.status_code != 304:
+        print(f"❌ If-Modified-Since did not return 304: {response_304.status_code}")
+        return False
+    print("✅ Conditional requests return 304")
+
+    # Seeking: a range from the middle of the file
+    size = len(response.content)
+    start, end = size // 2, min(size // 2 + 1023, size - 1)
+    response_206 = requests.get(url, headers={'Range': f"bytes={start}-{end}"}, timeout=30)
+    if response_206.status_code != 206 or response_206.content != response.content[start:end + 1]:
+        print(f"❌ Range request failed: {response_206.status_code}")
+        return False
+    if response_206.headers.get('Content-Range') != f"bytes {start}-{end}/{size}":
+        print(f"❌ Wrong Content-Range: {response_206.headers.get('Content-Range')}")
+        return False
+    print(f"✅ Range bytes={start}-{end} returned 206")
+
+    # A stale If-Range falls back to the full file
+    response_stale = requests.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'}, timeout=30)
+    if response_stale.status_code != 200:
+        print(f"❌ Stale If-Range should return the full file, got {response_stale.status_code}")
+        return False
+
+    response_416 = requests.get(url, headers={'Range': f"bytes={size + 100}-"}, timeout=30)
+    if response_416.status_code != 416:
+        print(f"❌ Unsatisfiable range should return 416, got {response_416.status_code}")
+        return False
+    print("✅ If-Range and unsatisfiable ranges handled")
+    return True
+
+def test_preview_caching():
+    """Run the caching checks against an image, its thumbnail and a video"""
+
+    print("🧪 Testing Preview Caching...")
+
+    try:
+        requests.get(f"{BASE_URL}/", timeout=5)
+        print("✅ Server is running")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Server not running: {e}")
+        return False
+
+    urls = []
+    image = first_asset('image')
+    if image:
+        urls += [f"{BASE_URL}/preview/image/{image}", f"{BASE_URL}/preview/image/{image}?thumb=1"]
+    video = first_asset('video')
+    if video:
+        urls.append(f"{BASE_URL}/preview/video/{video}")
+    if not urls:
+        print("⚠️  No local images or videos to test with, generate one first")
+        return False
+
+    for url in urls:
+        print(f"\n🔄 {url}")
+        if not check_caching(url):
+            return False
+
+    # Versioned URLs are immutable
+    if image:
+        response = requests.get(f"{BASE_URL}/preview/image/{image}?thumb=1&v=1", timeout=30)
+        if 'immutable' not in response.headers.get('Cache-Control', ''):
+            print(f"❌ Versioned URL not immutable: {response.headers.get('Cache-Control')}")
+            return False
+        print("\n✅ Versioned URLs are cached as immutable")
+
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting Preview Caching Tests for Video Generation Studio")
+    print("="*60)
+
+    success = test_preview_caching()
+
+    print("\n" + "="*60)
+    print(f"📊 Preview Caching: {'✅ PASS' if success else '❌ FAIL'}")
+    return success
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for request coalescing and its cancellation rules (no server needed, run with pytest)
+"""
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+# Add app directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from request_coalescer import RequestCoalescer
+
+
+def make_work(calls, delay=0.1):
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return {'value': value}
+    return work
+
+
+def test_identical_requests_share_one_call():
+    coalescer = RequestCoalescer()
+    calls = []
+    work = make_work(calls)
+
+    async def scenario():
+        return await asyncio.gather(coalescer.run('k', work, 1), coalescer.run('k', work, 1))
+
+    first, second = asyncio.run(scenario())
+    assert calls == [1]
+    assert first == {'value': 1}
+    assert second == {'value': 1, 'coalesced': True}
+
+
+def test_cancelling_the_first_caller_keeps_the_others():
+    coalescer = RequestCoalescer()
+    calls = []
+    work = make_work(calls)
+
+    async def scenario():
+        first = asyncio.create_task(coalescer.run('k', work, 1))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(coalescer.run('k', work, 1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == {'value': 1, 'coalesced': True}
+    assert calls == [1]
+
+
+def test_shared_call_is_cancelled_when_every_caller_leaves():
+    coalescer = RequestCoalescer()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        callers = [asyncio.create_task(coalescer.run('k', work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert cancelled == [True]
+    assert coalescer.stats()['in_flight'] == 0
+
+
+def test_errors_reach_every_caller():
+    coalescer = RequestCoalescer()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError('model said no')
+
+    async def scenario():
+        return await asyncio.gather(coalescer.run('k', work), coalescer.run('k', work), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert coalescer.stats()['in_flight'] == 0
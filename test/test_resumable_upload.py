@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the resumable chunked video upload protocol
+"""
+
+import os
+import sys
+import hashlib
+import requests
+
+# Add app directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+BASE_URL = "http://localhost:5000"
+SESSIONS_URL = f"{BASE_URL}/api/upload-video/sessions"
+
+def test_resumable_upload():
+    """Upload a file in out-of-order chunks, resume after a partial chunk and verify the hash"""
+
+    print("🧪 Testing Resumable Upload...")
+
+    try:
+        requests.get(f"{BASE_URL}/", timeout=5)
+        print("✅ Server is running")
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Server not running: {e}")
+        return False
+
+    chunk = 1024 * 1024
+    data = os.urandom(3 * chunk + 4321)
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    # Test 1: Open a session
+    print("\n🔄 Test 1: Opening an upload session...")
+    response = requests.post(SESSIONS_URL, json={'filename': 'resumable_test.mp4', 'size': len(data),
+                                                 'sha256': sha256}, timeout=10)
+    if response.status_code != 201:
+        print(f"❌ Could not open session: {response.status_code} {response.text}")
+        return False
+    upload_id = response.json()['upload_id']
+    print(f"✅ Session {upload_id}")
+
+    # Test 2: Chunks out of order, then an interrupted one (only half its bytes arrive)
+    print("\n🔄 Test 2: Uploading chunks out of order...")
+    requests.put(f"{SESSIONS_URL}/{upload_id}?offset={2 * chunk}", data=data[2 * chunk:], timeout=30)
+    requests.put(f"{SESSIONS_URL}/{upload_id}?offset=0", data=data[:chunk], timeout=30)
+    requests.put(f"{SESSIONS_URL}/{upload_id}?offset={chunk}", data=data[chunk:chunk + chunk // 2], timeout=30)
+
+    status = requests.get(f"{SESSIONS_URL}/{upload_id}", timeout=10).json()
+    if status['offset'] != chunk + chunk // 2 or status['complete']:
+        print(f"❌ Unexpected status: {status}")
+        return False
+    print(f"✅ Server reports offset {status['offset']} and ranges {status['ranges']}")
+
+    # Test 3: Completing early is refused
+    response = requests.post(f"{SESSIONS_URL}/{upload_id}/complete", timeout=10)
+    if response.status_code != 409:
+        print(f"❌ Expected 409 for incomplete upload, got {response.status_code}")
+        return False
+    print("✅ Incomplete upload refused")
+
+    # Test 4: Resume from the reported offset and complete
+    print("\n🔄 Test 4: Resuming and completing...")
+    offset = status['offset']
+    requests.put(f"{SESSIONS_URL}/{upload_id}", data=data[offset:2 * chunk],
+                 headers={'Content-Range': f"bytes {offset}-{2 * chunk - 1}/{len(data)}"}, timeout=30)
+    response = requests.post(f"{SESSIONS_URL}/{upload_id}/complete", timeout=60)
+    result = response.json()
+    if response.status_code != 200 or result.get('sha256') != sha256 or result.get('size') != len(data):
+        print(f"❌ Completion failed: {response.status_code} {result}")
+        return False
+    print(f"✅ Upload complete: {result['local_path']}")
+
+    # Test 5: A wrong checksum is rejected
+    print("\n🔄 Test 5: Checksum mismatch...")
+    response = requests.post(SESSIONS_URL, json={'filename': 'bad.mp4', 'size': 10, 'sha256': '0' * 64}, timeout=10)
+    bad_id = response.json()['upload_id']
+    requests.put(f"{SESSIONS_URL}/{bad_id}?offset=0", data=b'0123456789', timeout=10)
+    response = requests.post(f"{SESSIONS_URL}/{bad_id}/complete", timeout=10)
+    if response.status_code != 400:
+        print(f"❌ Expected 400 for checksum mismatch, got {response.status_code}")
+        return False
+    print("✅ Checksum mismatch rejected")
+
+    # Clean up the uploaded test file
+    requests.delete(f"{BASE_URL}/api/delete-file", json={'file_path': result['local_path'], 'file_type': 'video'}, timeout=30)
+    return True
+
+def main():
+    """Run all tests"""
+    print("🚀 Starting Resumable Upload Tests for Video Generation Studio")
+    print("="*60)
+
+    success = test_resumable_upload()
+
+    print("\n" + "="*60)
+    print(f"📊 Resumable Upload: {'✅ PASS' if success else '❌ FAIL'}")
+    return success
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
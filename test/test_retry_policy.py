@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the retry policy's circuit breaker (no server needed, run with pytest)
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+import httpx
+import pytest
+from google.genai import errors as genai_errors
+
+# Add app directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from retry_policy import RetryPolicy, CircuitBreaker, CircuitOpenError, is_throttle, is_transient
+
+
+class ClientError(Exception):
+    code = 400
+
+
+def half_open(policy, service):
+    """Put a service's breaker into the state where the next call is the trial"""
+    breaker = policy._breaker(service)
+    breaker.state = 'open'
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+    return breaker
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(3):
+        breaker.before_call('gemini')
+        breaker.record_failure(hard=True)
+
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call('gemini')
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.state = 'open'
+    breaker.opened_at = time.monotonic() - 61
+
+    breaker.before_call('gemini')
+    assert breaker.state == 'half_open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call('gemini')
+
+
+def test_cancelled_trial_does_not_wedge_the_breaker():
+    policy = RetryPolicy()
+    breaker = half_open(policy, 'gemini')
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def ok():
+        return 'ok'
+
+    async def scenario():
+        trial = asyncio.create_task(policy.call_async('gemini', hang))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        # The next call becomes the new trial instead of being rejected
+        return await policy.call_async('gemini', ok)
+
+    assert asyncio.run(scenario()) == 'ok'
+    assert breaker.state == 'closed'
+
+
+def test_client_error_on_trial_closes_the_breaker():
+    policy = RetryPolicy()
+    breaker = half_open(policy, 'gemini')
+
+    def bad_request():
+        raise ClientError('400 INVALID_ARGUMENT')
+
+    with pytest.raises(ClientError):
+        policy.call('gemini', bad_request)
+    assert breaker.state == 'closed'
+
+
+def test_max_attempts_limits_retries():
+    policy = RetryPolicy()
+    calls = []
+
+    def unavailable():
+        calls.append(1)
+        raise ConnectionError('connection reset')
+
+    with pytest.raises(ConnectionError):
+        policy.call('gcs', unavailable, max_attempts=1)
+    assert len(calls) == 1
+
+
+def test_transient_errors_are_told_apart_by_type_and_code():
+    assert is_transient(genai_errors.ServerError(503, {'error': {'status': 'UNAVAILABLE', 'message': 'overloaded'}}))
+    assert is_throttle(genai_errors.ClientError(429, {'error': {'status': 'RESOURCE_EXHAUSTED', 'message': 'quota'}}))
+    assert not is_transient(genai_errors.ClientError(400, {'error': {'status': 'INVALID_ARGUMENT', 'message': '500 frames'}}))
+    assert is_transient(httpx.ReadTimeout('timed out'))
+    assert is_transient(ConnectionError('connection reset'))
+
+
+def test_message_text_is_not_mistaken_for_a_status():
+    echo = ValueError('Prompt "500 INTERNAL robots, 429 of them" rejected after 503 bytes')
+    assert not is_transient(echo)
+    assert not is_throttle(echo)
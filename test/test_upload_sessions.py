@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for resumable upload sessions and their incremental hashing (no server needed, run with pytest)
+"""
+
+import os
+import io
+import sys
+import hashlib
+
+import pytest
+
+# Add app directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from upload_sessions import UploadSessionManager
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def data():
+    return os.urandom(3 * MB + 4321)
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    return UploadSessionManager(str(tmp_path / 'sessions'))
+
+
+def test_out_of_order_chunks_hash_to_the_file(sessions, data, tmp_path):
+    upload_id = sessions.create('clip.mp4', len(data), hashlib.sha256(data).hexdigest())['upload_id']
+    sessions.write_chunk(upload_id, 2 * MB, io.BytesIO(data[2 * MB:]))
+    sessions.write_chunk(upload_id, 0, io.BytesIO(data[:MB]))
+    status = sessions.write_chunk(upload_id, MB, io.BytesIO(data[MB:2 * MB]))
+    assert status['complete']
+
+    destination = str(tmp_path / 'clip.mp4')
+    result = sessions.complete(upload_id, destination)
+    assert result['sha256'] == hashlib.sha256(data).hexdigest()
+    with open(destination, 'rb') as f:
+        assert f.read() == data
+
+
+def test_resending_hashed_bytes_unchanged_is_accepted(sessions, data, tmp_path):
+    upload_id = sessions.create('clip.mp4', len(data))['upload_id']
+    sessions.write_chunk(upload_id, 0, io.BytesIO(data[:MB]))
+    sessions.write_chunk(upload_id, 0, io.BytesIO(data[:MB]))
+    sessions.write_chunk(upload_id, MB, io.BytesIO(data[MB:]))
+
+    result = sessions.complete(upload_id, str(tmp_path / 'clip.mp4'))
+    assert result['sha256'] == hashlib.sha256(data).hexdigest()
+
+
+def test_changing_hashed_bytes_is_rejected(sessions, data, tmp_path):
+    upload_id = sessions.create('clip.mp4', len(data))['upload_id']
+    sessions.write_chunk(upload_id, 0, io.BytesIO(data[:MB]))
+    with pytest.raises(ValueError):
+        sessions.write_chunk(upload_id, 100, io.BytesIO(b'x' * 1000))
+    sessions.write_chunk(upload_id, MB, io.BytesIO(data[MB:]))
+
+    result = sessions.complete(upload_id, str(tmp_path / 'clip.mp4'))
+    assert result['sha256'] == hashlib.sha256(data).hexdigest()
+
+
+def test_hash_survives_a_restart(sessions, data, tmp_path):
+    upload_id = sessions.create('clip.mp4', len(data))['upload_id']
+    sessions.write_chunk(upload_id, 0, io.BytesIO(data[:MB]))
+
+    restarted = UploadSessionManager(sessions.directory)
+    restarted.write_chunk(upload_id, MB, io.BytesIO(data[MB:]))
+    result = restarted.complete(upload_id, str(tmp_path / 'clip.mp4'))
+    assert result['sha256'] == hashlib.sha256(data).hexdigest()
+
+
+def test_incomplete_upload_and_checksum_mismatch(sessions, tmp_path):
+    upload_id = sessions.create('clip.mp4', 10, '0' * 64)['upload_id']
+    sessions.write_chunk(upload_id, 0, io.BytesIO(b'01234'))
+    with pytest.raises(LookupError):
+        sessions.complete(upload_id, str(tmp_path / 'clip.mp4'))
+
+    sessions.write_chunk(upload_id, 5, io.BytesIO(b'56789'))
+    with pytest.raises(ValueError):
+        sessions.complete(upload_id, str(tmp_path / 'clip.mp4'))
+
+
+def test_chunks_split_between_worker_processes(sessions, data, tmp_path):
+    other = UploadSessionManager(sessions.directory)
+    upload_id = sessions.create('clip.mp4', len(data))['upload_id']
+    sessions.write_chunk(upload_id, 0, io.BytesIO(data[:MB]))
+    other.write_chunk(upload_id, MB, io.BytesIO(data[MB:2 * MB]))
+    with pytest.raises(ValueError):
+        sessions.write_chunk(upload_id, MB, io.BytesIO(b'x' * 10))
+    assert sessions.write_chunk(upload_id, 2 * MB, io.BytesIO(data[2 * MB:]))['complete']
+    assert other.status(upload_id)['offset'] == len(data)
+
+    result = other.complete(upload_id, str(tmp_path / 'clip.mp4'))
+    assert result['sha256'] == hashlib.sha256(data).hexdigest()